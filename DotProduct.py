@@ -10,6 +10,8 @@ __license__ = "GPLv3+"
 from myhdl import Signal, ConcatSignal, intbv, fixbv, delay, always, always_comb, instance, now
 from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
 
+from fixformat import Q7_8
+
 
 def DotProduct(y, y_da_vec, y_db_vec, a_vec, b_vec, dim, fix_min, fix_max, fix_res):
     """Vector dot product and derivative model using fixbv type.
@@ -90,14 +92,14 @@ def DotProduct(y, y_da_vec, y_db_vec, a_vec, b_vec, dim, fix_min, fix_max, fix_r
 
 #     return logic
 
-def test_dim0(n=10, step_a=0.5, step_b=0.5):
+def test_dim0(n=10, step_a=0.5, step_b=0.5, fmt=Q7_8):
     """Testing bench around zero in dimension 0."""
 
     dim = 3
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
-    fix_width = 1 + 7 + 8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -143,14 +145,14 @@ def test_dim0(n=10, step_a=0.5, step_b=0.5):
     return clk_gen, stimulus, dot
 
 
-def convert(target=toVerilog, directory="./ex-target"):
+def convert(target=toVerilog, directory="./ex-target", fmt=Q7_8):
     """Convert design to Verilog or VHDL."""
 
     dim = 3
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
-    fix_width = 1 + 7 + 8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -2,14 +2,18 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=C0103,W0621
 """
-Simulated RAM model using a Python dictionary.
+Simulated RAM models using a Python dictionary or a preallocated NumPy array.
 """
 __author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
 __license__ = "GPLv3+"
 
+import os
+import numpy as np
 from myhdl import Signal, intbv, delay, always, instance, now
 from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
 
+from fixformat import Q7_8
+
 
 def RamSim(dout, din, default, addr, rd, wr, clk):
     """Simulated RAM model using a Python dictionary.
@@ -44,20 +48,189 @@ def RamSim(dout, din, default, addr, rd, wr, clk):
     return write, read
 
 
-def test_ramrw(n=5):
+class ArrayMemory(object):
+    """Preallocated memory of raw words with a bitmap of initialized entries.
+
+    Each entry holds `dim` words (packed into one vector, word j at bits
+    j * width), stored in two's complement in an int16 (or wider) array,
+    either in RAM, in an mmap-backed file (with bitmap in `path + '.init'`),
+    or in existing arrays (e.g. shared between processes).
+    """
+
+    def __init__(self, depth, width=16, dim=1, path=None, data=None, bitmap=None):
+        self.depth = depth
+        self.width = width
+        self.dim = dim
+        dtype = np.int16 if width <= 16 else np.int32 if width <= 32 else np.int64
+        bitmap_size = (depth + 7) // 8
+
+        if data is not None:
+            self.data = data.reshape((depth, dim))
+            self.bitmap = np.zeros(bitmap_size, dtype=np.uint8) if bitmap is None else bitmap
+        elif path is None:
+            self.data = np.zeros((depth, dim), dtype=dtype)
+            self.bitmap = np.zeros(bitmap_size, dtype=np.uint8)
+        else:
+            self.data = np.memmap(path, dtype=dtype, mode='r+' if os.path.exists(path) else 'w+', shape=(depth, dim))
+            init_path = path + '.init'
+            self.bitmap = np.memmap(init_path, dtype=np.uint8, mode='r+' if os.path.exists(init_path) else 'w+', shape=(bitmap_size,))
+
+    def is_init(self, i):
+        return bool(self.bitmap[i >> 3] & (1 << (i & 7)))
+
+    def write(self, i, val):
+        """Store raw bits of packed entry."""
+        mask = (1 << self.width) - 1
+        for j in range(self.dim):
+            word = (val >> (j * self.width)) & mask
+            if word >> (self.width - 1):
+                word -= 1 << self.width
+            self.data[i, j] = word
+        self.bitmap[i >> 3] |= 1 << (i & 7)
+
+    def read(self, i, signed=True):
+        """Load raw bits of packed entry, single word as signed or unsigned integer."""
+        if self.dim == 1:
+            val = int(self.data[i, 0])
+            if not signed and val < 0:
+                val += 1 << self.width
+            return val
+
+        mask = (1 << self.width) - 1
+        val = 0
+        for j in range(self.dim):
+            val |= (int(self.data[i, j]) & mask) << (j * self.width)
+        return val
+
+    def initialized(self):
+        """Boolean mask of initialized entries."""
+        i = np.arange(self.depth)
+        return ((self.bitmap[i >> 3] >> (i & 7)) & 1).astype(bool)
+
+    def fill(self, data):
+        """Initialize all uninitialized entries from array of words (shape depth x dim)."""
+        init = self.initialized()
+        self.data[~init] = data[~init]
+        self.bitmap[:] = 0xff
+
+    def flush(self):
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+            self.bitmap.flush()
+
+
+def RamArray(dout, din, default, addr, rd, wr, clk, mem=None, path=None):
+    """Simulated RAM model using a preallocated NumPy array.
+
+    :param dout: data output
+    :param din: data input
+    :param default: default value if uninitialized address
+    :param addr: address bus
+    :param rd: read enabled, set to 0 when done
+    :param wr: write enabled, set to 0 when done
+    :param clk: clock input
+    :param mem: ArrayMemory to use, sized from address width if None
+    :param path: file for mmap-backed memory if mem is None
+    """
+
+    if mem is None:
+        mem = ArrayMemory(2**len(addr), width=len(dout), path=path)
+    signed = dout.min is not None and dout.min < 0
+
+    @always(clk.posedge)
+    def write():
+        if wr:
+            mem.write(int(addr.val), int(intbv(din.val)))
+            wr.next = False
+
+    @always(clk.posedge)
+    def read():
+        if rd:
+            i = int(addr.val)
+            if mem.is_init(i):
+                dout.next = intbv(mem.read(i, signed))
+            else:
+                dout.next = default
+            rd.next = False
+
+    return write, read
+
+
+def RamWideSim(dout_vec, din_vec, default_vec, addr, rd, wr, clk, dim, mem=None, path=None):
+    """Simulated wide-port RAM model transferring a whole vector per transaction.
+
+    :param dout_vec: data output vector of dim words
+    :param din_vec: data input vector of dim words
+    :param default_vec: default vector if uninitialized address
+    :param addr: address bus (one vector per address)
+    :param rd: read enabled, set to 0 when done
+    :param wr: write enabled, set to 0 when done
+    :param clk: clock input
+    :param dim: words per vector
+    :param mem: ArrayMemory to use, sized from address width if None
+    :param path: file for mmap-backed memory if mem is None
+    """
+
+    if mem is None:
+        mem = ArrayMemory(2**len(addr), width=len(din_vec) // dim, dim=dim, path=path)
+
+    @always(clk.posedge)
+    def write():
+        if wr:
+            mem.write(int(addr.val), int(din_vec.val))
+            wr.next = False
+
+    @always(clk.posedge)
+    def read():
+        if rd:
+            i = int(addr.val)
+            if mem.is_init(i):
+                dout_vec.next = intbv(mem.read(i, signed=False))
+            else:
+                dout_vec.next = default_vec
+            rd.next = False
+
+    return write, read
+
+
+def RamWide(dout_vec, din_vec, addr, wr, clk, depth, mem=None):
+    """Synthesizable wide-port RAM model with one vector per address.
+
+    :param dout_vec: data output vector, registered
+    :param din_vec: data input vector
+    :param addr: address bus
+    :param wr: write enabled
+    :param clk: clock input
+    :param depth: number of vectors
+    :param mem: list of depth signals to use as storage (for preloading and inspection in simulation), created if None
+    """
+
+    if mem is None:
+        mem = [ Signal(intbv(0)[len(din_vec):]) for _ in range(depth) ]
+
+    @always(clk.posedge)
+    def access():
+        if wr:
+            mem[int(addr)].next = din_vec
+        dout_vec.next = mem[int(addr)]
+
+    return access
+
+
+def test_ramrw(n=5, ram_model=RamSim):
     """Testing bench for read and write."""
 
     # signals
     dout = Signal(intbv(0)[16:])
     din = Signal(intbv(0)[16:])
-    default = Signal(intbv(0)[16:])
+    default = Signal(intbv(1)[16:])
     addr = Signal(intbv(0)[24:])
     rd = Signal(bool(False))
     wr = Signal(bool(False))
     clk = Signal(bool(True))
 
     # modules
-    ram = RamSim(dout, din, default, addr, rd, wr, clk)
+    ram = ram_model(dout, din, default, addr, rd, wr, clk)
 
     # test stimulus
     HALF_PERIOD = delay(5)
@@ -88,13 +261,106 @@ def test_ramrw(n=5):
             print "%3s read, addr: %s, dout: %s" % (now(), addr, dout)
             assert dout == (2 * i)
 
+        # read uninitialized
+        addr.next = intbv(n)
+        rd.next = True
+
+        yield rd.negedge
+        print "%3s read, addr: %s, dout: %s" % (now(), addr, dout)
+        assert dout == default
+
         raise StopSimulation()
 
     return clk_gen, stimulus, ram
 
 
+def test_ramwide(n=5, dim=3, width=16):
+    """Testing bench for wide-port read and write."""
+
+    # signals
+    dout_vec = Signal(intbv(0)[dim * width:])
+    din_vec = Signal(intbv(0)[dim * width:])
+    default_vec = Signal(intbv(1)[dim * width:])
+    addr = Signal(intbv(0)[18:])
+    rd = Signal(bool(False))
+    wr = Signal(bool(False))
+    clk = Signal(bool(True))
+
+    # modules
+    ram = RamWideSim(dout_vec, din_vec, default_vec, addr, rd, wr, clk, dim)
+
+    # test stimulus
+    HALF_PERIOD = delay(5)
+
+    @always(HALF_PERIOD)
+    def clk_gen():
+        clk.next = not clk
+
+    @instance
+    def stimulus():
+        yield clk.negedge
+
+        # write
+        for i in range(n):
+            addr.next = intbv(i)
+            din_vec.next = intbv(sum([ (2 * i + j) << (j * width) for j in range(dim) ]))
+            wr.next = True
+
+            yield wr.negedge
+            print "%3s write, addr: %s, din_vec: %s" % (now(), addr, hex(din_vec))
+
+        # read
+        for i in range(n):
+            addr.next = intbv(i)
+            rd.next = True
+
+            yield rd.negedge
+            print "%3s read, addr: %s, dout_vec: %s" % (now(), addr, hex(dout_vec))
+            assert dout_vec == sum([ (2 * i + j) << (j * width) for j in range(dim) ])
+
+        # read uninitialized
+        addr.next = intbv(n)
+        rd.next = True
+
+        yield rd.negedge
+        print "%3s read, addr: %s, dout_vec: %s" % (now(), addr, hex(dout_vec))
+        assert dout_vec == default_vec
+
+        raise StopSimulation()
+
+    return clk_gen, stimulus, ram
+
+
+def convert(target=toVerilog, directory="./ex-target", fmt=Q7_8):
+    """Convert design to Verilog or VHDL."""
+
+    dim = 3
+    fix_width = fmt.fix_width
+    depth = 16
+
+    # signals
+    dout_vec = Signal(intbv(0)[dim * fix_width:])
+    din_vec = Signal(intbv(0)[dim * fix_width:])
+    addr = Signal(intbv(0, min=0, max=depth))
+    wr = Signal(bool(False))
+    clk = Signal(bool(False))
+
+    # covert to HDL code
+    target.directory = directory
+    target(RamWide, dout_vec, din_vec, addr, wr, clk, depth)
+
+
 if __name__ == '__main__':
     # simulate design
     #test_ramrw = traceSignals(test_ramrw)
     sim = Simulation(test_ramrw())
     sim.run()
+    sim = Simulation(test_ramrw(ram_model=RamArray))
+    sim.run()
+    #test_ramwide = traceSignals(test_ramwide)
+    sim = Simulation(test_ramwide())
+    sim.run()
+
+    # convert to Verilog and VHDL
+    convert(target=toVerilog)
+    convert(target=toVHDL)
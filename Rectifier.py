@@ -10,6 +10,8 @@ __license__ = "GPLv3+"
 from myhdl import Signal, fixbv, delay, always, always_comb, instance, now
 from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
 
+from fixformat import Q7_8
+
 
 def Rectifier(y, y_dx, x, leaky_val, fix_min, fix_max, fix_res):
     """Rectified linear unit (ReLU) and derivative model using fixbv type.
@@ -46,13 +48,13 @@ def Rectifier(y, y_dx, x, leaky_val, fix_min, fix_max, fix_res):
     return relu, relu_dx
 
 
-def test_zero(n=10, step=0.5):
+def test_zero(n=10, step=0.5, fmt=Q7_8):
     """Testing bench around zero."""
 
     leaky_val = 0.01
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -88,13 +90,13 @@ def test_zero(n=10, step=0.5):
     return clk_gen, stimulus, relu
 
 
-def convert(target=toVerilog, directory="./ex-target"):
+def convert(target=toVerilog, directory="./ex-target", fmt=Q7_8):
     """Convert design to Verilog or VHDL."""
 
     leaky_val = 0.01
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Parallel array of word-context embeddings updated models fed from banked embedding memories with a conflict-free scheduler.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import random
+from myhdl import Signal, ConcatSignal, intbv, fixbv, delay, always, always_comb, instance, now
+from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
+
+from fixformat import Q7_8
+from RamSim import RamWide
+from WordContextUpdated import WordContextUpdated
+
+
+def WordContextArray(y_vec, error_vec, new_word_embv, new_context_embv, y_actual_vec, word_embv, context_embv, n_lanes, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res):
+    """Parallel array of word-context embeddings updated models (one pair per lane).
+
+    :param y_vec: return relu(dot(word_emb, context_emb)) per lane as vector of fixbv
+    :param error_vec: return MSE prediction error per lane as vector of fixbv
+    :param new_word_embv: return updated word embedding vectors per lane
+    :param new_context_embv: return updated context embedding vectors per lane
+    :param y_actual_vec: actual training value per lane as vector of fixbv
+    :param word_embv: word embedding vectors per lane
+    :param context_embv: context embedding vectors per lane
+    :param n_lanes: number of parallel lanes
+    :param embedding_dim: embedding dimensionality
+    :param leaky_val: factor for leaky ReLU, 0.0 without
+    :param rate_val: learning rate factor
+    :param fix_min: fixbv min value
+    :param fix_max: fixbv max value
+    :param fix_res: fixbv resolution
+    """
+    fix_width = len(y_actual_vec) // n_lanes
+    emb_width = embedding_dim * fix_width
+
+    # internal values
+    y_actual_list = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for i in range(n_lanes) ]
+    word_list = [ Signal(intbv(0)[emb_width:]) for i in range(n_lanes) ]
+    context_list = [ Signal(intbv(0)[emb_width:]) for i in range(n_lanes) ]
+    for i in range(n_lanes):
+        y_actual_list[i].assign(y_actual_vec((i + 1) * fix_width, i * fix_width))
+        word_list[i].assign(word_embv((i + 1) * emb_width, i * emb_width))
+        context_list[i].assign(context_embv((i + 1) * emb_width, i * emb_width))
+
+    y_list = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for i in range(n_lanes) ]
+    error_list = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for i in range(n_lanes) ]
+    new_word_list = [ Signal(intbv(0)[emb_width:]) for i in range(n_lanes) ]
+    new_context_list = [ Signal(intbv(0)[emb_width:]) for i in range(n_lanes) ]
+    y_cat = ConcatSignal(*reversed(y_list))
+    error_cat = ConcatSignal(*reversed(error_list))
+    new_word_cat = ConcatSignal(*reversed(new_word_list))
+    new_context_cat = ConcatSignal(*reversed(new_context_list))
+
+    # modules
+    lanes = [ WordContextUpdated(y_list[i], error_list[i], new_word_list[i], new_context_list[i], y_actual_list[i], word_list[i], context_list[i], embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res) for i in range(n_lanes) ]
+
+    @always_comb
+    def pack():
+        y_vec.next = y_cat
+        error_vec.next = error_cat
+        new_word_embv.next = new_word_cat
+        new_context_embv.next = new_context_cat
+
+    return lanes, pack
+
+
+def BankedRam(dout_vec, din_vec, addr_vec, wr_vec, clk, n_banks, depth, mems=None):
+    """Banked embedding memory with one wide-port RAM and one port per bank.
+
+    :param dout_vec: data output vectors per bank, registered
+    :param din_vec: data input vectors per bank
+    :param addr_vec: row addresses per bank
+    :param wr_vec: write enables per bank
+    :param clk: clock input
+    :param n_banks: number of memory banks
+    :param depth: number of rows per bank
+    :param mems: lists of depth signals per bank (see `RamWide`), created if None
+    """
+    data_width = len(din_vec) // n_banks
+    addr_width = len(addr_vec) // n_banks
+    if mems is None:
+        mems = [ None ] * n_banks
+
+    # internal values
+    dout_list = [ Signal(intbv(0)[data_width:]) for b in range(n_banks) ]
+    din_list = [ din_vec((b + 1) * data_width, b * data_width) for b in range(n_banks) ]
+    addr_list = [ addr_vec((b + 1) * addr_width, b * addr_width) for b in range(n_banks) ]
+    wr_list = [ wr_vec(b) for b in range(n_banks) ]
+    dout_cat = ConcatSignal(*reversed(dout_list)) if n_banks > 1 else dout_list[0]
+
+    # modules
+    banks = [ RamWide(dout_list[b], din_list[b], addr_list[b], wr_list[b], clk, depth, mem=mems[b]) for b in range(n_banks) ]
+
+    @always_comb
+    def pack():
+        dout_vec.next = dout_cat
+
+    return banks, pack
+
+
+def BankCrossbar(addr_vec, din_vec, wr_vec, lane_dout_vec, conflict, id_vec, valid_vec, lane_din_vec, dout_vec, wr, n_lanes, n_banks):
+    """Crossbar routing lanes to memory banks by `id % n_banks` at row `id // n_banks`.
+
+    :param addr_vec: return row addresses per bank
+    :param din_vec: return data input vectors per bank
+    :param wr_vec: return write enables per bank
+    :param lane_dout_vec: return data read per lane
+    :param conflict: return True if two valid lanes address the same bank
+    :param id_vec: embedding ids per lane
+    :param valid_vec: valid flags per lane
+    :param lane_din_vec: data to write per lane
+    :param dout_vec: data output vectors per bank
+    :param wr: write enabled for valid lanes
+    :param n_lanes: number of parallel lanes
+    :param n_banks: number of memory banks
+    """
+    id_width = len(id_vec) // n_lanes
+    addr_width = len(addr_vec) // n_banks
+    data_width = len(dout_vec) // n_banks
+
+    @always_comb
+    def route():
+        addr = intbv(0)[n_banks * addr_width:]
+        din = intbv(0)[n_banks * data_width:]
+        wrs = intbv(0)[n_banks:]
+        lane_dout = intbv(0)[n_lanes * data_width:]
+        used = intbv(0)[n_banks:]
+        clash = False
+        for b in range(n_banks):
+            for i in range(n_lanes):
+                if valid_vec[i] and id_vec[(i + 1) * id_width:i * id_width] % n_banks == b:
+                    if used[b]:
+                        clash = True
+                    used[b] = 1
+                    addr[(b + 1) * addr_width:b * addr_width] = id_vec[(i + 1) * id_width:i * id_width] // n_banks
+                    din[(b + 1) * data_width:b * data_width] = lane_din_vec[(i + 1) * data_width:i * data_width]
+                    wrs[b] = wr
+                    lane_dout[(i + 1) * data_width:i * data_width] = dout_vec[(b + 1) * data_width:b * data_width]
+        addr_vec.next = addr
+        din_vec.next = din
+        wr_vec.next = wrs
+        lane_dout_vec.next = lane_dout
+        conflict.next = clash
+
+    return route
+
+
+def WordContextArrayBanked(y_vec, error_vec, conflict, y_actual_vec, word_id_vec, context_id_vec, valid_vec, wr, clk, n_lanes, n_banks, depth, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res, word_mems=None, context_mems=None):
+    """Parallel array of word-context embeddings updated models fed from banked embedding memories.
+
+    Each issued pair takes two cycles: the lanes' rows are read from their
+    banks on the first clock edge and the updated rows written back on the
+    second (with `wr`). Word and context rows live in separate memories of
+    `n_banks` banks each, so the lanes of one issue must use distinct word
+    and distinct context banks (see `schedule_pairs`), otherwise `conflict`
+    is raised and only one of the clashing lanes reaches the bank.
+
+    :param y_vec: return relu(dot(word_emb, context_emb)) per lane as vector of fixbv
+    :param error_vec: return MSE prediction error per lane as vector of fixbv
+    :param conflict: return True on a word or context bank conflict
+    :param y_actual_vec: actual training value per lane as vector of fixbv
+    :param word_id_vec: word ids per lane
+    :param context_id_vec: context ids per lane
+    :param valid_vec: valid flags per lane
+    :param wr: write-back updated embeddings of valid lanes
+    :param clk: clock input
+    :param n_lanes: number of parallel lanes
+    :param n_banks: number of memory banks per memory
+    :param depth: number of rows per bank
+    :param embedding_dim: embedding dimensionality
+    :param leaky_val: factor for leaky ReLU, 0.0 without
+    :param rate_val: learning rate factor
+    :param fix_min: fixbv min value
+    :param fix_max: fixbv max value
+    :param fix_res: fixbv resolution
+    :param word_mems: word memory signals per bank (see `BankedRam`), created if None
+    :param context_mems: context memory signals per bank (see `BankedRam`), created if None
+    """
+    fix_width = len(y_actual_vec) // n_lanes
+    emb_width = embedding_dim * fix_width
+    addr_width = max(1, (depth - 1).bit_length())
+
+    # internal values
+    word_addr_vec = Signal(intbv(0)[n_banks * addr_width:])
+    word_din_vec = Signal(intbv(0)[n_banks * emb_width:])
+    word_dout_vec = Signal(intbv(0)[n_banks * emb_width:])
+    word_wr_vec = Signal(intbv(0)[n_banks:])
+    context_addr_vec = Signal(intbv(0)[n_banks * addr_width:])
+    context_din_vec = Signal(intbv(0)[n_banks * emb_width:])
+    context_dout_vec = Signal(intbv(0)[n_banks * emb_width:])
+    context_wr_vec = Signal(intbv(0)[n_banks:])
+
+    word_embv = Signal(intbv(0)[n_lanes * emb_width:])
+    context_embv = Signal(intbv(0)[n_lanes * emb_width:])
+    new_word_embv = Signal(intbv(0)[n_lanes * emb_width:])
+    new_context_embv = Signal(intbv(0)[n_lanes * emb_width:])
+    word_conflict = Signal(bool(False))
+    context_conflict = Signal(bool(False))
+
+    # modules
+    word_ram = BankedRam(word_dout_vec, word_din_vec, word_addr_vec, word_wr_vec, clk, n_banks, depth, mems=word_mems)
+    context_ram = BankedRam(context_dout_vec, context_din_vec, context_addr_vec, context_wr_vec, clk, n_banks, depth, mems=context_mems)
+    word_xbar = BankCrossbar(word_addr_vec, word_din_vec, word_wr_vec, word_embv, word_conflict, word_id_vec, valid_vec, new_word_embv, word_dout_vec, wr, n_lanes, n_banks)
+    context_xbar = BankCrossbar(context_addr_vec, context_din_vec, context_wr_vec, context_embv, context_conflict, context_id_vec, valid_vec, new_context_embv, context_dout_vec, wr, n_lanes, n_banks)
+    wcarray = WordContextArray(y_vec, error_vec, new_word_embv, new_context_embv, y_actual_vec, word_embv, context_embv, n_lanes, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+
+    @always_comb
+    def flag():
+        conflict.next = word_conflict or context_conflict
+
+    return word_ram, context_ram, word_xbar, context_xbar, wcarray, flag
+
+
+def schedule_pairs(word_ids, context_ids, n_lanes, n_banks=None, window=None):
+    """Assign word-context pairs to lanes without row or bank conflicts.
+
+    Embedding rows are banked by `id % n_banks` (separately for word and
+    context memories) with one port per bank. Pairs may be issued out of
+    order within a lookahead window, but never ahead of an earlier pending
+    pair touching the same row, so results equal sequential training.
+
+    :param word_ids: word id of each pair
+    :param context_ids: context id of each pair
+    :param n_lanes: number of parallel lanes
+    :param n_banks: number of memory banks, n_lanes if None
+    :param window: lookahead window of pending pairs, 4 * n_lanes if None
+    :returns: list of issued pair indices per cycle
+    """
+    n_banks = n_banks or n_lanes
+    window = window or 4 * n_lanes
+    word_ids = [ int(w) for w in word_ids ]
+    context_ids = [ int(c) for c in context_ids ]
+
+    cycles = []
+    pending = list(range(len(word_ids)))
+    while pending:
+        issued = []
+        rows_word = set()
+        rows_context = set()
+        banks_word = set()
+        banks_context = set()
+        for p in pending[:window]:
+            w = word_ids[p]
+            c = context_ids[p]
+            if w not in rows_word and c not in rows_context and w % n_banks not in banks_word and c % n_banks not in banks_context:
+                issued.append(p)
+                banks_word.add(w % n_banks)
+                banks_context.add(c % n_banks)
+            rows_word.add(w)
+            rows_context.add(c)
+            if len(issued) == n_lanes:
+                break
+
+        cycles.append(issued)
+        issued_set = set(issued)
+        pending = [ p for p in pending if p not in issued_set ]
+    return cycles
+
+
+def test_lanes(n_lanes=4, n=400, vocab_size=1000, emb_spread=0.1, skipgram=True, rand_seed=42, fmt=Q7_8):
+    """Testing bench for throughput scaling with lanes, bank conflicts and agreement with sequential training."""
+
+    import numpy as np
+    from engine import Engine
+
+    embedding_dim = 3
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+    emb_width = embedding_dim * fix_width
+    n_banks = n_lanes
+    depth = (vocab_size + n_banks - 1) // n_banks
+    id_width = max(1, (vocab_size - 1).bit_length())
+
+    # training pairs and reference results of sequential training
+    random.seed(rand_seed)
+    engine = Engine(vocab_size, embedding_dim, leaky_val, rate_val, emb_spread, fmt=fmt, rand_seed=rand_seed)
+    if skipgram:
+        doc = [ random.randrange(vocab_size) for _ in range(n // 2 + 1) ]
+        pairs_word, pairs_context, pairs_y = engine.sequence_pairs(doc, 0, n // 2)
+    else:
+        pairs_word = np.array([ random.randrange(vocab_size) for _ in range(n) ])
+        pairs_context = np.array([ random.randrange(vocab_size) for _ in range(n) ])
+        pairs_y = engine.one * np.array([ random.randrange(2) for _ in range(n) ])
+    n = len(pairs_word)
+
+    def pack(codes, width):
+        return sum([ (int(c) & ((1 << width) - 1)) << (j * width) for j, c in enumerate(codes) ])
+
+    # banked memories preloaded with initial embeddings, row id at bank id % n_banks
+    def preload(ram):
+        rows = [ pack(row, fix_width) for row in ram ] + [ 0 ] * (n_banks * depth - vocab_size)
+        return [ [ Signal(intbv(rows[a * n_banks + b])[emb_width:]) for a in range(depth) ] for b in range(n_banks) ]
+
+    word_mems = preload(engine.wram)
+    context_mems = preload(engine.cram)
+    engine.train_pairs(pairs_word, pairs_context, pairs_y)
+    schedule = schedule_pairs(pairs_word, pairs_context, n_lanes, n_banks)
+
+    # signals
+    y_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    error_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    conflict = Signal(bool(False))
+    y_actual_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    word_id_vec = Signal(intbv(0)[n_lanes * id_width:])
+    context_id_vec = Signal(intbv(0)[n_lanes * id_width:])
+    valid_vec = Signal(intbv(0)[n_lanes:])
+    wr = Signal(bool(False))
+
+    clk = Signal(bool(False))
+
+    # modules
+    wcarray = WordContextArrayBanked(y_vec, error_vec, conflict, y_actual_vec, word_id_vec, context_id_vec, valid_vec, wr, clk, n_lanes, n_banks, depth, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res, word_mems=word_mems, context_mems=context_mems)
+
+    # test stimulus
+    HALF_PERIOD = delay(5)
+
+    @always(HALF_PERIOD)
+    def clk_gen():
+        clk.next = not clk
+
+    @instance
+    def stimulus():
+        yield clk.negedge
+
+        cycles = 0
+        for issued in schedule:
+            # read embeddings from banks
+            word_id_vec.next = pack([ pairs_word[p] for p in issued ], id_width)
+            context_id_vec.next = pack([ pairs_context[p] for p in issued ], id_width)
+            y_actual_vec.next = pack([ pairs_y[p] for p in issued ], fix_width)
+            valid_vec.next = (1 << len(issued)) - 1
+            wr.next = False
+            yield clk.negedge
+            assert not conflict
+
+            # write-back updated embeddings to banks
+            wr.next = True
+            yield clk.negedge
+            cycles += 2
+
+        # issuing two lanes on the same word bank is flagged
+        if n_banks > 1:
+            word_id_vec.next = pack([ 0, n_banks ], id_width)
+            context_id_vec.next = pack([ 0, 1 ], id_width)
+            valid_vec.next = 3
+            wr.next = False
+            yield clk.negedge
+            assert conflict
+        valid_vec.next = 0
+        yield clk.negedge
+
+        mismatches = sum([ int(word_mems[i % n_banks][i // n_banks].val) != pack(engine.wram[i], fix_width) or int(context_mems[i % n_banks][i // n_banks].val) != pack(engine.cram[i], fix_width) for i in range(vocab_size) ])
+        print "%6s lanes: %d, banks: %d, pairs: %d, cycles: %d, pairs/cycle: %f, mismatched rows: %d" % (now(), n_lanes, n_banks, n, cycles, float(n) / cycles, mismatches)
+        assert mismatches == 0
+        raise StopSimulation()
+
+    return clk_gen, stimulus, wcarray
+
+
+def convert(target=toVerilog, directory="./ex-target", n_lanes=4, vocab_size=1024, fmt=Q7_8):
+    """Convert design to Verilog or VHDL."""
+
+    embedding_dim = 3
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+    n_banks = n_lanes
+    depth = (vocab_size + n_banks - 1) // n_banks
+    id_width = max(1, (vocab_size - 1).bit_length())
+
+    # signals
+    y_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    error_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    conflict = Signal(bool(False))
+    y_actual_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    word_id_vec = Signal(intbv(0)[n_lanes * id_width:])
+    context_id_vec = Signal(intbv(0)[n_lanes * id_width:])
+    valid_vec = Signal(intbv(0)[n_lanes:])
+    wr = Signal(bool(False))
+    clk = Signal(bool(False))
+
+    # covert to HDL code
+    target.directory = directory
+    target.name = "WordContextArray%d" % n_lanes
+    target(WordContextArrayBanked, y_vec, error_vec, conflict, y_actual_vec, word_id_vec, context_id_vec, valid_vec, wr, clk, n_lanes, n_banks, depth, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+    target.name = None
+
+
+def convert(target=toVerilog, directory="./ex-target", n_lanes=4, fmt=Q7_8):
+    """Convert design to Verilog or VHDL."""
+
+    embedding_dim = 3
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+    emb_width = embedding_dim * fix_width
+
+    # signals
+    y_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    error_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    new_word_embv = Signal(intbv(0)[n_lanes * emb_width:])
+    new_context_embv = Signal(intbv(0)[n_lanes * emb_width:])
+    y_actual_vec = Signal(intbv(0)[n_lanes * fix_width:])
+    word_embv = Signal(intbv(0)[n_lanes * emb_width:])
+    context_embv = Signal(intbv(0)[n_lanes * emb_width:])
+
+    # covert to HDL code
+    target.directory = directory
+    target.name = "WordContextArray%d" % n_lanes
+    target(WordContextArray, y_vec, error_vec, new_word_embv, new_context_embv, y_actual_vec, word_embv, context_embv, n_lanes, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+    target.name = None
+
+
+if __name__ == '__main__':
+    # simulate design
+    for n_lanes in [1, 2, 4, 8]:
+        #test_lanes = traceSignals(test_lanes)
+        sim = Simulation(test_lanes(n_lanes))
+        sim.run()
+
+    # convert to Verilog and VHDL
+    for n_lanes in [1, 2, 4, 8]:
+        convert(target=toVerilog, n_lanes=n_lanes)
+        convert(target=toVHDL, n_lanes=n_lanes)
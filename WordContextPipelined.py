@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Pipelined word-context embeddings updated model accepting one pair per clock.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import random
+from myhdl import Signal, intbv, fixbv, delay, always, always_comb, instance, now
+from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
+
+from fixformat import Q7_8
+from DotProduct import DotProduct
+from Rectifier import Rectifier
+
+
+def PipeReg(q, d, clk, registered):
+    """Pipeline stage register, or plain wire if not registered.
+
+    :param q: register output
+    :param d: register input
+    :param clk: clock input
+    :param registered: insert register, otherwise wire
+    """
+
+    if registered:
+        @always(clk.posedge)
+        def reg():
+            q.next = d
+    else:
+        @always_comb
+        def reg():
+            q.next = d
+
+    return reg
+
+
+def WordContextPipelined(y, error, new_word_embv, new_context_embv, out_word_id, out_context_id, out_valid, ready, y_actual, word_embv, context_embv, word_id, context_id, in_valid, clk, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res, reg_dot=True, reg_relu=True):
+    """Pipelined word-context embeddings updated model.
+
+    Stages are input register, dot product, leaky ReLU, update and output
+    register, optionally with registers after dot product and ReLU. A pair is
+    accepted every clock when `ready`. Pairs touching the same word or
+    context row as an in-flight pair are stalled until it reaches the output
+    stage, from where its updated embeddings are forwarded to the input (its
+    RAM write-back happens in the same cycle the stalled pair is accepted).
+
+    :param y: return relu(dot(word_emb, context_emb)) as fixbv
+    :param error: return MSE prediction error as fixbv
+    :param new_word_embv: return updated word embedding vector of fixbv
+    :param new_context_embv: return updated context embedding vector of fixbv
+    :param out_word_id: return word id of output pair
+    :param out_context_id: return context id of output pair
+    :param out_valid: return output pair is valid and must be written back
+    :param ready: return input pair will be accepted on next clock
+    :param y_actual: actual training value as fixbv
+    :param word_embv: word embedding vector of fixbv
+    :param context_embv: context embedding vector of fixbv
+    :param word_id: word id of input pair
+    :param context_id: context id of input pair
+    :param in_valid: input pair is valid
+    :param clk: clock input
+    :param embedding_dim: embedding dimensionality
+    :param leaky_val: factor for leaky ReLU, 0.0 without
+    :param rate_val: learning rate factor
+    :param fix_min: fixbv min value
+    :param fix_max: fixbv max value
+    :param fix_res: fixbv resolution
+    :param reg_dot: register after dot product stage
+    :param reg_relu: register after ReLU stage
+    """
+    fix_width = len(word_embv) // embedding_dim
+    id_width = len(word_id)
+
+    # internal values
+    rate = fixbv(rate_val, min=fix_min, max=fix_max, res=fix_res)
+
+    def stage_signals():
+        return dict(
+            word_embv=Signal(intbv(0)[embedding_dim * fix_width:]),
+            context_embv=Signal(intbv(0)[embedding_dim * fix_width:]),
+            y_actual=Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)),
+            word_id=Signal(intbv(0)[id_width:]),
+            context_id=Signal(intbv(0)[id_width:]),
+            valid=Signal(bool(False)),
+        )
+
+    # input stage with forwarding from output stage
+    fw_word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    fw_context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    s0 = stage_signals()
+    s0_word_embv, s0_context_embv, s0_y_actual = s0['word_embv'], s0['context_embv'], s0['y_actual']
+    s0_word_id, s0_context_id, s0_valid = s0['word_id'], s0['context_id'], s0['valid']
+
+    # dot product stage
+    d1_y_dot = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    d1_y_da_vec = Signal(intbv(0)[embedding_dim * fix_width:])
+    d1_y_db_vec = Signal(intbv(0)[embedding_dim * fix_width:])
+    s1 = stage_signals()
+    s1['y_dot'] = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    s1_word_id, s1_context_id, s1_valid = s1['word_id'], s1['context_id'], s1['valid']
+
+    # ReLU stage
+    d2_y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    d2_y_dx = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    s2 = stage_signals()
+    s2['y'] = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    s2['y_dx'] = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    s2_word_embv, s2_context_embv, s2_y_actual = s2['word_embv'], s2['context_embv'], s2['y_actual']
+    s2_word_id, s2_context_id, s2_valid = s2['word_id'], s2['context_id'], s2['valid']
+    s2_y, s2_y_dx = s2['y'], s2['y_dx']
+
+    s2_word_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for j in range(embedding_dim) ]
+    s2_context_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for j in range(embedding_dim) ]
+    for j in range(embedding_dim):
+        s2_word_emb[j].assign(s2_word_embv((j + 1) * fix_width, j * fix_width))
+        s2_context_emb[j].assign(s2_context_embv((j + 1) * fix_width, j * fix_width))
+
+    # update stage
+    d3_error = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    d3_new_word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    d3_new_context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+
+    # modules
+    @always_comb
+    def hazard():
+        stall = False
+        if s0_valid and (s0_word_id == word_id or s0_context_id == context_id):
+            stall = True
+        if s1_valid and (s1_word_id == word_id or s1_context_id == context_id):
+            stall = True
+        if s2_valid and (s2_word_id == word_id or s2_context_id == context_id):
+            stall = True
+        ready.next = not stall
+
+    @always_comb
+    def forward():
+        if out_valid and out_word_id == word_id:
+            fw_word_embv.next = new_word_embv
+        else:
+            fw_word_embv.next = word_embv
+        if out_valid and out_context_id == context_id:
+            fw_context_embv.next = new_context_embv
+        else:
+            fw_context_embv.next = context_embv
+
+    @always(clk.posedge)
+    def stage_in():
+        s0_word_embv.next = fw_word_embv
+        s0_context_embv.next = fw_context_embv
+        s0_y_actual.next = y_actual
+        s0_word_id.next = word_id
+        s0_context_id.next = context_id
+        s0_valid.next = in_valid and ready
+
+    dot = DotProduct(d1_y_dot, d1_y_da_vec, d1_y_db_vec, s0_word_embv, s0_context_embv, embedding_dim, fix_min, fix_max, fix_res)
+
+    s1_regs = [ PipeReg(s1[k], s0[k], clk, reg_dot) for k in s0 ]
+    s1_regs.append(PipeReg(s1['y_dot'], d1_y_dot, clk, reg_dot))
+
+    relu = Rectifier(d2_y, d2_y_dx, s1['y_dot'], leaky_val, fix_min, fix_max, fix_res)
+
+    s2_regs = [ PipeReg(s2[k], s1[k], clk, reg_relu) for k in s0 ]
+    s2_regs.append(PipeReg(s2_y, d2_y, clk, reg_relu))
+    s2_regs.append(PipeReg(s2_y_dx, d2_y_dx, clk, reg_relu))
+
+    @always_comb
+    def mse():
+        diff = fixbv(s2_y - s2_y_actual, min=fix_min, max=fix_max, res=fix_res)
+        d3_error.next = fixbv(diff * diff, min=fix_min, max=fix_max, res=fix_res)
+
+    @always_comb
+    def updated_word():
+        diff = fixbv(s2_y - s2_y_actual, min=fix_min, max=fix_max, res=fix_res)
+
+        for j in range(embedding_dim):
+            y_dword = fixbv(s2_y_dx * s2_context_emb[j], min=fix_min, max=fix_max, res=fix_res)
+            delta = fixbv(rate * diff * y_dword, min=fix_min, max=fix_max, res=fix_res)
+            new = fixbv(s2_word_emb[j] - delta, min=fix_min, max=fix_max, res=fix_res)
+            d3_new_word_embv.next[(j + 1) * fix_width:j * fix_width] = new[:]
+
+    @always_comb
+    def updated_context():
+        diff = fixbv(s2_y - s2_y_actual, min=fix_min, max=fix_max, res=fix_res)
+
+        for j in range(embedding_dim):
+            y_dcontext = fixbv(s2_y_dx * s2_word_emb[j], min=fix_min, max=fix_max, res=fix_res)
+            delta = fixbv(rate * diff * y_dcontext, min=fix_min, max=fix_max, res=fix_res)
+            new = fixbv(s2_context_emb[j] - delta, min=fix_min, max=fix_max, res=fix_res)
+            d3_new_context_embv.next[(j + 1) * fix_width:j * fix_width] = new[:]
+
+    @always(clk.posedge)
+    def stage_out():
+        y.next = s2_y
+        error.next = d3_error
+        new_word_embv.next = d3_new_word_embv
+        new_context_embv.next = d3_new_context_embv
+        out_word_id.next = s2_word_id
+        out_context_id.next = s2_context_id
+        out_valid.next = s2_valid
+
+    return hazard, forward, stage_in, dot, s1_regs, relu, s2_regs, mse, updated_word, updated_context, stage_out
+
+
+def test_throughput(n=200, vocab_size=64, emb_spread=0.1, skipgram=False, reg_dot=True, reg_relu=True, rand_seed=42, fmt=Q7_8):
+    """Testing bench for sustained pairs/cycle and agreement with sequential training.
+
+    Embedding memories are read before write-back in each cycle, so pairs
+    depending on the retiring pair exercise forwarding.
+    """
+
+    import numpy as np
+    from engine import Engine, fix_code
+
+    embedding_dim = 3
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+    id_width = max(1, (vocab_size - 1).bit_length())
+    mask = (1 << fix_width) - 1
+
+    # training pairs and reference results of sequential training
+    random.seed(rand_seed)
+    engine = Engine(vocab_size, embedding_dim, leaky_val, rate_val, emb_spread, fmt=fmt, rand_seed=rand_seed)
+    if skipgram:
+        doc = [ random.randrange(vocab_size) for _ in range(n // 2 + 1) ]
+        pairs_word, pairs_context, pairs_y = engine.sequence_pairs(doc, 0, n // 2)
+    else:
+        pairs_word = np.array([ random.randrange(vocab_size) for _ in range(n) ])
+        pairs_context = np.array([ random.randrange(vocab_size) for _ in range(n) ])
+        pairs_y = engine.one * np.array([ random.randrange(2) for _ in range(n) ])
+    n = len(pairs_word)
+
+    def pack(codes):
+        return sum([ (int(c) & mask) << (j * fix_width) for j, c in enumerate(codes) ])
+
+    wmem = [ pack(row) for row in engine.wram ]
+    cmem = [ pack(row) for row in engine.cram ]
+    engine.train_pairs(pairs_word, pairs_context, pairs_y)
+
+    # signals
+    y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    error = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    new_word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    new_context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    out_word_id = Signal(intbv(0)[id_width:])
+    out_context_id = Signal(intbv(0)[id_width:])
+    out_valid = Signal(bool(False))
+    ready = Signal(bool(False))
+
+    y_actual = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    word_id = Signal(intbv(0)[id_width:])
+    context_id = Signal(intbv(0)[id_width:])
+    in_valid = Signal(bool(False))
+
+    clk = Signal(bool(False))
+
+    # modules
+    wcpipe = WordContextPipelined(y, error, new_word_embv, new_context_embv, out_word_id, out_context_id, out_valid, ready, y_actual, word_embv, context_embv, word_id, context_id, in_valid, clk, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res, reg_dot, reg_relu)
+
+    # test stimulus
+    HALF_PERIOD = delay(5)
+
+    @always(HALF_PERIOD)
+    def clk_gen():
+        clk.next = not clk
+
+    @instance
+    def stimulus():
+        k = 0
+        done = 0
+        cycles = 0
+        while done < n:
+            yield clk.negedge
+            cycles += 1
+
+            # read embeddings of next pair before write-back
+            if k < n:
+                word_id.next = intbv(int(pairs_word[k]))
+                context_id.next = intbv(int(pairs_context[k]))
+                word_embv.next = intbv(wmem[int(pairs_word[k])])
+                context_embv.next = intbv(cmem[int(pairs_context[k])])
+                y_actual.next = fixbv(float(pairs_y[k] * fix_res), min=fix_min, max=fix_max, res=fix_res)
+                in_valid.next = True
+            else:
+                in_valid.next = False
+
+            # write-back of output pair
+            if out_valid:
+                wmem[int(out_word_id)] = int(new_word_embv)
+                cmem[int(out_context_id)] = int(new_context_embv)
+                done += 1
+
+            # pair accepted on clock
+            yield clk.posedge
+            if in_valid and ready:
+                k += 1
+
+        mismatches = sum([ wmem[i] != pack(engine.wram[i]) or cmem[i] != pack(engine.cram[i]) for i in range(vocab_size) ])
+        print "%6s pairs: %d, cycles: %d, pairs/cycle: %f, mismatched rows: %d" % (now(), n, cycles, float(n) / cycles, mismatches)
+        assert mismatches == 0
+        raise StopSimulation()
+
+    return clk_gen, stimulus, wcpipe
+
+
+def convert(target=toVerilog, directory="./ex-target", fmt=Q7_8):
+    """Convert design to Verilog or VHDL."""
+
+    embedding_dim = 3
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+    id_width = 18
+
+    # signals
+    y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    error = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    new_word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    new_context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    out_word_id = Signal(intbv(0)[id_width:])
+    out_context_id = Signal(intbv(0)[id_width:])
+    out_valid = Signal(bool(False))
+    ready = Signal(bool(False))
+
+    y_actual = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    word_id = Signal(intbv(0)[id_width:])
+    context_id = Signal(intbv(0)[id_width:])
+    in_valid = Signal(bool(False))
+
+    clk = Signal(bool(False))
+
+    # covert to HDL code
+    target.directory = directory
+    target(WordContextPipelined, y, error, new_word_embv, new_context_embv, out_word_id, out_context_id, out_valid, ready, y_actual, word_embv, context_embv, word_id, context_id, in_valid, clk, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+
+
+if __name__ == '__main__':
+    # simulate design
+    #test_throughput = traceSignals(test_throughput)
+    sim = Simulation(test_throughput())
+    sim.run()
+    sim = Simulation(test_throughput(skipgram=True))
+    sim.run()
+    sim = Simulation(test_throughput(reg_dot=False, reg_relu=False))
+    sim.run()
+
+    # convert to Verilog and VHDL
+    convert(target=toVerilog)
+    convert(target=toVHDL)
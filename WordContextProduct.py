@@ -10,6 +10,7 @@ __license__ = "GPLv3+"
 from myhdl import Signal, ConcatSignal, intbv, fixbv, delay, always, always_comb, instance, now
 from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
 
+from fixformat import Q7_8
 from DotProduct import DotProduct
 from Rectifier import Rectifier
 
@@ -62,15 +63,15 @@ def WordContextProduct(y, y_dword_vec, y_dcontext_vec, word_embv, context_embv,
     return dot, relu, wcprod_dword, wcprod_dcontext
 
 
-def test_dim0(n=10, step_word=0.5, step_context=0.5):
+def test_dim0(n=10, step_word=0.5, step_context=0.5, fmt=Q7_8):
     """Testing bench around zero in dimension 0."""
 
     embedding_dim = 3
     leaky_val = 0.01
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
-    fix_width = 1 + 7 + 8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -116,15 +117,15 @@ def test_dim0(n=10, step_word=0.5, step_context=0.5):
     return clk_gen, stimulus, wcprod
 
 
-def convert(target=toVerilog, directory="./ex-target"):
+def convert(target=toVerilog, directory="./ex-target", fmt=Q7_8):
     """Convert design to Verilog or VHDL."""
 
     embedding_dim = 3
     leaky_val = 0.01
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
-    fix_width = 1 + 7 + 8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
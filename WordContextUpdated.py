@@ -11,6 +11,7 @@ import random
 from myhdl import Signal, ConcatSignal, intbv, fixbv, delay, always, always_comb, instance, now
 from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
 
+from fixformat import Q7_8
 from WordContextProduct import WordContextProduct
 
 
@@ -82,16 +83,16 @@ def WordContextUpdated(y, error, new_word_embv, new_context_embv, y_actual, word
     return wcprod, mse, updated_word, updated_context
 
 
-def test_dim0(n=10, step_word=0.5, step_context=0.5):
+def test_dim0(n=10, step_word=0.5, step_context=0.5, fmt=Q7_8):
     """Testing bench around zero in dimension 0."""
 
     embedding_dim = 3
     leaky_val = 0.01
     rate_val = 0.1
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
-    fix_width = 1 + 7 + 8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -139,16 +140,16 @@ def test_dim0(n=10, step_word=0.5, step_context=0.5):
     return clk_gen, stimulus, wcupdated
 
 
-def test_converge(n=50, emb_spread=0.1, rand_seed=42):
+def test_converge(n=50, emb_spread=0.1, rand_seed=42, fmt=Q7_8):
     """Testing bench for covergence."""
 
     embedding_dim = 3
     leaky_val = 0.01
     rate_val = 0.1
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
-    fix_width = 1 + 7 + 8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -207,16 +208,16 @@ def test_converge(n=50, emb_spread=0.1, rand_seed=42):
     return clk_gen, stimulus, wcupdated
 
 
-def convert(target=toVerilog, directory="./ex-target"):
+def convert(target=toVerilog, directory="./ex-target", fmt=Q7_8):
     """Convert design to Verilog or VHDL."""
 
     embedding_dim = 3
     leaky_val = 0.01
     rate_val = 0.1
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
-    fix_width = 1 + 7 + 8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Word-context embeddings updated model on raw integer codes of fixed-point numbers.
+
+Same datapath as DotProduct, Rectifier, WordContextProduct and
+WordContextUpdated, but computed on scaled integers (intbv) with explicit
+shifts, rounding half away from zero and saturation instead of allocating
+fixbv objects, bit for bit identical to the fixbv models and engine.py.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import math
+import random
+from myhdl import Signal, intbv, delay, always, always_comb, instance, now
+from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
+
+from engine import Engine
+from fixformat import Q7_8, fix_code
+
+# bound of shifted values before saturation in round_saturate()
+SHIFTED_MAX = 2**63
+
+
+def round_saturate(x, shift, code_min, code_max):
+    """Shift code x right rounding half away from zero and saturate to [code_min, code_max].
+
+    Convertible function called inside always_comb blocks (a Verilog or
+    VHDL function per call site), same as engine.round_shift and saturate.
+    """
+    # integer variables, so conversion casts them to the width of r
+    half = 2**(shift - 1)
+    lo = code_min
+    hi = code_max
+    r = intbv(0, min=-SHIFTED_MAX, max=SHIFTED_MAX)
+    if x < 0:
+        r[:] = -((half - x) >> shift)
+    else:
+        r[:] = (x + half) >> shift
+    if r > hi:
+        r[:] = hi
+    elif r < lo:
+        r[:] = lo
+    return r
+
+
+def saturate(x, code_min, code_max):
+    """Saturate code x to [code_min, code_max] (convertible, see round_saturate)."""
+    lo = code_min
+    hi = code_max
+    r = intbv(0, min=-SHIFTED_MAX, max=SHIFTED_MAX)
+    if x > hi:
+        r[:] = hi
+    elif x < lo:
+        r[:] = lo
+    else:
+        r[:] = x
+    return r
+
+
+def DotProductInt(y, y_da_vec, y_db_vec, a_vec, b_vec, dim, fix_min, fix_max, fix_res):
+    """Vector dot product and derivative model on integer codes.
+
+    :param y: return dot(a_vec, b_vec) as signed intbv code
+    :param y_da_vec: return d/da dot(a_vec, b_vec) as vector of codes
+    :param y_db_vec: return d/db dot(a_vec, b_vec) as vector of codes
+    :param a_vec: vector of codes
+    :param b_vec: vector of codes
+    :param dim: vector dimensionality
+    :param fix_min: fixbv min value
+    :param fix_max: fixbv max value
+    :param fix_res: fixbv resolution
+    """
+    fix_width = len(a_vec) // dim
+    frac_bits = int(round(-math.log(fix_res, 2)))
+    code_min = int(fix_code(fix_min, fix_res))
+    code_max = int(fix_code(fix_max, fix_res)) - 1
+    sum_max = dim * 2**(2 * fix_width - 2)
+
+    # modules
+    @always_comb
+    def dot():
+        y_sum = intbv(0, min=-sum_max, max=sum_max + 1)
+        for j in range(dim):
+            y_sum[:] = y_sum + a_vec[(j + 1) * fix_width:j * fix_width].signed() * b_vec[(j + 1) * fix_width:j * fix_width].signed()
+        y.next = round_saturate(y_sum, frac_bits, code_min, code_max)
+
+    @always_comb
+    def dot_da():
+        y_da_vec.next = b_vec
+
+    @always_comb
+    def dot_db():
+        y_db_vec.next = a_vec
+
+    return dot, dot_da, dot_db
+
+
+def RectifierInt(y, y_dx, x, leaky_val, fix_min, fix_max, fix_res):
+    """Rectified linear unit (ReLU) and derivative model on integer codes.
+
+    :param y: return max(0, x) as signed intbv code
+    :param y_dx: return d/dx max(0, x) as signed intbv code
+    :param x: input value as signed intbv code
+    :param leaky_val: factor for leaky ReLU, 0.0 without
+    :param fix_min: fixbv min value
+    :param fix_max: fixbv max value
+    :param fix_res: fixbv resolution
+    """
+    frac_bits = int(round(-math.log(fix_res, 2)))
+    code_min = int(fix_code(fix_min, fix_res))
+    code_max = int(fix_code(fix_max, fix_res)) - 1
+
+    # internal values
+    one = int(fix_code(1.0, fix_res))
+    leaky = int(fix_code(leaky_val, fix_res))
+    prod_max = 2 * code_max * code_max
+
+    # modules
+    @always_comb
+    def relu():
+        prod = intbv(0, min=-prod_max, max=prod_max + 1)
+        if x > 0:
+            y.next = x
+        else:
+            prod[:] = leaky * x
+            y.next = round_saturate(prod, frac_bits, code_min, code_max)
+
+    @always_comb
+    def relu_dx():
+        if x > 0:
+            y_dx.next = one
+        else:
+            y_dx.next = leaky
+
+    return relu, relu_dx
+
+
+def WordContextProductInt(y, y_dword_vec, y_dcontext_vec, word_embv, context_embv, embedding_dim, leaky_val, fix_min, fix_max, fix_res):
+    """Word-context embeddings product and derivative model on integer codes.
+
+    :param y: return relu(dot(word_emb, context_emb)) as signed intbv code
+    :param y_dword_vec: return d/dword relu(dot(word_emb, context_emb)) as vector of codes
+    :param y_dcontext_vec: return d/dcontext relu(dot(word_emb, context_emb)) as vector of codes
+    :param word_embv: word embedding vector of codes
+    :param context_embv: context embedding vector of codes
+    :param embedding_dim: embedding dimensionality
+    :param leaky_val: factor for leaky ReLU, 0.0 without
+    :param fix_min: fixbv min value
+    :param fix_max: fixbv max value
+    :param fix_res: fixbv resolution
+    """
+    fix_width = len(word_embv) // embedding_dim
+    frac_bits = int(round(-math.log(fix_res, 2)))
+    code_min = int(fix_code(fix_min, fix_res))
+    code_max = int(fix_code(fix_max, fix_res)) - 1
+    prod_max = 2 * code_max * code_max
+
+    # internal values
+    y_dot = Signal(intbv(0, min=code_min, max=code_max + 1))
+    y_dot_dword_vec = Signal(intbv(0)[embedding_dim * fix_width:])
+    y_dot_dcontext_vec = Signal(intbv(0)[embedding_dim * fix_width:])
+    y_relu = y
+    y_relu_dx = Signal(intbv(0, min=code_min, max=code_max + 1))
+
+    # modules
+    dot = DotProductInt(y_dot, y_dot_dword_vec, y_dot_dcontext_vec, word_embv, context_embv, embedding_dim, fix_min, fix_max, fix_res)
+
+    relu = RectifierInt(y_relu, y_relu_dx, y_dot, leaky_val, fix_min, fix_max, fix_res)
+
+    @always_comb
+    def wcprod_dword():
+        prod = intbv(0, min=-prod_max, max=prod_max + 1)
+        for j in range(embedding_dim):
+            prod[:] = y_relu_dx * y_dot_dword_vec[(j + 1) * fix_width:j * fix_width].signed()
+            prod[:] = round_saturate(prod, frac_bits, code_min, code_max)
+            y_dword_vec.next[(j + 1) * fix_width:j * fix_width] = prod[fix_width:]
+
+    @always_comb
+    def wcprod_dcontext():
+        prod = intbv(0, min=-prod_max, max=prod_max + 1)
+        for j in range(embedding_dim):
+            prod[:] = y_relu_dx * y_dot_dcontext_vec[(j + 1) * fix_width:j * fix_width].signed()
+            prod[:] = round_saturate(prod, frac_bits, code_min, code_max)
+            y_dcontext_vec.next[(j + 1) * fix_width:j * fix_width] = prod[fix_width:]
+
+    return dot, relu, wcprod_dword, wcprod_dcontext
+
+
+def WordContextUpdatedInt(y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res):
+    """Word-context embeddings updated model on integer codes.
+
+    :param y: return relu(dot(word_emb, context_emb)) as signed intbv code
+    :param error: return MSE prediction error as signed intbv code
+    :param new_word_embv: return updated word embedding vector of codes
+    :param new_context_embv: return updated context embedding vector of codes
+    :param y_actual: actual training value as signed intbv code
+    :param word_embv: word embedding vector of codes
+    :param context_embv: context embedding vector of codes
+    :param embedding_dim: embedding dimensionality
+    :param leaky_val: factor for leaky ReLU, 0.0 without
+    :param rate_val: learning rate factor
+    :param fix_min: fixbv min value
+    :param fix_max: fixbv max value
+    :param fix_res: fixbv resolution
+    """
+    fix_width = len(word_embv) // embedding_dim
+    frac_bits = int(round(-math.log(fix_res, 2)))
+    code_min = int(fix_code(fix_min, fix_res))
+    code_max = int(fix_code(fix_max, fix_res)) - 1
+    prod_max = 2 * code_max * code_max
+    delta_max = 2 * code_max * code_max * code_max
+
+    # internal values
+    rate = int(fix_code(rate_val, fix_res))
+
+    y_dword_vec = Signal(intbv(0)[embedding_dim * fix_width:])
+    y_dcontext_vec = Signal(intbv(0)[embedding_dim * fix_width:])
+    diff = Signal(intbv(0, min=code_min, max=code_max + 1))
+
+    # modules
+    wcprod = WordContextProductInt(y, y_dword_vec, y_dcontext_vec, word_embv, context_embv, embedding_dim, leaky_val, fix_min, fix_max, fix_res)
+
+    @always_comb
+    def mse_diff():
+        sub = intbv(0, min=2 * code_min, max=2 * code_max + 1)
+        sub[:] = y - y_actual
+        diff.next = saturate(sub, code_min, code_max)
+
+    @always_comb
+    def mse():
+        prod = intbv(0, min=-prod_max, max=prod_max + 1)
+        prod[:] = diff * diff
+        error.next = round_saturate(prod, frac_bits, code_min, code_max)
+
+    @always_comb
+    def updated_word():
+        delta = intbv(0, min=-delta_max, max=delta_max + 1)
+        new = intbv(0, min=-2 * prod_max, max=2 * prod_max + 1)
+        for j in range(embedding_dim):
+            delta[:] = rate * diff * y_dword_vec[(j + 1) * fix_width:j * fix_width].signed()
+            delta[:] = round_saturate(delta, 2 * frac_bits, code_min, code_max)
+            new[:] = word_embv[(j + 1) * fix_width:j * fix_width].signed() - delta
+            new[:] = saturate(new, code_min, code_max)
+            new_word_embv.next[(j + 1) * fix_width:j * fix_width] = new[fix_width:]
+
+    @always_comb
+    def updated_context():
+        delta = intbv(0, min=-delta_max, max=delta_max + 1)
+        new = intbv(0, min=-2 * prod_max, max=2 * prod_max + 1)
+        for j in range(embedding_dim):
+            delta[:] = rate * diff * y_dcontext_vec[(j + 1) * fix_width:j * fix_width].signed()
+            delta[:] = round_saturate(delta, 2 * frac_bits, code_min, code_max)
+            new[:] = context_embv[(j + 1) * fix_width:j * fix_width].signed() - delta
+            new[:] = saturate(new, code_min, code_max)
+            new_context_embv.next[(j + 1) * fix_width:j * fix_width] = new[fix_width:]
+
+    return wcprod, mse_diff, mse, updated_word, updated_context
+
+
+def WordContextUpdatedFix(y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res):
+    """Word-context embeddings updated model on integer codes with fixbv ports (same interface as WordContextUpdated).
+
+    Only y, error and y_actual are converted at the boundary, embedding
+    vectors are already raw codes.
+    """
+    from myhdl import fixbv
+
+    code_min = int(fix_code(fix_min, fix_res))
+    code_max = int(fix_code(fix_max, fix_res)) - 1
+
+    # integer codes at boundary
+    y_code = Signal(intbv(0, min=code_min, max=code_max + 1))
+    error_code = Signal(intbv(0, min=code_min, max=code_max + 1))
+    y_actual_code = Signal(intbv(0, min=code_min, max=code_max + 1))
+
+    # modules
+    wcupdated = WordContextUpdatedInt(y_code, error_code, new_word_embv, new_context_embv, y_actual_code, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+
+    @always_comb
+    def to_code():
+        y_actual_code.next = y_actual[:].signed()
+
+    @always_comb
+    def from_code():
+        y.next = fixbv(int(y_code) * fix_res, min=fix_min, max=fix_max, res=fix_res)
+        error.next = fixbv(int(error_code) * fix_res, min=fix_min, max=fix_max, res=fix_res)
+
+    return wcupdated, to_code, from_code
+
+
+def test_reference(n=200, emb_range=1.0, rand_seed=42, fmt=Q7_8):
+    """Testing bench comparing random pairs bit for bit with the NumPy reference engine and the fixbv model.
+
+    The comparison with WordContextUpdated is skipped if the fixbv branch of MyHDL is not installed.
+    """
+
+    embedding_dim = 3
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+    code_min = int(fix_code(fix_min, fix_res))
+    code_max = int(fix_code(fix_max, fix_res)) - 1
+    ref = Engine(1, embedding_dim, leaky_val, rate_val, fmt=fmt)
+
+    # signals
+    y = Signal(intbv(0, min=code_min, max=code_max + 1))
+    error = Signal(intbv(0, min=code_min, max=code_max + 1))
+    new_word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    new_context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+
+    y_actual = Signal(intbv(0, min=code_min, max=code_max + 1))
+    word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+
+    clk = Signal(bool(False))
+
+    # modules
+    wcupdated = WordContextUpdatedInt(y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+
+    # fixbv model on the same operands
+    try:
+        from myhdl import fixbv
+        from WordContextUpdated import WordContextUpdated
+    except ImportError:
+        fixbv = None
+        print "fixbv branch of MyHDL not installed, comparison with WordContextUpdated skipped"
+    if fixbv is not None:
+        y_fix = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+        error_fix = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+        new_word_fix = Signal(intbv(0)[embedding_dim * fix_width:])
+        new_context_fix = Signal(intbv(0)[embedding_dim * fix_width:])
+        y_actual_fix = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+
+        wcupdated = [wcupdated, WordContextUpdated(y_fix, error_fix, new_word_fix, new_context_fix, y_actual_fix, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)]
+
+    # test stimulus
+    random.seed(rand_seed)
+    HALF_PERIOD = delay(5)
+
+    @always(HALF_PERIOD)
+    def clk_gen():
+        clk.next = not clk
+
+    def pack(codes):
+        return sum([ (code & (2**fix_width - 1)) << (j * fix_width) for j, code in enumerate(codes) ])
+
+    def unpack(vec):
+        return [ vec[(j + 1) * fix_width:j * fix_width].signed() for j in range(embedding_dim) ]
+
+    @instance
+    def stimulus():
+        yield clk.negedge
+
+        for i in range(n):
+            # new values, some far out of range to saturate
+            spread = emb_range if i % 4 else 16 * emb_range
+            word = [ max(min(int(fix_code(random.uniform(-spread, spread), fix_res)), code_max), code_min) for _ in range(embedding_dim) ]
+            context = [ max(min(int(fix_code(random.uniform(-spread, spread), fix_res)), code_max), code_min) for _ in range(embedding_dim) ]
+            actual = ref.one if i % 2 else ref.zero
+            word_embv.next = pack(word)
+            context_embv.next = pack(context)
+            y_actual.next = actual
+            if fixbv is not None:
+                y_actual_fix.next = fixbv(actual * fix_res, min=fix_min, max=fix_max, res=fix_res)
+
+            yield clk.negedge
+            expect = ref.word_context_updated([word], [context], [actual])
+            result = (int(y), int(error), unpack(new_word_embv), unpack(new_context_embv))
+            assert result == (int(expect[0][0]), int(expect[1][0]), expect[2][0].tolist(), expect[3][0].tolist()), (i, result, expect)
+            if fixbv is not None:
+                result_fix = (y_fix[:].signed(), error_fix[:].signed(), unpack(new_word_fix), unpack(new_context_fix))
+                assert result_fix == result, (i, result_fix, result)
+        print "%6s bit-exact pairs: %d%s" % (now(), n, "" if fixbv is None else " (also fixbv model)")
+
+        raise StopSimulation()
+
+    return clk_gen, stimulus, wcupdated
+
+
+def convert(target=toVerilog, directory="./ex-target", fmt=Q7_8):
+    """Convert design to Verilog or VHDL."""
+
+    embedding_dim = 3
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+    code_min = int(fix_code(fix_min, fix_res))
+    code_max = int(fix_code(fix_max, fix_res)) - 1
+
+    # signals
+    y = Signal(intbv(0, min=code_min, max=code_max + 1))
+    error = Signal(intbv(0, min=code_min, max=code_max + 1))
+    new_word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    new_context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+
+    y_actual = Signal(intbv(0, min=code_min, max=code_max + 1))
+    word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+
+    # covert to HDL code
+    target.directory = directory
+    target(WordContextUpdatedInt, y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+
+
+if __name__ == '__main__':
+    # simulate design
+    #test_reference = traceSignals(test_reference)
+    sim = Simulation(test_reference())
+    sim.run()
+
+    # convert to Verilog and VHDL
+    convert(target=toVerilog)
+    convert(target=toVHDL)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Benchmark harness for HDL components and end-to-end training.
+
+Runs each component testing bench and the full training stimulus on a fixed
+synthetic corpus with a fixed seed, each in its own process, and reports
+simulated cycles, wall time, pairs/s and peak memory increase as JSON. The
+compare command flags regressions against a stored baseline.
+
+Usage:
+
+    python benchmark.py run -o bench.json
+    python benchmark.py compare baseline.json bench.json
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import argparse
+import functools
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import Queue
+import random
+import resource
+import sys
+import time
+import traceback
+import numpy as np
+
+# clock period of all testing benches (HALF_PERIOD = delay(5))
+CLOCK_PERIOD = 10
+RAND_SEED = 42
+
+# compared metrics, sign of regression and absolute change ignored as noise
+COMPARE_METRICS = [('cycles', 1, 0), ('seconds', 1, 0), ('peak_delta_mb', 1, 1.0), ('pairs_per_s', -1, 0)]
+
+# simulated cycles of each simulation of current benchmark
+_cycles = []
+
+
+def synthetic_corpus(n_words, vocab_size, rand_seed=RAND_SEED):
+    """Fixed synthetic corpus with Zipf-distributed word ids (ids start with 1)."""
+    rng = np.random.RandomState(rand_seed)
+    return [ (1 + (rng.zipf(1.3, size=n_words) - 1) % (vocab_size - 1)).astype(np.uint32) ]
+
+
+def _record_cycles():
+    """Record simulated cycles of the simulation that just finished (time restarts with each Simulation)."""
+    from myhdl import now
+    _cycles.append(now() // CLOCK_PERIOD)
+
+
+def _simulate(module, bench, **kwargs):
+    from myhdl import Simulation
+    sim = Simulation(getattr(importlib.import_module(module), bench)(**kwargs))
+    sim.run(quiet=1)
+    _record_cycles()
+
+
+def bench_train(n_words=200, vocab_size=1000, negative=1, backend='python', stimulus='python'):
+    """Full MyHDL training stimulus for one epoch, returns number of pairs."""
+    import train
+    from metrics import Metrics
+
+    metrics = Metrics()
+    train.run(synthetic_corpus(n_words, vocab_size), [], vocab_size, n_passes=1, negative=negative, metrics=metrics, backend=backend, stimulus=stimulus)
+    _record_cycles()
+    return metrics.pairs
+
+
+def bench_engine(n_words=50000, vocab_size=10000, negative=1):
+    """NumPy reference engine for one epoch, returns number of pairs."""
+    import engine
+
+    return engine.run(synthetic_corpus(n_words, vocab_size), [], vocab_size, n_passes=1, rand_seed=RAND_SEED, negative=negative).pairs
+
+
+def bench_tokenizer(n_words=500000, keras=False):
+    """Tokenize synthetic text into ids with Keras or single-pass tokenizer."""
+    import tokenizer
+
+    docs = [tokenizer.synthetic_text(n_words)]
+    if keras:
+        tokenizer.keras_docs(docs)
+    else:
+        tokenizer.Tokenizer().fit_docs(docs)
+
+
+# name, function returning number of pairs or None
+BENCHMARKS = [
+    ('Rectifier.test_zero', functools.partial(_simulate, 'Rectifier', 'test_zero')),
+    ('DotProduct.test_dim0', functools.partial(_simulate, 'DotProduct', 'test_dim0')),
+    ('WordContextProduct.test_dim0', functools.partial(_simulate, 'WordContextProduct', 'test_dim0')),
+    ('WordContextUpdated.test_dim0', functools.partial(_simulate, 'WordContextUpdated', 'test_dim0')),
+    ('WordContextUpdated.test_converge', functools.partial(_simulate, 'WordContextUpdated', 'test_converge')),
+    ('WordContextUpdatedInt.test_reference', functools.partial(_simulate, 'WordContextUpdatedInt', 'test_reference')),
+    ('WordContextPipelined.test_throughput', functools.partial(_simulate, 'WordContextPipelined', 'test_throughput')),
+    ('WordContextArray.test_lanes', functools.partial(_simulate, 'WordContextArray', 'test_lanes')),
+    ('RamSim.test_ramrw', functools.partial(_simulate, 'RamSim', 'test_ramrw', n=100)),
+    ('RamSim.test_ramwide', functools.partial(_simulate, 'RamSim', 'test_ramwide', n=100)),
+    ('sampling.test_lfsr', functools.partial(_simulate, 'sampling', 'test_lfsr', n=1000)),
+    ('train.train', bench_train),
+    ('stimulus.test_rom', functools.partial(_simulate, 'stimulus', 'test_rom')),
+    ('train.train batched', functools.partial(bench_train, stimulus='batched')),
+    ('train.train int', functools.partial(bench_train, backend='int')),
+    ('train.train cosim', functools.partial(bench_train, backend='cosim')),
+    ('engine.run', bench_engine),
+    ('tokenizer.keras', functools.partial(bench_tokenizer, keras=True)),
+    ('tokenizer.single-pass', bench_tokenizer),
+]
+
+
+def _run_one(name, func, queue):
+    """Run one benchmark in a child process with stdout silenced."""
+    random.seed(RAND_SEED)
+    np.random.seed(RAND_SEED)
+    stdout = sys.stdout
+    result = {}
+    del _cycles[:]
+    try:
+        sys.stdout = open(os.devnull, 'w')
+        mem_0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        time_0 = time.time()
+        pairs = func()
+        seconds = time.time() - time_0
+
+        result['seconds'] = seconds
+        # peak of child includes memory inherited from parent, only its increase is reported
+        result['peak_delta_mb'] = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - mem_0) / 1024.0
+        if _cycles:
+            result['cycles'] = sum(_cycles)
+        if pairs is not None:
+            result['pairs'] = pairs
+            result['pairs_per_s'] = pairs / max(seconds, 1e-9)
+    except Exception:  # pylint: disable=W0703
+        result['error'] = traceback.format_exc().strip().split("\n")[-1]
+    finally:
+        sys.stdout = stdout
+    queue.put((name, result))
+
+
+def _wait_result(proc, queue, poll=1.0):
+    """Result of benchmark process, or error if it exited without one (e.g. killed)."""
+    while True:
+        try:
+            return queue.get(timeout=poll)[1]
+        except Queue.Empty:
+            if not proc.is_alive():
+                try:
+                    return queue.get(timeout=poll)[1]
+                except Queue.Empty:
+                    return {'error': "process exited with code {}".format(proc.exitcode)}
+
+
+def run(names=None):
+    """Run benchmarks (all if names is None), each in a new process.
+
+    :returns: dict with meta data and results by benchmark name
+    """
+    results = {}
+    for name, func in BENCHMARKS:
+        if names and name not in names:
+            continue
+        queue = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=_run_one, args=(name, func, queue))
+        proc.start()
+        result = _wait_result(proc, queue)
+        proc.join()
+        results[name] = result
+        print_result(name, result)
+
+    meta = {
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': RAND_SEED,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def print_result(name, result):
+    if 'error' in result:
+        print "%-40s error: %s" % (name, result['error'])
+        return
+    print "%-40s cycles: %8s, seconds: %8.3f, pairs/s: %10s, peak: %+7.1fMB" % (name, result.get('cycles', "-"), result['seconds'], "%.0f" % result['pairs_per_s'] if 'pairs_per_s' in result else "-", result['peak_delta_mb'])
+
+
+def compare(baseline, current, threshold=0.1):
+    """Compare benchmark results against baseline.
+
+    Flags more simulated cycles, wall time or peak memory increase, or fewer pairs/s,
+    by more than threshold (relative), and benchmarks that started failing.
+    Peak memory changes under 1 MB are ignored (see COMPARE_METRICS).
+
+    :returns: list of (benchmark name, metric, baseline value, current value)
+    """
+    regressions = []
+    for name, base in sorted(baseline['results'].items()):
+        cur = current['results'].get(name)
+        if cur is None or 'error' in base:
+            continue
+        if 'error' in cur:
+            regressions.append((name, 'error', None, cur['error']))
+            continue
+        for metric, sign, floor in COMPARE_METRICS:
+            if metric not in base or metric not in cur or abs(cur[metric] - base[metric]) <= floor:
+                continue
+            limit = base[metric] * (1.0 + sign * threshold)
+            if (sign > 0 and cur[metric] > limit) or (sign < 0 and cur[metric] < limit):
+                regressions.append((name, metric, base[metric], cur[metric]))
+    return regressions
+
+
+if __name__ == '__main__':
+    # parse arguments
+    argp = argparse.ArgumentParser(description=__doc__.strip().split("\n", 1)[0])
+    subp = argp.add_subparsers(dest='command')
+    runp = subp.add_parser('run', help="run benchmarks and store results as JSON")
+    runp.add_argument('names', nargs='*',
+        help="benchmarks to run, all if none: {}".format(", ".join([ n for n, _ in BENCHMARKS ])))
+    runp.add_argument('-o', '--output', default="bench.json",
+        help="JSON file for results")
+    cmpp = subp.add_parser('compare', help="flag regressions against a baseline")
+    cmpp.add_argument('baseline',
+        help="JSON file of baseline results")
+    cmpp.add_argument('current',
+        help="JSON file of current results")
+    cmpp.add_argument('--threshold', type=float, default=0.1,
+        help="relative change considered a regression")
+    args = argp.parse_args()
+
+    if args.command == 'run':
+        bench = run(args.names)
+        with open(args.output, 'w') as f:
+            json.dump(bench, f, indent=2, sort_keys=True)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        for name, metric, base, cur in regressions:
+            print "REGRESSION %-40s %-12s baseline: %s, current: %s" % (name, metric, base, cur)
+        print "%d regressions in %d benchmarks" % (len(regressions), len(current['results']))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Compact binary checkpoints of embedding memories and training position.
+
+Checkpoint file layout:
+
+- magic `SGCK`, little-endian uint32 format version and uint32 header length
+- JSON header with training state and shapes/dtypes of arrays
+- raw arrays in order of header (word and context embeddings, optional bitmaps of initialized entries)
+
+Checkpoints are written to a temporary file and renamed, so a preempted
+job always leaves the previous complete checkpoint behind.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import json
+import os
+import struct
+import numpy as np
+
+CHECKPOINT_MAGIC = b"SGCK"
+CHECKPOINT_VERSION = 1
+ARRAY_NAMES = ['wram', 'cram', 'wram_bitmap', 'cram_bitmap']
+
+
+def save(path, state, wram, cram, wram_bitmap=None, cram_bitmap=None):
+    """Write checkpoint of embedding memories and training state.
+
+    :param state: JSON-serializable training state (epoch, doc, position, pairs, ...)
+    """
+    arrays = dict(zip(ARRAY_NAMES, [wram, cram, wram_bitmap, cram_bitmap]))
+    header = {
+        'state': state,
+        'arrays': [ [name, np.asarray(arrays[name]).dtype.str, list(np.shape(arrays[name]))] for name in ARRAY_NAMES if arrays[name] is not None ],
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(CHECKPOINT_MAGIC + struct.pack('<II', CHECKPOINT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, _, _ in header['arrays']:
+            np.ascontiguousarray(arrays[name]).tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(tmp_path, path)
+
+
+def load(path):
+    """Load checkpoint if it exists.
+
+    :returns: state and dict of arrays by name or None if missing
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        magic = f.read(len(CHECKPOINT_MAGIC))
+        version, header_len = struct.unpack('<II', f.read(8))
+        if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+            raise ValueError("unsupported checkpoint format: {}".format(path))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+
+        arrays = {}
+        for name, dtype, shape in header['arrays']:
+            dtype = np.dtype(str(dtype))
+            count = int(np.prod(shape))
+            arrays[str(name)] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+    return header['state'], arrays
+
+
+def check_params(path, state, params):
+    """Reject checkpoint written with different training parameters.
+
+    Parameters missing in state (checkpoints of older versions) are not checked.
+
+    :param state: training state of loaded checkpoint
+    :param params: dict of training parameters of current run (window, negative, dataset fingerprint, ...)
+    :raises ValueError: on first mismatched parameter
+    """
+    for key in sorted(params):
+        if key in state and state[key] != params[key]:
+            raise ValueError("checkpoint '{}' has {} {}, not {} (training options or corpus changed)".format(path, key, state[key], params[key]))
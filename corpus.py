@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Cached binary token-id corpus format with memory-mapped loading.
+
+Cache files next to the dataset:
+
+- `<dataset>.ids` - token ids of all documents as little-endian uint32
+- `<dataset>.vocab` - binary vocabulary with counts (see `vocab.Vocabulary`)
+- `<dataset>.header` - JSON header with format version, hash of source corpus and document offsets
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import hashlib
+import json
+import os
+import numpy as np
+
+from vocab import Vocabulary
+
+CACHE_VERSION = 2
+ID_DTYPE = np.dtype('<u4')
+
+
+def cache_paths(dataset_path):
+    """Paths of ids, vocabulary and header files of cache."""
+    return dataset_path + ".ids", dataset_path + ".vocab", dataset_path + ".header"
+
+
+def source_hash(dataset_path, block_size=2**20):
+    """SHA-1 hash of source corpus file."""
+    h = hashlib.sha1()
+    with open(dataset_path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def save_cache(dataset_path, x_vocab, doc_ids, vocab, nb_words=None, min_count=1, unk=False):
+    """Write cache of token ids and vocabulary for dataset."""
+    ids_path, vocab_path, header_path = cache_paths(dataset_path)
+
+    docs = []
+    offset = 0
+    with open(ids_path, 'wb') as f:
+        for doc_id, doc in zip(doc_ids, x_vocab):
+            np.asarray(doc, dtype=ID_DTYPE).tofile(f)
+            docs.append([doc_id, offset, len(doc)])
+            offset += len(doc)
+
+    vocab.save(vocab_path)
+
+    header = {
+        'version': CACHE_VERSION,
+        'source_sha1': source_hash(dataset_path),
+        'nb_words': nb_words,
+        'min_count': min_count,
+        'unk': unk,
+        'vocab_size': len(vocab),
+        'dtype': ID_DTYPE.str,
+        'docs': docs,
+    }
+    # header last, so incomplete caches are never valid
+    with open(header_path, 'wb') as f:
+        json.dump(header, f)
+
+
+def load_cache(dataset_path, nb_words=None, min_count=1, unk=False):
+    """Load cache for dataset if valid, with token ids memory-mapped.
+
+    :returns: x_vocab, doc_ids, vocabulary or None if missing or stale
+    """
+    ids_path, vocab_path, header_path = cache_paths(dataset_path)
+    if not all([ os.path.exists(p) for p in cache_paths(dataset_path) ]):
+        return None
+
+    with open(header_path, 'rb') as f:
+        header = json.load(f)
+    if header.get('version') != CACHE_VERSION or header.get('nb_words') != nb_words or header.get('min_count') != min_count or header.get('unk') != unk or header.get('source_sha1') != source_hash(dataset_path):
+        return None
+
+    vocab = Vocabulary.load(vocab_path)
+
+    n = sum([ length for _, _, length in header['docs'] ])
+    ids = np.memmap(ids_path, dtype=np.dtype(str(header['dtype'])), mode='r', shape=(n,)) if n else np.zeros((0,), dtype=ID_DTYPE)
+    doc_ids = [ doc_id.encode('utf-8') for doc_id, _, _ in header['docs'] ]
+    x_vocab = [ ids[offset:offset + length] for _, offset, length in header['docs'] ]
+    return x_vocab, doc_ids, vocab
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Co-simulation of WordContextUpdated compiled with Icarus Verilog through MyHDL Cosimulation.
+
+The design is converted to Verilog (together with the MyHDL co-simulation
+testbench with `$from_myhdl`/`$to_myhdl`), compiled with `iverilog` and run
+by `vvp` with the MyHDL VPI module (`myhdl.vpi`, built from MyHDL sources in
+`cosimulation/icarus`). Raw bits cross the co-simulation boundary and are
+converted to and from `fixbv` signals in Python.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import os
+import subprocess
+from myhdl import Signal, intbv, fixbv, always_comb
+from myhdl import Cosimulation, toVerilog
+
+from WordContextUpdated import WordContextUpdated
+
+COSIM_DIRECTORY = "./ex-cosim"
+COSIM_VPI = os.environ.get('MYHDL_VPI', "myhdl.vpi")
+
+
+def build(y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res, directory=COSIM_DIRECTORY):
+    """Convert WordContextUpdated with its co-simulation testbench and compile it with Icarus Verilog.
+
+    :returns: path of compiled vvp file
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    saved_directory = toVerilog.directory
+    toVerilog.directory = directory
+    try:
+        toVerilog(WordContextUpdated, y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+    finally:
+        toVerilog.directory = saved_directory
+
+    vvp_path = os.path.join(directory, "WordContextUpdated.vvp")
+    subprocess.check_call(["iverilog", "-o", vvp_path, os.path.join(directory, "WordContextUpdated.v"), os.path.join(directory, "tb_WordContextUpdated.v")])
+    return vvp_path
+
+
+def WordContextUpdatedCosim(y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res, directory=COSIM_DIRECTORY, vpi=COSIM_VPI):
+    """Word-context embeddings updated model co-simulated in Icarus Verilog (same interface as WordContextUpdated).
+
+    :param directory: directory for converted and compiled design
+    :param vpi: path to MyHDL VPI module for Icarus Verilog
+    """
+    fix_width = len(word_embv) // embedding_dim
+
+    # raw bits at co-simulation boundary
+    y_raw = Signal(intbv(0)[fix_width:])
+    error_raw = Signal(intbv(0)[fix_width:])
+    y_actual_raw = Signal(intbv(0)[fix_width:])
+
+    # modules
+    vvp_path = build(y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res, directory)
+    cosim = Cosimulation("vvp -m {} {}".format(vpi, vvp_path), y=y_raw, error=error_raw, new_word_embv=new_word_embv, new_context_embv=new_context_embv, y_actual=y_actual_raw, word_embv=word_embv, context_embv=context_embv)
+
+    def to_fix(raw):
+        code = int(raw)
+        if code >> (fix_width - 1):
+            code -= 1 << fix_width
+        return fixbv(code * fix_res, min=fix_min, max=fix_max, res=fix_res)
+
+    @always_comb
+    def to_raw():
+        y_actual_raw.next = y_actual[:]
+
+    @always_comb
+    def from_raw():
+        y.next = to_fix(y_raw)
+        error.next = to_fix(error_raw)
+
+    return cosim, to_raw, from_raw
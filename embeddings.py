@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Export of trained word embeddings and nearest-neighbour queries.
+
+Word embeddings are converted from fixed-point codes (word embedding memory,
+NumPy engine table or checkpoint) to a float32 matrix indexed by word id and
+written in word2vec text or binary format, or as `.npy` with the vocabulary
+next to it. Queries run over the row-normalized matrix: top-k cosine
+similarity and analogies with a blocked exact search, or over candidates of
+an optional random-projection LSH index.
+
+Usage:
+
+    python embeddings.py export ex01/checkpoint-numpy.bin data/enwik8-clean.zip.vocab ex01/vectors.bin
+    python embeddings.py query ex01/vectors.bin king queen
+    python embeddings.py query ex01/vectors.bin --analogy man king woman
+    python embeddings.py query ex01/vectors.bin --lsh king
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import argparse
+import os
+import numpy as np
+
+import checkpoint
+from fixformat import Q7_8, FixFormat, fix_float
+from vocab import Vocabulary
+
+
+def from_codes(codes, vocab_size=None, fmt=Q7_8):
+    """Float32 matrix of embeddings (rows by word id) from raw fixed-point codes."""
+    codes = np.asarray(codes)
+    return fix_float(codes[:vocab_size], fmt.fix_res).astype(np.float32)
+
+
+def from_checkpoint(path, vocab_size=None):
+    """Float32 matrix of word embeddings from checkpoint of train.py or engine.py."""
+    loaded = checkpoint.load(path)
+    if loaded is None:
+        raise ValueError("checkpoint '{}' does not exist".format(path))
+    state, arrays = loaded
+    fmt = FixFormat.parse(state.get('format', Q7_8.name))
+    return from_codes(arrays['wram'], vocab_size, fmt)
+
+
+def export(path, matrix, vocab, binary=None):
+    """Write embeddings of vocabulary words by file name extension.
+
+    `.npy` writes the whole matrix (rows by word id) and the vocabulary next
+    to it (`.vocab`), `.bin` word2vec binary and others word2vec text format.
+    """
+    ext = os.path.splitext(path)[1]
+    if ext == '.npy':
+        np.save(path, np.asarray(matrix, dtype=np.float32))
+        vocab.save(os.path.splitext(path)[0] + ".vocab")
+    else:
+        save_word2vec(path, matrix, vocab, binary=ext == '.bin' if binary is None else binary)
+
+
+def save_word2vec(path, matrix, vocab, binary=False):
+    """Write embeddings of vocabulary words in word2vec text or binary format."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    with open(path, 'wb') as f:
+        f.write("%d %d\n" % (len(vocab), matrix.shape[1]))
+        for i, word in enumerate(vocab.words(), vocab.first_id):
+            if binary:
+                f.write(word + " " + matrix[i].astype('<f4').tostring() + "\n")
+            else:
+                f.write(word + " " + " ".join([ "%.9g" % v for v in matrix[i].tolist() ]) + "\n")
+
+
+def load_word2vec(path, binary=None):
+    """Read embeddings in word2vec text or binary format.
+
+    :returns: float32 matrix and list of words of its rows
+    """
+    binary = os.path.splitext(path)[1] == '.bin' if binary is None else binary
+    with open(path, 'rb') as f:
+        n, dim = [ int(v) for v in f.readline().split() ]
+        matrix = np.empty((n, dim), dtype=np.float32)
+        words = []
+        for i in range(n):
+            if binary:
+                word = []
+                while True:
+                    ch = f.read(1)
+                    if ch == " " or not ch:
+                        break
+                    if ch != "\n":
+                        word.append(ch)
+                words.append("".join(word))
+                matrix[i] = np.frombuffer(f.read(4 * dim), dtype='<f4')
+            else:
+                parts = f.readline().rstrip("\n").split(" ")
+                words.append(parts[0])
+                matrix[i] = [ float(v) for v in parts[1:dim + 1] ]
+    return matrix, words
+
+
+def load(path):
+    """Read exported embeddings (`.npy` with vocabulary or word2vec format).
+
+    :returns: float32 matrix and list of words of its rows (None for rows without word)
+    """
+    if os.path.splitext(path)[1] == '.npy':
+        matrix = np.load(path)
+        vocab = Vocabulary.load(os.path.splitext(path)[0] + ".vocab")
+        words = [None] * vocab.first_id + vocab.words()
+        return matrix, words + [None] * (len(matrix) - len(words))
+    return load_word2vec(path)
+
+
+def normalize(matrix):
+    """Rows scaled to unit length (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.sqrt((matrix * matrix).sum(axis=1))
+    norms[norms == 0] = 1.0
+    return matrix / norms[:, None]
+
+
+def top_k(sims, k):
+    """Indexes and values of k largest values per row, in decreasing order."""
+    rows = np.arange(len(sims))[:, None]
+    if k < sims.shape[1]:
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(sims.shape[1]), (len(sims), 1))
+    vals = sims[rows, part]
+    order = np.argsort(-vals, axis=1, kind='mergesort')
+    return part[rows, order], vals[rows, order]
+
+
+class LshIndex(object):
+    """Random-projection LSH index over normalized embeddings.
+
+    Each of n_tables hashes a vector to the signs of its projections on
+    n_bits random hyperplanes, rows are sorted by hash, and candidates of a
+    query are the rows sharing its hash in any table.
+    """
+
+    def __init__(self, normed, n_bits=16, n_tables=4, rand_seed=None):
+        rng = np.random.RandomState(rand_seed)
+        self.planes = rng.randn(n_tables, normed.shape[1], n_bits).astype(np.float32)
+        self.weights = 1 << np.arange(n_bits, dtype=np.int64)
+        self.tables = []
+        for t in range(n_tables):
+            codes = self.hashes(normed, t)
+            order = np.argsort(codes, kind='mergesort')
+            self.tables.append((codes[order], order))
+
+    def hashes(self, x, t):
+        """Hashes of rows of x in table t."""
+        return (np.dot(x, self.planes[t]) > 0).astype(np.int64).dot(self.weights)
+
+    def candidates(self, q):
+        """Sorted row indexes sharing a hash with vector q in any table."""
+        found = []
+        for t, (codes, order) in enumerate(self.tables):
+            h = self.hashes(q[None, :], t)[0]
+            found.append(order[np.searchsorted(codes, h, 'left'):np.searchsorted(codes, h, 'right')])
+        return np.unique(np.concatenate(found))
+
+
+class EmbeddingIndex(object):
+    """Top-k cosine similarity and analogy queries over word embeddings.
+
+    :param matrix: embeddings with one row per word
+    :param words: words of rows (None for rows without word, e.g. reserved ids)
+    :param block_size: rows per block of exact search
+    """
+
+    def __init__(self, matrix, words, block_size=65536):
+        self.normed = normalize(matrix)
+        self.words = list(words)
+        self.index = dict([ (w, i) for i, w in enumerate(self.words) if w is not None ])
+        self.block_size = block_size
+        self.lsh = None
+        self.valid = np.array([ w is not None for w in self.words ], dtype=bool)
+
+    def build_lsh(self, n_bits=16, n_tables=4, rand_seed=None):
+        """Build random-projection LSH index used by queries with lsh."""
+        self.lsh = LshIndex(self.normed, n_bits, n_tables, rand_seed)
+        return self.lsh
+
+    def vector(self, word):
+        """Normalized embedding of word."""
+        if word not in self.index:
+            raise KeyError("word '{}' not in embeddings".format(word))
+        return self.normed[self.index[word]]
+
+    def search(self, queries, k=10):
+        """Blocked exact search of k rows with largest cosine similarity to each query.
+
+        :param queries: query vectors (one per row)
+        :returns: row indexes and similarities (queries x k)
+        """
+        queries = normalize(np.atleast_2d(queries))
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        best_sims = np.zeros((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.normed), self.block_size):
+            block = self.normed[start:start + self.block_size]
+            sims = np.dot(queries, block.T)
+            sims[:, ~self.valid[start:start + len(block)]] = -np.inf
+            ids, sims = top_k(sims, k)
+            best_ids = np.concatenate([best_ids, ids + start], axis=1)
+            best_sims = np.concatenate([best_sims, sims], axis=1)
+            sel, best_sims = top_k(best_sims, k)
+            best_ids = best_ids[np.arange(len(queries))[:, None], sel]
+        return best_ids, best_sims
+
+    def search_lsh(self, query, k=10):
+        """Search of k rows with largest cosine similarity among LSH candidates of query."""
+        if self.lsh is None:
+            self.build_lsh()
+        query = normalize(np.atleast_2d(query))[0]
+        cand = self.lsh.candidates(query)
+        cand = cand[self.valid[cand]]
+        if not len(cand):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        ids, sims = top_k(np.dot(self.normed[cand], query)[None, :], k)
+        return cand[ids[0]], sims[0]
+
+    def nearest(self, query, k=10, exclude=(), lsh=False):
+        """Words most similar to query vector, excluding given words.
+
+        :returns: list of (word, cosine similarity)
+        """
+        exclude = set(exclude)
+        n = k + len(exclude)
+        if lsh:
+            ids, sims = self.search_lsh(query, n)
+        else:
+            ids, sims = self.search(query, n)
+            ids, sims = ids[0], sims[0]
+        found = [ (self.words[i], float(s)) for i, s in zip(ids.tolist(), sims.tolist()) if np.isfinite(s) and self.words[i] not in exclude ]
+        return found[:k]
+
+    def most_similar(self, word, k=10, lsh=False):
+        """Words most similar to word by cosine similarity."""
+        return self.nearest(self.vector(word), k, exclude=[word], lsh=lsh)
+
+    def analogy(self, a, b, c, k=10, lsh=False):
+        """Words d completing a : b :: c : d (nearest to b - a + c)."""
+        query = self.vector(b) - self.vector(a) + self.vector(c)
+        return self.nearest(query, k, exclude=[a, b, c], lsh=lsh)
+
+
+def test_query(n=5000, dim=8, rand_seed=42):
+    """Testing bench for export formats, exact and LSH queries."""
+    import shutil
+    import tempfile
+
+    rng = np.random.RandomState(rand_seed)
+    codes = rng.randint(-512, 512, size=(n + 1, dim))
+    codes[0] = 0
+    vocab = Vocabulary.from_words([ "w%d" % i for i in range(1, n + 1) ], np.arange(n, 0, -1))
+    matrix = from_codes(codes, fmt=Q7_8)
+
+    # plant analogy w1 : w2 :: w3 : w4
+    matrix[4] = matrix[2] - matrix[1] + matrix[3]
+
+    # export formats round trip
+    directory = tempfile.mkdtemp()
+    try:
+        for ext in [".txt", ".bin", ".npy"]:
+            path = os.path.join(directory, "embeddings" + ext)
+            export(path, matrix, vocab)
+            loaded, words = load(path)
+            rows = [ vocab[w] for w in words if w is not None ]
+            assert np.all(loaded[[ i for i, w in enumerate(words) if w is not None ]] == matrix[rows])
+    finally:
+        shutil.rmtree(directory)
+
+    # blocked exact search against full search
+    index = EmbeddingIndex(matrix, [None] + vocab.words(), block_size=777)
+    queries = rng.randn(20, dim)
+    ids, sims = index.search(queries, k=5)
+    full = np.dot(normalize(queries), index.normed[1:].T)
+    assert np.all(ids[:, 0] == 1 + np.argmax(full, axis=1))
+    assert np.allclose(sims[:, 0], full.max(axis=1), atol=1e-5)
+    assert index.analogy("w1", "w2", "w3", k=1)[0][0] == "w4"
+
+    # LSH candidates usually contain exact nearest neighbour
+    index.build_lsh(n_bits=6, n_tables=8, rand_seed=rand_seed)
+    hits = [ index.most_similar("w%d" % i, k=1, lsh=True)[:1] == index.most_similar("w%d" % i, k=1) for i in range(1, 101) ]
+    print "words: %d, dim: %d, lsh top-1 recall: %.2f" % (n, dim, np.mean(hits))
+    assert np.mean(hits) > 0.5
+
+
+if __name__ == '__main__':
+    argp = argparse.ArgumentParser(description=__doc__.strip().split("\n", 1)[0])
+    subp = argp.add_subparsers(dest='command')
+    expp = subp.add_parser('export', help="export word embeddings of checkpoint")
+    expp.add_argument('checkpoint',
+        help="checkpoint of train.py or engine.py")
+    expp.add_argument('vocab',
+        help="vocabulary of dataset (cached '<dataset>.vocab')")
+    expp.add_argument('output',
+        help="'.npy' for NumPy matrix with vocabulary, '.bin' for word2vec binary, otherwise word2vec text format")
+    qryp = subp.add_parser('query', help="query nearest neighbours of words")
+    qryp.add_argument('embeddings',
+        help="exported embeddings ('.npy', '.bin' or text)")
+    qryp.add_argument('words', nargs='+',
+        help="words to find most similar words for (or a b c with --analogy)")
+    qryp.add_argument('-k', type=int, default=10,
+        help="number of nearest neighbours")
+    qryp.add_argument('--analogy', action='store_true',
+        help="complete analogy a : b :: c : ? of three words")
+    qryp.add_argument('--block-size', type=int, default=65536,
+        help="rows per block of exact search")
+    qryp.add_argument('--lsh', action='store_true',
+        help="search candidates of random-projection LSH index instead of exact search")
+    qryp.add_argument('--lsh-bits', type=int, default=16,
+        help="hyperplanes per LSH table")
+    qryp.add_argument('--lsh-tables', type=int, default=4,
+        help="number of LSH tables")
+    subp.add_parser('test', help="run testing bench of export formats and queries")
+    args = argp.parse_args()
+
+    if args.command == 'export':
+        vocab = Vocabulary.load(args.vocab)
+        matrix = from_checkpoint(args.checkpoint, vocab.first_id + len(vocab))
+        export(args.output, matrix, vocab)
+        print "exported: %d words, dim: %d" % (len(vocab), matrix.shape[1])
+    elif args.command == 'test':
+        test_query()
+    else:
+        matrix, words = load(args.embeddings)
+        index = EmbeddingIndex(matrix, words, block_size=args.block_size)
+        if args.lsh:
+            index.build_lsh(args.lsh_bits, args.lsh_tables)
+        if args.analogy:
+            queries = [ (args.words, index.analogy(*args.words[:3], k=args.k, lsh=args.lsh)) ]
+        else:
+            queries = [ (w, index.most_similar(w, k=args.k, lsh=args.lsh)) for w in args.words ]
+        for query, found in queries:
+            print query
+            for w, s in found:
+                print "  %-20s %.4f" % (w, s)
@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Vectorized NumPy fixed-point reference engine for skip-gram training (SGNS).
+
+Models the fixbv arithmetic of WordContextUpdated on raw integer codes
+(round half away from zero, saturation to fix_min/fix_max). Bit-exactness
+against the MyHDL simulation is checked by `test_agreement`, which needs the
+fixbv branch of MyHDL.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import numpy as np
+
+from fixformat import Q7_8, fix_code, fix_float
+from metrics import Metrics
+import checkpoint
+import skipgram
+
+
+def round_shift(x, shift):
+    """Drop `shift` fractional bits of integer codes (round half away from zero)."""
+    if shift <= 0:
+        return x << -shift
+    half = 1 << (shift - 1)
+    return np.where(x < 0, -((half - x) >> shift), (x + half) >> shift)
+
+
+def saturate(x, code_min, code_max):
+    """Saturate integer codes to representable range."""
+    return np.clip(x, code_min, code_max)
+
+
+def dependency_levels(word_ids, context_ids):
+    """Assign wavefront levels so no two pairs on one level touch the same row.
+
+    Processing levels in increasing order is equivalent to processing pairs
+    sequentially, since every pair depends only on earlier pairs on lower levels.
+
+    Deliberately a sequential scan: levels are longest chains of pairs sharing
+    a word or context row, and consecutive window pairs alternate between both
+    (w_i, w_i+1), (w_i+1, w_i), so array formulations (running maximum per
+    chain, conflict masking) need about as many passes as there are levels.
+    Measured on 20k-pair batches this scan takes 2% of exact training; the
+    cost of the exact path is the number of levels (about half the pairs).
+    """
+    levels = np.empty(len(word_ids), dtype=np.int64)
+    last_word = {}
+    last_context = {}
+    for k, (w, c) in enumerate(zip(word_ids.tolist(), context_ids.tolist())):
+        lv = max(last_word.get(w, -1), last_context.get(c, -1)) + 1
+        levels[k] = lv
+        last_word[w] = lv
+        last_context[c] = lv
+    return levels
+
+
+class Engine(object):
+    """Fixed-point SGNS training engine using NumPy arrays of integer codes.
+
+    Codes are in fixed-point format fmt (see fixformat.py), with optional
+    FixStats telemetry of overflows, saturated stores and underflowed updates.
+    Extra training parameters in params (dataset fingerprint, subsampling,
+    seed) are stored in checkpoints and must match on resume.
+    """
+
+    def __init__(self, vocab_size, embedding_dim=3, leaky_val=0.01, rate_val=0.1, emb_spread=0.1, ema_weight=0.01, fmt=Q7_8, rand_seed=None, wram=None, cram=None, sampler=None, negative=1, window=1, dynamic=False, stats=None, params=None):
+        self.vocab_size = vocab_size
+        self.embedding_dim = embedding_dim
+        self.emb_spread = emb_spread
+        self.fmt = fmt
+        self.fix_res = fmt.fix_res
+        self.frac_bits = fmt.frac_bits
+        self.code_min = fmt.code_min
+        self.code_max = fmt.code_max
+        self.stats = stats
+        fix_res = fmt.fix_res
+
+        # internal values
+        self.one = int(fix_code(1.0, fix_res))
+        self.zero = 0
+        self.leaky = int(fix_code(leaky_val, fix_res))
+        self.rate = int(fix_code(rate_val, fix_res))
+        self.ema_weight = int(fix_code(ema_weight, fix_res))
+        self.sampler = sampler
+        self.negative = negative
+        self.window = window
+        self.dynamic = dynamic
+        self.params = dict(params or {})
+
+        # embedding memories (instead of RamSim defaults drawn on first read)
+        self.rng = np.random.RandomState(rand_seed)
+        self.wram = self.random_codes((vocab_size, embedding_dim)) if wram is None else wram
+        self.cram = self.random_codes((vocab_size, embedding_dim)) if cram is None else cram
+        self.error_ema = self.one
+        self.pairs = 0
+
+        # training position (epoch, document, word) for checkpoints
+        self.epoch = 0
+        self.doc = 0
+        self.position = 0
+
+    def random_codes(self, shape):
+        """Random initial embedding codes in range [0, emb_spread]."""
+        dtype = np.int16 if self.fmt.fix_width <= 16 else np.int32
+        return saturate(fix_code(self.rng.uniform(0.0, self.emb_spread, size=shape), self.fix_res), self.code_min, self.code_max).astype(dtype)
+
+    def saturate(self, x):
+        if self.stats is not None:
+            return self.stats.saturate(x)
+        return saturate(x, self.code_min, self.code_max)
+
+    def dot_product(self, a, b):
+        """Vector dot product as in DotProduct (rows of a and b)."""
+        y_sum = np.sum(a * b, axis=-1)
+        return self.saturate(round_shift(y_sum, self.frac_bits))
+
+    def rectifier(self, x):
+        """Leaky ReLU and derivative as in Rectifier."""
+        pos = x > self.zero
+        y = np.where(pos, x, self.saturate(round_shift(self.leaky * x, self.frac_bits)))
+        y_dx = np.where(pos, self.one, self.leaky)
+        return y, y_dx
+
+    def word_context_product(self, word, context):
+        """Word-context product and derivatives as in WordContextProduct."""
+        y_dot = self.dot_product(word, context)
+        y, y_dx = self.rectifier(y_dot)
+        y_dword = self.saturate(round_shift(y_dx[:, None] * context, self.frac_bits))
+        y_dcontext = self.saturate(round_shift(y_dx[:, None] * word, self.frac_bits))
+        return y, y_dword, y_dcontext
+
+    def word_context_updated(self, word, context, y_actual):
+        """Prediction, MSE and updated embeddings as in WordContextUpdated.
+
+        :param word: word embedding codes, shape (n, embedding_dim)
+        :param context: context embedding codes, shape (n, embedding_dim)
+        :param y_actual: actual training value codes, shape (n,)
+        :returns: y, error, new_word, new_context as integer codes
+        """
+        word = np.asarray(word, dtype=np.int64)
+        context = np.asarray(context, dtype=np.int64)
+        y, y_dword, y_dcontext = self.word_context_product(word, context)
+
+        diff = self.saturate(y - y_actual)
+        error = self.saturate(round_shift(diff * diff, self.frac_bits))
+
+        scale = (self.rate * diff)[:, None]
+        delta_word = self.saturate(round_shift(scale * y_dword, 2 * self.frac_bits))
+        delta_context = self.saturate(round_shift(scale * y_dcontext, 2 * self.frac_bits))
+        new_word = self.saturate(word - delta_word)
+        new_context = self.saturate(context - delta_context)
+        if self.stats is not None:
+            self.stats.record_updates(scale * y_dword, delta_word, 2 * self.frac_bits)
+            self.stats.record_updates(scale * y_dcontext, delta_context, 2 * self.frac_bits)
+            self.stats.record_stores(new_word)
+            self.stats.record_stores(new_context)
+        return y, error, new_word, new_context
+
+    def update_ema(self, errors):
+        """Exponential moving average of errors, in order of training pairs.
+
+        Deliberately sequential: every step rounds and saturates like the
+        fixbv EMA of the train stimulus, which has no closed form over a batch.
+        """
+        ema = self.error_ema
+        half = 1 << (self.frac_bits - 1)
+        for e in errors.tolist():
+            prod = self.ema_weight * (e - ema)
+            if prod < 0:
+                delta = -((half - prod) >> self.frac_bits)
+            else:
+                delta = (prod + half) >> self.frac_bits
+            ema = min(max(ema + delta, self.code_min), self.code_max)
+        self.error_ema = ema
+        return ema
+
+    def train_pairs(self, word_ids, context_ids, y_actual, exact=True):
+        """Train on a batch of word-context pairs with array operations.
+
+        :param word_ids: word ids, shape (n,)
+        :param context_ids: context ids, shape (n,)
+        :param y_actual: actual training value codes, shape (n,)
+        :param exact: bit-exact with sequential training, otherwise all pairs read rows at batch start
+        :returns: MSE error codes in order of pairs
+        """
+        word_ids = np.asarray(word_ids, dtype=np.int64)
+        context_ids = np.asarray(context_ids, dtype=np.int64)
+        y_actual = np.asarray(y_actual, dtype=np.int64)
+        errors = np.empty(len(word_ids), dtype=np.int64)
+
+        if exact:
+            levels = dependency_levels(word_ids, context_ids)
+            order = np.argsort(levels, kind='mergesort')
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(levels))))
+            for lv in range(len(bounds) - 1):
+                idx = order[bounds[lv]:bounds[lv + 1]]
+                w = word_ids[idx]
+                c = context_ids[idx]
+                _, error, new_word, new_context = self.word_context_updated(self.wram[w], self.cram[c], y_actual[idx])
+                self.wram[w] = new_word
+                self.cram[c] = new_context
+                errors[idx] = error
+        else:
+            word = self.wram[word_ids].astype(np.int64)
+            context = self.cram[context_ids].astype(np.int64)
+            _, error, new_word, new_context = self.word_context_updated(word, context, y_actual)
+            rows_word, inv_word = np.unique(word_ids, return_inverse=True)
+            rows_context, inv_context = np.unique(context_ids, return_inverse=True)
+            acc_word = self.wram[rows_word].astype(np.int64)
+            acc_context = self.cram[rows_context].astype(np.int64)
+            np.add.at(acc_word, inv_word, new_word - word)
+            np.add.at(acc_context, inv_context, new_context - context)
+            self.wram[rows_word] = self.saturate(acc_word)
+            self.cram[rows_context] = self.saturate(acc_context)
+            errors[:] = error
+
+        self.update_ema(errors)
+        self.pairs += len(errors)
+        return errors
+
+    def negative_pairs(self, word, context):
+        """Positive pairs (y_actual 1.0) each followed by `negative` sampled pairs (y_actual 0.0)."""
+        return skipgram.negative_pairs(word, context, self.negative, self.sampler, self.rng, self.vocab_size, self.one, self.zero)
+
+    def sequence_pairs(self, doc, start, stop):
+        """Positive and negative pairs for words at positions [start, stop) as in train stimulus."""
+        reduced = self.rng.randint(1, self.window + 1, size=max(min(stop, len(doc)) - start, 0)) if self.dynamic else None
+        return self.negative_pairs(*skipgram.window_pairs(doc, self.window, start, stop, reduced))
+
+    def train_sequence(self, doc, batch_size=10000, exact=True, start=0, stop=None):
+        """Train one pass over words at positions [start, stop) of a sequence in batches of positive pairs."""
+        for word, context in skipgram.iter_batches(doc, self.window, batch_size, self.dynamic, self.rng, start, stop):
+            errors = self.train_pairs(*self.negative_pairs(word, context), exact=exact)
+            yield len(word), errors
+
+    def fit(self, x_vocab, epochs=None, max_pairs=None, block_size=10000, batch_size=10000, exact=True, checkpoint_path=None, checkpoint_interval=10**7):
+        """Train over all documents from current position until epoch or pair limit.
+
+        Documents are processed in blocks of block_size words, after which the
+        position advances and a checkpoint is written every checkpoint_interval
+        pairs (and at the end), so training can resume without replaying the corpus.
+
+        :param epochs: stop after epochs over x_vocab, never if None (or after a full epoch without training pairs)
+        :param max_pairs: stop after (at least) max_pairs training pairs, never if None
+        :param checkpoint_path: checkpoint file, no checkpoints if None
+        :returns: generator of errors per batch
+        """
+        last_checkpoint = self.pairs
+        while epochs is None or self.epoch < epochs:
+            epoch_pairs = self.pairs if self.doc == 0 and self.position == 0 else None
+            while self.doc < len(x_vocab):
+                doc = x_vocab[self.doc]
+                while self.position < len(doc):
+                    if max_pairs is not None and self.pairs >= max_pairs:
+                        if checkpoint_path is not None:
+                            self.save_checkpoint(checkpoint_path)
+                        return
+
+                    stop = min(self.position + block_size, len(doc))
+                    for _, errors in self.train_sequence(doc, batch_size=batch_size, exact=exact, start=self.position, stop=stop):
+                        yield errors
+                    self.position = stop
+
+                    if checkpoint_path is not None and self.pairs - last_checkpoint >= checkpoint_interval:
+                        self.save_checkpoint(checkpoint_path)
+                        last_checkpoint = self.pairs
+                self.doc += 1
+                self.position = 0
+            self.epoch += 1
+            self.doc = 0
+            if epoch_pairs == self.pairs:
+                break
+        if checkpoint_path is not None:
+            self.save_checkpoint(checkpoint_path)
+
+    def save_checkpoint(self, path):
+        """Write embedding tables and training position to checkpoint file."""
+        state = {'epoch': self.epoch, 'doc': self.doc, 'position': self.position, 'pairs': self.pairs, 'error_ema': int(self.error_ema), 'format': self.fmt.name, 'vocab_size': self.vocab_size}
+        state.update(self.checkpoint_params())
+        checkpoint.save(path, state, self.wram, self.cram)
+
+    def checkpoint_params(self):
+        """Training parameters stored in and checked against checkpoints."""
+        params = {'window': self.window, 'negative': self.negative, 'dynamic': self.dynamic}
+        params.update(self.params)
+        return params
+
+    def load_checkpoint(self, path):
+        """Restore embedding tables and training position from checkpoint file if it exists."""
+        loaded = checkpoint.load(path)
+        if loaded is None:
+            return False
+        state, arrays = loaded
+        if state.get('format', self.fmt.name) != self.fmt.name:
+            raise ValueError("checkpoint '{}' is in format {}, not {}".format(path, state['format'], self.fmt.name))
+        if state.get('vocab_size', self.vocab_size) != self.vocab_size:
+            raise ValueError("checkpoint '{}' has vocabulary size {}, not {} (vocabulary options or corpus changed)".format(path, state['vocab_size'], self.vocab_size))
+        checkpoint.check_params(path, state, self.checkpoint_params())
+        self.wram[:] = arrays['wram']
+        self.cram[:] = arrays['cram']
+        self.epoch = state['epoch']
+        self.doc = state['doc']
+        self.position = state['position']
+        self.pairs = state['pairs']
+        self.error_ema = state['error_ema']
+        return True
+
+    def embeddings(self):
+        """Word embeddings as float matrix."""
+        return fix_float(self.wram, self.fix_res)
+
+
+def run(x_vocab, y_skipgram, vocab_size, batch_size=10000, n_passes=None, exact=True, rand_seed=None, sampler=None, negative=1, window=1, dynamic=False, max_pairs=None, checkpoint_path=None, checkpoint_interval=10**7, metrics=None, fmt=Q7_8, stats=None, params=None):
+    """Run NumPy training engine over all documents like train.run(), resuming from checkpoint if it exists.
+
+    :param fmt: fixed-point format (see fixformat.py)
+    :param stats: FixStats for overflow, saturation and underflow telemetry reported at the end, none if None
+    :param params: extra training parameters stored in and checked against the checkpoint (dataset fingerprint, subsample, seed), none if None
+    """
+
+    if metrics is None:
+        metrics = Metrics()
+
+    engine = Engine(vocab_size, fmt=fmt, rand_seed=rand_seed, sampler=sampler, negative=negative, window=window, dynamic=dynamic, stats=stats, params=params)
+    if checkpoint_path is not None and engine.load_checkpoint(checkpoint_path):
+        print "resumed: epoch: %d, doc: %d, position: %d, pairs: %d" % (engine.epoch, engine.doc, engine.position, engine.pairs)
+        metrics.resume(engine.pairs)
+    for errors in engine.fit(x_vocab, epochs=n_passes, max_pairs=max_pairs, batch_size=batch_size, exact=exact, checkpoint_path=checkpoint_path, checkpoint_interval=checkpoint_interval):
+        metrics.record_batch(errors * engine.fix_res, engine.error_ema * engine.fix_res)
+    metrics.flush()
+    if stats is not None:
+        print stats.report()
+    return engine
+
+
+def test_dim0(n=10, step_word=0.5, step_context=0.5):
+    """Testing bench around zero in dimension 0 (same as WordContextUpdated.test_dim0)."""
+
+    engine = Engine(1)
+    fix_res = engine.fix_res
+
+    word = np.zeros((n, engine.embedding_dim), dtype=np.int64)
+    context = np.zeros((n, engine.embedding_dim), dtype=np.int64)
+    for i in range(n):
+        word[i, 0] = fix_code(step_word * i - step_word * n // 2, fix_res)
+        context[i, 0] = fix_code(step_context * i, fix_res)
+    y_actual = np.repeat(engine.one, n)
+
+    y, error, new_word, new_context = engine.word_context_updated(word, context, y_actual)
+    for i in range(n):
+        print "%3s word: %s, context: %s, mse: %f, y: %f, new_word: %s, new_context: %s" % (10 * (i + 2), list(fix_float(word[i], fix_res)), list(fix_float(context[i], fix_res)), error[i] * fix_res, y[i] * fix_res, list(fix_float(new_word[i], fix_res)), list(fix_float(new_context[i], fix_res)))
+
+
+def test_checkpoint(vocab_size=50, rand_seed=42):
+    """Testing bench for resuming with the same and rejecting other training parameters, and for stopping on a corpus without pairs."""
+
+    import os
+    import tempfile
+
+    x_vocab = [ np.arange(1, vocab_size), np.array([1]) ]
+    params = {'dataset_sha1': 'abc', 'subsample': 1e-3, 'seed': 1}
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, "checkpoint.bin")
+    try:
+        engine = Engine(vocab_size, rand_seed=rand_seed, window=2, params=params)
+        for _ in engine.fit(x_vocab, epochs=1, checkpoint_path=path):
+            pass
+        assert Engine(vocab_size, window=2, params=params).load_checkpoint(path)
+        for changed in [ {'window': 1}, {'negative': 2}, {'params': dict(params, seed=2)}, {'params': dict(params, dataset_sha1='def')} ]:
+            kwargs = dict({'window': 2, 'params': params}, **changed)
+            try:
+                Engine(vocab_size, **kwargs).load_checkpoint(path)
+            except ValueError as e:
+                print "rejected:", e
+            else:
+                assert False, "resumed with {}".format(changed)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(tmp_dir)
+
+    # documents of single words produce no pairs, so training without epoch limit stops
+    engine = Engine(vocab_size, rand_seed=rand_seed)
+    assert list(engine.fit([ np.array([1]), np.array([2]) ])) == []
+    print "epochs without pairs: %d" % engine.epoch
+    assert engine.epoch == 1
+
+
+def test_agreement(n=100, emb_spread=1.0, rand_seed=42, fmt=Q7_8):
+    """Testing bench for bit-exact agreement with WordContextUpdated simulation."""
+
+    from myhdl import Signal, ConcatSignal, intbv, fixbv, delay, always, instance
+    from myhdl import Simulation, StopSimulation
+    from WordContextUpdated import WordContextUpdated
+
+    engine = Engine(1, fmt=fmt, rand_seed=rand_seed)
+    embedding_dim = engine.embedding_dim
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+
+    # random stimulus as integer codes
+    word = fix_code(engine.rng.uniform(-emb_spread, emb_spread, size=(n, embedding_dim)), fix_res)
+    context = fix_code(engine.rng.uniform(-emb_spread, emb_spread, size=(n, embedding_dim)), fix_res)
+    y_actual = engine.one * engine.rng.randint(2, size=n)
+    y_ref, error_ref, new_word_ref, new_context_ref = engine.word_context_updated(word, context, y_actual)
+
+    # signals
+    y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    error = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    new_word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    new_context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    new_word_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for j in range(embedding_dim) ]
+    new_context_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for j in range(embedding_dim) ]
+    for j in range(embedding_dim):
+        new_word_emb[j].assign(new_word_embv((j + 1) * fix_width, j * fix_width))
+        new_context_emb[j].assign(new_context_embv((j + 1) * fix_width, j * fix_width))
+
+    y_actual_sig = Signal(fixbv(1.0, min=fix_min, max=fix_max, res=fix_res))
+    word_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for _ in range(embedding_dim) ]
+    word_embv = ConcatSignal(*reversed(word_emb))
+    context_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for _ in range(embedding_dim) ]
+    context_embv = ConcatSignal(*reversed(context_emb))
+
+    clk = Signal(bool(False))
+
+    # modules
+    wcupdated = WordContextUpdated(y, error, new_word_embv, new_context_embv, y_actual_sig, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+
+    # test stimulus
+    HALF_PERIOD = delay(5)
+
+    @always(HALF_PERIOD)
+    def clk_gen():
+        clk.next = not clk
+
+    @instance
+    def stimulus():
+        yield clk.negedge
+
+        mismatches = 0
+        for i in range(n):
+            # new values
+            y_actual_sig.next = fixbv(float(y_actual[i] * fix_res), min=fix_min, max=fix_max, res=fix_res)
+            for j in range(embedding_dim):
+                word_emb[j].next = fixbv(float(word[i, j] * fix_res), min=fix_min, max=fix_max, res=fix_res)
+                context_emb[j].next = fixbv(float(context[i, j] * fix_res), min=fix_min, max=fix_max, res=fix_res)
+
+            yield clk.negedge
+            sim_out = [float(y), float(error)] + [ float(el.val) for el in new_word_emb ] + [ float(el.val) for el in new_context_emb ]
+            ref_out = [y_ref[i] * fix_res, error_ref[i] * fix_res] + list(fix_float(new_word_ref[i], fix_res)) + list(fix_float(new_context_ref[i], fix_res))
+            if sim_out != ref_out:
+                mismatches += 1
+                print "%3s mismatch, sim: %s, ref: %s" % (i, sim_out, ref_out)
+
+        print "agreement: %d/%d" % (n - mismatches, n)
+        assert mismatches == 0
+        raise StopSimulation()
+
+    return clk_gen, stimulus, wcupdated
+
+
+if __name__ == '__main__':
+    # compute reference values
+    test_dim0()
+    test_checkpoint()
+
+    # compare with simulated design
+    from myhdl import Simulation
+    sim = Simulation(test_agreement())
+    sim.run()
@@ -0,0 +1,307 @@
+// File: ./ex-target/NegativeSampler.v
+// Generated by MyHDL 0.9.0
+// Date: Sat Oct 17 05:41:51 2026
+
+
+`timescale 1ns/10ps
+
+module NegativeSampler (
+    neg_id,
+    enable,
+    clk
+);
+// Negative sampler reading a unigram ROM table at LFSR-generated indexes.
+// 
+// The LFSR never reaches state 0, so table entry 0 is never used.
+// 
+// :param neg_id: return negative context id from table
+// :param enable: advance to next sample on clock
+// :param clk: clock input
+// :param table: sample table of word ids, length a power of 2
+// :param seed: initial non-zero LFSR state
+
+output [2:0] neg_id;
+reg [2:0] neg_id;
+input enable;
+input clk;
+
+reg [7:0] lfsr;
+
+
+
+
+
+always @(posedge clk) begin: NEGATIVESAMPLER_STEP
+    if (enable) begin
+        if (lfsr[0]) begin
+            lfsr <= ((lfsr >>> 1) ^ 184);
+        end
+        else begin
+            lfsr <= (lfsr >>> 1);
+        end
+    end
+end
+
+
+always @(lfsr) begin: NEGATIVESAMPLER_LOOKUP
+    case (lfsr)
+        0: neg_id = 1;
+        1: neg_id = 1;
+        2: neg_id = 1;
+        3: neg_id = 1;
+        4: neg_id = 1;
+        5: neg_id = 1;
+        6: neg_id = 1;
+        7: neg_id = 1;
+        8: neg_id = 1;
+        9: neg_id = 1;
+        10: neg_id = 1;
+        11: neg_id = 1;
+        12: neg_id = 1;
+        13: neg_id = 1;
+        14: neg_id = 1;
+        15: neg_id = 1;
+        16: neg_id = 1;
+        17: neg_id = 1;
+        18: neg_id = 1;
+        19: neg_id = 1;
+        20: neg_id = 1;
+        21: neg_id = 1;
+        22: neg_id = 1;
+        23: neg_id = 1;
+        24: neg_id = 1;
+        25: neg_id = 1;
+        26: neg_id = 1;
+        27: neg_id = 1;
+        28: neg_id = 1;
+        29: neg_id = 1;
+        30: neg_id = 1;
+        31: neg_id = 1;
+        32: neg_id = 1;
+        33: neg_id = 1;
+        34: neg_id = 1;
+        35: neg_id = 1;
+        36: neg_id = 1;
+        37: neg_id = 1;
+        38: neg_id = 1;
+        39: neg_id = 1;
+        40: neg_id = 1;
+        41: neg_id = 1;
+        42: neg_id = 1;
+        43: neg_id = 1;
+        44: neg_id = 1;
+        45: neg_id = 1;
+        46: neg_id = 1;
+        47: neg_id = 1;
+        48: neg_id = 1;
+        49: neg_id = 1;
+        50: neg_id = 1;
+        51: neg_id = 1;
+        52: neg_id = 1;
+        53: neg_id = 1;
+        54: neg_id = 1;
+        55: neg_id = 1;
+        56: neg_id = 1;
+        57: neg_id = 1;
+        58: neg_id = 1;
+        59: neg_id = 1;
+        60: neg_id = 1;
+        61: neg_id = 1;
+        62: neg_id = 1;
+        63: neg_id = 1;
+        64: neg_id = 1;
+        65: neg_id = 1;
+        66: neg_id = 1;
+        67: neg_id = 1;
+        68: neg_id = 1;
+        69: neg_id = 1;
+        70: neg_id = 1;
+        71: neg_id = 1;
+        72: neg_id = 1;
+        73: neg_id = 1;
+        74: neg_id = 1;
+        75: neg_id = 1;
+        76: neg_id = 1;
+        77: neg_id = 1;
+        78: neg_id = 1;
+        79: neg_id = 1;
+        80: neg_id = 1;
+        81: neg_id = 1;
+        82: neg_id = 1;
+        83: neg_id = 1;
+        84: neg_id = 1;
+        85: neg_id = 1;
+        86: neg_id = 1;
+        87: neg_id = 1;
+        88: neg_id = 1;
+        89: neg_id = 1;
+        90: neg_id = 1;
+        91: neg_id = 1;
+        92: neg_id = 1;
+        93: neg_id = 1;
+        94: neg_id = 1;
+        95: neg_id = 1;
+        96: neg_id = 1;
+        97: neg_id = 1;
+        98: neg_id = 1;
+        99: neg_id = 1;
+        100: neg_id = 1;
+        101: neg_id = 1;
+        102: neg_id = 1;
+        103: neg_id = 1;
+        104: neg_id = 1;
+        105: neg_id = 1;
+        106: neg_id = 1;
+        107: neg_id = 1;
+        108: neg_id = 1;
+        109: neg_id = 1;
+        110: neg_id = 1;
+        111: neg_id = 1;
+        112: neg_id = 1;
+        113: neg_id = 1;
+        114: neg_id = 1;
+        115: neg_id = 1;
+        116: neg_id = 1;
+        117: neg_id = 1;
+        118: neg_id = 1;
+        119: neg_id = 1;
+        120: neg_id = 1;
+        121: neg_id = 1;
+        122: neg_id = 1;
+        123: neg_id = 1;
+        124: neg_id = 1;
+        125: neg_id = 1;
+        126: neg_id = 1;
+        127: neg_id = 1;
+        128: neg_id = 1;
+        129: neg_id = 1;
+        130: neg_id = 1;
+        131: neg_id = 1;
+        132: neg_id = 1;
+        133: neg_id = 1;
+        134: neg_id = 1;
+        135: neg_id = 1;
+        136: neg_id = 1;
+        137: neg_id = 1;
+        138: neg_id = 1;
+        139: neg_id = 1;
+        140: neg_id = 1;
+        141: neg_id = 2;
+        142: neg_id = 2;
+        143: neg_id = 2;
+        144: neg_id = 2;
+        145: neg_id = 2;
+        146: neg_id = 2;
+        147: neg_id = 2;
+        148: neg_id = 2;
+        149: neg_id = 2;
+        150: neg_id = 2;
+        151: neg_id = 2;
+        152: neg_id = 2;
+        153: neg_id = 2;
+        154: neg_id = 2;
+        155: neg_id = 2;
+        156: neg_id = 2;
+        157: neg_id = 2;
+        158: neg_id = 2;
+        159: neg_id = 2;
+        160: neg_id = 2;
+        161: neg_id = 2;
+        162: neg_id = 2;
+        163: neg_id = 2;
+        164: neg_id = 2;
+        165: neg_id = 2;
+        166: neg_id = 2;
+        167: neg_id = 2;
+        168: neg_id = 2;
+        169: neg_id = 2;
+        170: neg_id = 2;
+        171: neg_id = 2;
+        172: neg_id = 2;
+        173: neg_id = 2;
+        174: neg_id = 2;
+        175: neg_id = 2;
+        176: neg_id = 2;
+        177: neg_id = 2;
+        178: neg_id = 2;
+        179: neg_id = 2;
+        180: neg_id = 2;
+        181: neg_id = 2;
+        182: neg_id = 2;
+        183: neg_id = 2;
+        184: neg_id = 2;
+        185: neg_id = 2;
+        186: neg_id = 2;
+        187: neg_id = 2;
+        188: neg_id = 2;
+        189: neg_id = 2;
+        190: neg_id = 2;
+        191: neg_id = 2;
+        192: neg_id = 2;
+        193: neg_id = 2;
+        194: neg_id = 2;
+        195: neg_id = 2;
+        196: neg_id = 2;
+        197: neg_id = 2;
+        198: neg_id = 2;
+        199: neg_id = 2;
+        200: neg_id = 2;
+        201: neg_id = 2;
+        202: neg_id = 2;
+        203: neg_id = 2;
+        204: neg_id = 2;
+        205: neg_id = 2;
+        206: neg_id = 2;
+        207: neg_id = 2;
+        208: neg_id = 2;
+        209: neg_id = 2;
+        210: neg_id = 2;
+        211: neg_id = 2;
+        212: neg_id = 2;
+        213: neg_id = 2;
+        214: neg_id = 2;
+        215: neg_id = 2;
+        216: neg_id = 2;
+        217: neg_id = 2;
+        218: neg_id = 2;
+        219: neg_id = 2;
+        220: neg_id = 2;
+        221: neg_id = 2;
+        222: neg_id = 2;
+        223: neg_id = 2;
+        224: neg_id = 2;
+        225: neg_id = 2;
+        226: neg_id = 3;
+        227: neg_id = 3;
+        228: neg_id = 3;
+        229: neg_id = 3;
+        230: neg_id = 3;
+        231: neg_id = 3;
+        232: neg_id = 3;
+        233: neg_id = 3;
+        234: neg_id = 3;
+        235: neg_id = 3;
+        236: neg_id = 3;
+        237: neg_id = 3;
+        238: neg_id = 3;
+        239: neg_id = 3;
+        240: neg_id = 3;
+        241: neg_id = 3;
+        242: neg_id = 3;
+        243: neg_id = 3;
+        244: neg_id = 3;
+        245: neg_id = 3;
+        246: neg_id = 3;
+        247: neg_id = 3;
+        248: neg_id = 3;
+        249: neg_id = 3;
+        250: neg_id = 3;
+        251: neg_id = 4;
+        252: neg_id = 4;
+        253: neg_id = 4;
+        254: neg_id = 4;
+        default: neg_id = 5;
+    endcase
+end
+
+endmodule
@@ -0,0 +1,321 @@
+-- File: ./ex-target/NegativeSampler.vhd
+-- Generated by MyHDL 0.9.0
+-- Date: Sat Oct 17 05:41:51 2026
+
+
+library IEEE;
+use IEEE.std_logic_1164.all;
+use IEEE.numeric_std.all;
+use std.textio.all;
+
+use work.pck_myhdl_090.all;
+
+entity NegativeSampler is
+    port (
+        neg_id: out unsigned(2 downto 0);
+        enable: in std_logic;
+        clk: in std_logic
+    );
+end entity NegativeSampler;
+-- Negative sampler reading a unigram ROM table at LFSR-generated indexes.
+-- 
+-- The LFSR never reaches state 0, so table entry 0 is never used.
+-- 
+-- :param neg_id: return negative context id from table
+-- :param enable: advance to next sample on clock
+-- :param clk: clock input
+-- :param table: sample table of word ids, length a power of 2
+-- :param seed: initial non-zero LFSR state
+
+architecture MyHDL of NegativeSampler is
+
+
+constant taps: integer := 184;
+
+
+
+signal lfsr: unsigned(7 downto 0);
+
+begin
+
+
+
+
+
+NEGATIVESAMPLER_STEP: process (clk) is
+begin
+    if rising_edge(clk) then
+        if bool(enable) then
+            if bool(lfsr(0)) then
+                lfsr <= (shift_right(lfsr, 1) xor to_unsigned(taps, 8));
+            else
+                lfsr <= shift_right(lfsr, 1);
+            end if;
+        end if;
+    end if;
+end process NEGATIVESAMPLER_STEP;
+
+
+NEGATIVESAMPLER_LOOKUP: process (lfsr) is
+begin
+    case to_integer(lfsr) is
+        when 0 => neg_id <= "001";
+        when 1 => neg_id <= "001";
+        when 2 => neg_id <= "001";
+        when 3 => neg_id <= "001";
+        when 4 => neg_id <= "001";
+        when 5 => neg_id <= "001";
+        when 6 => neg_id <= "001";
+        when 7 => neg_id <= "001";
+        when 8 => neg_id <= "001";
+        when 9 => neg_id <= "001";
+        when 10 => neg_id <= "001";
+        when 11 => neg_id <= "001";
+        when 12 => neg_id <= "001";
+        when 13 => neg_id <= "001";
+        when 14 => neg_id <= "001";
+        when 15 => neg_id <= "001";
+        when 16 => neg_id <= "001";
+        when 17 => neg_id <= "001";
+        when 18 => neg_id <= "001";
+        when 19 => neg_id <= "001";
+        when 20 => neg_id <= "001";
+        when 21 => neg_id <= "001";
+        when 22 => neg_id <= "001";
+        when 23 => neg_id <= "001";
+        when 24 => neg_id <= "001";
+        when 25 => neg_id <= "001";
+        when 26 => neg_id <= "001";
+        when 27 => neg_id <= "001";
+        when 28 => neg_id <= "001";
+        when 29 => neg_id <= "001";
+        when 30 => neg_id <= "001";
+        when 31 => neg_id <= "001";
+        when 32 => neg_id <= "001";
+        when 33 => neg_id <= "001";
+        when 34 => neg_id <= "001";
+        when 35 => neg_id <= "001";
+        when 36 => neg_id <= "001";
+        when 37 => neg_id <= "001";
+        when 38 => neg_id <= "001";
+        when 39 => neg_id <= "001";
+        when 40 => neg_id <= "001";
+        when 41 => neg_id <= "001";
+        when 42 => neg_id <= "001";
+        when 43 => neg_id <= "001";
+        when 44 => neg_id <= "001";
+        when 45 => neg_id <= "001";
+        when 46 => neg_id <= "001";
+        when 47 => neg_id <= "001";
+        when 48 => neg_id <= "001";
+        when 49 => neg_id <= "001";
+        when 50 => neg_id <= "001";
+        when 51 => neg_id <= "001";
+        when 52 => neg_id <= "001";
+        when 53 => neg_id <= "001";
+        when 54 => neg_id <= "001";
+        when 55 => neg_id <= "001";
+        when 56 => neg_id <= "001";
+        when 57 => neg_id <= "001";
+        when 58 => neg_id <= "001";
+        when 59 => neg_id <= "001";
+        when 60 => neg_id <= "001";
+        when 61 => neg_id <= "001";
+        when 62 => neg_id <= "001";
+        when 63 => neg_id <= "001";
+        when 64 => neg_id <= "001";
+        when 65 => neg_id <= "001";
+        when 66 => neg_id <= "001";
+        when 67 => neg_id <= "001";
+        when 68 => neg_id <= "001";
+        when 69 => neg_id <= "001";
+        when 70 => neg_id <= "001";
+        when 71 => neg_id <= "001";
+        when 72 => neg_id <= "001";
+        when 73 => neg_id <= "001";
+        when 74 => neg_id <= "001";
+        when 75 => neg_id <= "001";
+        when 76 => neg_id <= "001";
+        when 77 => neg_id <= "001";
+        when 78 => neg_id <= "001";
+        when 79 => neg_id <= "001";
+        when 80 => neg_id <= "001";
+        when 81 => neg_id <= "001";
+        when 82 => neg_id <= "001";
+        when 83 => neg_id <= "001";
+        when 84 => neg_id <= "001";
+        when 85 => neg_id <= "001";
+        when 86 => neg_id <= "001";
+        when 87 => neg_id <= "001";
+        when 88 => neg_id <= "001";
+        when 89 => neg_id <= "001";
+        when 90 => neg_id <= "001";
+        when 91 => neg_id <= "001";
+        when 92 => neg_id <= "001";
+        when 93 => neg_id <= "001";
+        when 94 => neg_id <= "001";
+        when 95 => neg_id <= "001";
+        when 96 => neg_id <= "001";
+        when 97 => neg_id <= "001";
+        when 98 => neg_id <= "001";
+        when 99 => neg_id <= "001";
+        when 100 => neg_id <= "001";
+        when 101 => neg_id <= "001";
+        when 102 => neg_id <= "001";
+        when 103 => neg_id <= "001";
+        when 104 => neg_id <= "001";
+        when 105 => neg_id <= "001";
+        when 106 => neg_id <= "001";
+        when 107 => neg_id <= "001";
+        when 108 => neg_id <= "001";
+        when 109 => neg_id <= "001";
+        when 110 => neg_id <= "001";
+        when 111 => neg_id <= "001";
+        when 112 => neg_id <= "001";
+        when 113 => neg_id <= "001";
+        when 114 => neg_id <= "001";
+        when 115 => neg_id <= "001";
+        when 116 => neg_id <= "001";
+        when 117 => neg_id <= "001";
+        when 118 => neg_id <= "001";
+        when 119 => neg_id <= "001";
+        when 120 => neg_id <= "001";
+        when 121 => neg_id <= "001";
+        when 122 => neg_id <= "001";
+        when 123 => neg_id <= "001";
+        when 124 => neg_id <= "001";
+        when 125 => neg_id <= "001";
+        when 126 => neg_id <= "001";
+        when 127 => neg_id <= "001";
+        when 128 => neg_id <= "001";
+        when 129 => neg_id <= "001";
+        when 130 => neg_id <= "001";
+        when 131 => neg_id <= "001";
+        when 132 => neg_id <= "001";
+        when 133 => neg_id <= "001";
+        when 134 => neg_id <= "001";
+        when 135 => neg_id <= "001";
+        when 136 => neg_id <= "001";
+        when 137 => neg_id <= "001";
+        when 138 => neg_id <= "001";
+        when 139 => neg_id <= "001";
+        when 140 => neg_id <= "001";
+        when 141 => neg_id <= "010";
+        when 142 => neg_id <= "010";
+        when 143 => neg_id <= "010";
+        when 144 => neg_id <= "010";
+        when 145 => neg_id <= "010";
+        when 146 => neg_id <= "010";
+        when 147 => neg_id <= "010";
+        when 148 => neg_id <= "010";
+        when 149 => neg_id <= "010";
+        when 150 => neg_id <= "010";
+        when 151 => neg_id <= "010";
+        when 152 => neg_id <= "010";
+        when 153 => neg_id <= "010";
+        when 154 => neg_id <= "010";
+        when 155 => neg_id <= "010";
+        when 156 => neg_id <= "010";
+        when 157 => neg_id <= "010";
+        when 158 => neg_id <= "010";
+        when 159 => neg_id <= "010";
+        when 160 => neg_id <= "010";
+        when 161 => neg_id <= "010";
+        when 162 => neg_id <= "010";
+        when 163 => neg_id <= "010";
+        when 164 => neg_id <= "010";
+        when 165 => neg_id <= "010";
+        when 166 => neg_id <= "010";
+        when 167 => neg_id <= "010";
+        when 168 => neg_id <= "010";
+        when 169 => neg_id <= "010";
+        when 170 => neg_id <= "010";
+        when 171 => neg_id <= "010";
+        when 172 => neg_id <= "010";
+        when 173 => neg_id <= "010";
+        when 174 => neg_id <= "010";
+        when 175 => neg_id <= "010";
+        when 176 => neg_id <= "010";
+        when 177 => neg_id <= "010";
+        when 178 => neg_id <= "010";
+        when 179 => neg_id <= "010";
+        when 180 => neg_id <= "010";
+        when 181 => neg_id <= "010";
+        when 182 => neg_id <= "010";
+        when 183 => neg_id <= "010";
+        when 184 => neg_id <= "010";
+        when 185 => neg_id <= "010";
+        when 186 => neg_id <= "010";
+        when 187 => neg_id <= "010";
+        when 188 => neg_id <= "010";
+        when 189 => neg_id <= "010";
+        when 190 => neg_id <= "010";
+        when 191 => neg_id <= "010";
+        when 192 => neg_id <= "010";
+        when 193 => neg_id <= "010";
+        when 194 => neg_id <= "010";
+        when 195 => neg_id <= "010";
+        when 196 => neg_id <= "010";
+        when 197 => neg_id <= "010";
+        when 198 => neg_id <= "010";
+        when 199 => neg_id <= "010";
+        when 200 => neg_id <= "010";
+        when 201 => neg_id <= "010";
+        when 202 => neg_id <= "010";
+        when 203 => neg_id <= "010";
+        when 204 => neg_id <= "010";
+        when 205 => neg_id <= "010";
+        when 206 => neg_id <= "010";
+        when 207 => neg_id <= "010";
+        when 208 => neg_id <= "010";
+        when 209 => neg_id <= "010";
+        when 210 => neg_id <= "010";
+        when 211 => neg_id <= "010";
+        when 212 => neg_id <= "010";
+        when 213 => neg_id <= "010";
+        when 214 => neg_id <= "010";
+        when 215 => neg_id <= "010";
+        when 216 => neg_id <= "010";
+        when 217 => neg_id <= "010";
+        when 218 => neg_id <= "010";
+        when 219 => neg_id <= "010";
+        when 220 => neg_id <= "010";
+        when 221 => neg_id <= "010";
+        when 222 => neg_id <= "010";
+        when 223 => neg_id <= "010";
+        when 224 => neg_id <= "010";
+        when 225 => neg_id <= "010";
+        when 226 => neg_id <= "011";
+        when 227 => neg_id <= "011";
+        when 228 => neg_id <= "011";
+        when 229 => neg_id <= "011";
+        when 230 => neg_id <= "011";
+        when 231 => neg_id <= "011";
+        when 232 => neg_id <= "011";
+        when 233 => neg_id <= "011";
+        when 234 => neg_id <= "011";
+        when 235 => neg_id <= "011";
+        when 236 => neg_id <= "011";
+        when 237 => neg_id <= "011";
+        when 238 => neg_id <= "011";
+        when 239 => neg_id <= "011";
+        when 240 => neg_id <= "011";
+        when 241 => neg_id <= "011";
+        when 242 => neg_id <= "011";
+        when 243 => neg_id <= "011";
+        when 244 => neg_id <= "011";
+        when 245 => neg_id <= "011";
+        when 246 => neg_id <= "011";
+        when 247 => neg_id <= "011";
+        when 248 => neg_id <= "011";
+        when 249 => neg_id <= "011";
+        when 250 => neg_id <= "011";
+        when 251 => neg_id <= "100";
+        when 252 => neg_id <= "100";
+        when 253 => neg_id <= "100";
+        when 254 => neg_id <= "100";
+        when others => neg_id <= "101";
+    end case;
+end process NEGATIVESAMPLER_LOOKUP;
+
+end architecture MyHDL;
@@ -0,0 +1,45 @@
+// File: ./ex-target/RamWide.v
+// Generated by MyHDL 0.9.0
+// Date: Sat Oct 17 05:41:51 2026
+
+
+`timescale 1ns/10ps
+
+module RamWide (
+    dout_vec,
+    din_vec,
+    addr,
+    wr,
+    clk
+);
+// Synthesizable wide-port RAM model with one vector per address.
+// 
+// :param dout_vec: data output vector, registered
+// :param din_vec: data input vector
+// :param addr: address bus
+// :param wr: write enabled
+// :param clk: clock input
+// :param depth: number of vectors
+// :param mem: list of depth signals to use as storage (for preloading and inspection in simulation), created if None
+
+output [47:0] dout_vec;
+reg [47:0] dout_vec;
+input [47:0] din_vec;
+input [3:0] addr;
+input wr;
+input clk;
+
+
+reg [47:0] mem [0:16-1];
+
+
+
+
+always @(posedge clk) begin: RAMWIDE_ACCESS
+    if (wr) begin
+        mem[addr] <= din_vec;
+    end
+    dout_vec <= mem[addr];
+end
+
+endmodule
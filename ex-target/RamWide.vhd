@@ -0,0 +1,57 @@
+-- File: ./ex-target/RamWide.vhd
+-- Generated by MyHDL 0.9.0
+-- Date: Sat Oct 17 05:41:51 2026
+
+
+library IEEE;
+use IEEE.std_logic_1164.all;
+use IEEE.numeric_std.all;
+use std.textio.all;
+
+use work.pck_myhdl_090.all;
+
+entity RamWide is
+    port (
+        dout_vec: out unsigned(47 downto 0);
+        din_vec: in unsigned(47 downto 0);
+        addr: in unsigned(3 downto 0);
+        wr: in std_logic;
+        clk: in std_logic
+    );
+end entity RamWide;
+-- Synthesizable wide-port RAM model with one vector per address.
+-- 
+-- :param dout_vec: data output vector, registered
+-- :param din_vec: data input vector
+-- :param addr: address bus
+-- :param wr: write enabled
+-- :param clk: clock input
+-- :param depth: number of vectors
+-- :param mem: list of depth signals to use as storage (for preloading and inspection in simulation), created if None
+
+architecture MyHDL of RamWide is
+
+
+
+
+
+type t_array_mem is array(0 to 16-1) of unsigned(47 downto 0);
+signal mem: t_array_mem;
+
+begin
+
+
+
+
+
+RAMWIDE_ACCESS: process (clk) is
+begin
+    if rising_edge(clk) then
+        if bool(wr) then
+            mem(to_integer(addr)) <= din_vec;
+        end if;
+        dout_vec <= mem(to_integer(addr));
+    end if;
+end process RAMWIDE_ACCESS;
+
+end architecture MyHDL;
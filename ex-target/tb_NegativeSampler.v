@@ -0,0 +1,23 @@
+module tb_NegativeSampler;
+
+wire [2:0] neg_id;
+reg enable;
+reg clk;
+
+initial begin
+    $from_myhdl(
+        enable,
+        clk
+    );
+    $to_myhdl(
+        neg_id
+    );
+end
+
+NegativeSampler dut(
+    neg_id,
+    enable,
+    clk
+);
+
+endmodule
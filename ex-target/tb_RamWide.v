@@ -0,0 +1,29 @@
+module tb_RamWide;
+
+wire [47:0] dout_vec;
+reg [47:0] din_vec;
+reg [3:0] addr;
+reg wr;
+reg clk;
+
+initial begin
+    $from_myhdl(
+        din_vec,
+        addr,
+        wr,
+        clk
+    );
+    $to_myhdl(
+        dout_vec
+    );
+end
+
+RamWide dut(
+    dout_vec,
+    din_vec,
+    addr,
+    wr,
+    clk
+);
+
+endmodule
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Fixed-point number format configuration and overflow/saturation/underflow telemetry.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import re
+import numpy as np
+
+
+def fix_code(val, fix_res):
+    """Convert float value(s) to fixbv integer codes (round half away from zero)."""
+    x = np.asarray(val, dtype=np.float64) / fix_res
+    return (np.sign(x) * np.floor(np.abs(x) + 0.5)).astype(np.int64)
+
+
+def fix_float(code, fix_res):
+    """Convert fixbv integer code(s) back to float value(s)."""
+    return np.asarray(code, dtype=np.float64) * fix_res
+
+
+class FixFormat(object):
+    """Signed fixed-point format Qm.n with m integer and n fractional bits (plus sign bit).
+
+    Provides the fixbv parameters (fix_min, fix_max, fix_res), total width and
+    range of raw integer codes for HDL models, test benches and engines.
+    """
+
+    def __init__(self, int_bits=7, frac_bits=8):
+        self.int_bits = int_bits
+        self.frac_bits = frac_bits
+        self.fix_min = -2**int_bits
+        self.fix_max = 2**int_bits
+        self.fix_res = 2.0**-frac_bits
+        self.fix_width = 1 + int_bits + frac_bits
+        self.code_min = -2**(int_bits + frac_bits)
+        self.code_max = 2**(int_bits + frac_bits) - 1
+
+    @property
+    def name(self):
+        return "Q%d.%d" % (self.int_bits, self.frac_bits)
+
+    def __repr__(self):
+        return "FixFormat(%d, %d)" % (self.int_bits, self.frac_bits)
+
+    def __eq__(self, other):
+        return isinstance(other, FixFormat) and (self.int_bits, self.frac_bits) == (other.int_bits, other.frac_bits)
+
+    def __ne__(self, other):
+        return not self == other
+
+    @classmethod
+    def parse(cls, text):
+        """Format from name like 'Q7.8' or 'Q3.12' (total width 1 + m + n bits)."""
+        match = re.match(r"^[Qq](\d+)\.(\d+)$", text.strip())
+        if match is None:
+            raise ValueError("invalid fixed-point format '{}', expected Qm.n".format(text))
+        return cls(int(match.group(1)), int(match.group(2)))
+
+    def code(self, val):
+        """Float value(s) to saturated integer codes."""
+        return np.clip(fix_code(val, self.fix_res), self.code_min, self.code_max)
+
+    def value(self, code):
+        """Integer code(s) to float value(s)."""
+        return fix_float(code, self.fix_res)
+
+
+# default format of all models (16 bits, range [-128, 128), resolution 1/256)
+Q7_8 = FixFormat(7, 8)
+
+
+class FixStats(object):
+    """Telemetry of fixed-point arithmetic over a run.
+
+    Counts arithmetic results that overflowed the code range (and were
+    saturated), embedding components stored at the saturation limits, and
+    embedding updates whose exact value was non-zero but rounded to zero
+    (underflowed), with the sum and maximum of their magnitudes.
+    """
+
+    def __init__(self, fmt=Q7_8):
+        self.fmt = fmt
+        self.results = 0
+        self.overflows = 0
+        self.stores = 0
+        self.saturated = 0
+        self.updates = 0
+        self.underflows = 0
+        self.underflow_sum = 0.0
+        self.underflow_max = 0.0
+
+    def saturate(self, x):
+        """Saturate integer codes to representable range and count overflows."""
+        x = np.asarray(x)
+        over = np.count_nonzero((x > self.fmt.code_max) | (x < self.fmt.code_min))
+        self.results += x.size
+        self.overflows += over
+        return np.clip(x, self.fmt.code_min, self.fmt.code_max) if over else x
+
+    def record_updates(self, exact, rounded, shift):
+        """Count updates with non-zero exact value (codes with shift fractional bits) rounded to zero."""
+        exact = np.asarray(exact)
+        under = (exact != 0) & (np.asarray(rounded) == 0)
+        self.updates += exact.size
+        n = np.count_nonzero(under)
+        if n:
+            size = np.abs(exact[under]) * 2.0**-(self.fmt.frac_bits + shift)
+            self.underflows += n
+            self.underflow_sum += float(size.sum())
+            self.underflow_max = max(self.underflow_max, float(size.max()))
+
+    def record_stores(self, codes):
+        """Count stored embedding components at saturation limits."""
+        codes = np.asarray(codes)
+        self.stores += codes.size
+        self.saturated += np.count_nonzero((codes == self.fmt.code_max) | (codes == self.fmt.code_min))
+
+    def summary(self):
+        return {
+            'format': self.fmt.name,
+            'results': self.results,
+            'overflows': self.overflows,
+            'stores': self.stores,
+            'saturated': self.saturated,
+            'updates': self.updates,
+            'underflows': self.underflows,
+            'underflow_mean': self.underflow_sum / max(self.underflows, 1),
+            'underflow_max': self.underflow_max,
+        }
+
+    def report(self):
+        s = self.summary()
+        return "format: %s, overflows: %d/%d, saturated stores: %d/%d, underflowed updates: %d/%d (mean: %g, max: %g)" % (s['format'], s['overflows'], s['results'], s['saturated'], s['stores'], s['underflows'], s['updates'], s['underflow_mean'], s['underflow_max'])
+
+
+def test_format():
+    """Testing bench for format parameters and telemetry counts."""
+
+    for name, width in [("Q7.8", 16), ("Q3.12", 16), ("Q5.10", 16), ("Q3.8", 12)]:
+        fmt = FixFormat.parse(name)
+        assert fmt.name == name and fmt.fix_width == width
+        assert fmt.code(fmt.fix_max) == fmt.code_max and fmt.code(fmt.fix_min) == fmt.code_min
+        assert fmt.value(fmt.code(fmt.fix_res * 3)) == fmt.fix_res * 3
+        print "%-6s width: %2d, range: [%g, %g), res: %g" % (fmt.name, fmt.fix_width, fmt.fix_min, fmt.fix_max, fmt.fix_res)
+
+    stats = FixStats(Q7_8)
+    stats.saturate([Q7_8.code_max + 1, 0, Q7_8.code_min - 5])
+    stats.record_updates([0, 100, -40000], [0, 0, -1], 8)
+    stats.record_stores([Q7_8.code_max, 1, 2])
+    assert (stats.overflows, stats.underflows, stats.saturated) == (2, 1, 1)
+    print stats.report()
+
+
+if __name__ == '__main__':
+    test_format()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Self-checking HDL testbench flow for converted WordContextUpdated under Icarus Verilog or GHDL.
+
+The design is converted with plain input vectors (not ConcatSignal ports as
+in ex-target/), stimulus vectors and expected results are produced by the
+Python reference model (engine.py) and written as a hex file, and a
+generated testbench applies one vector per clock cycle, compares all
+outputs and reports pairs and mismatches. The design is combinational, so
+it accepts one pair per cycle by construction and no cycle count is
+reported (see WordContextPipelined.test_throughput for pipelined timing).
+
+Usage:
+
+    python hdlcheck.py --simulator icarus --n 10000
+    python hdlcheck.py --simulator ghdl --n 10000
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import argparse
+import glob
+import os
+import re
+import subprocess
+import numpy as np
+
+from engine import Engine
+from fixformat import Q7_8, FixFormat, fix_code
+
+TB_VERILOG = """\
+// Self-checking testbench generated by hdlcheck.py
+`timescale 1ns/10ps
+
+module check_{name};
+
+localparam N = {n};
+localparam W = {vec_width};
+
+reg [W-1:0] vectors [0:N-1];
+reg clk = 0;
+reg signed [{fix_width}-1:0] y_actual;
+reg [{emb_width}-1:0] word_embv;
+reg [{emb_width}-1:0] context_embv;
+wire signed [{fix_width}-1:0] y;
+wire signed [{fix_width}-1:0] error;
+wire [{emb_width}-1:0] new_word_embv;
+wire [{emb_width}-1:0] new_context_embv;
+integer i;
+integer mismatches;
+
+{name} dut(
+    .y(y),
+    .error(error),
+    .new_word_embv(new_word_embv),
+    .new_context_embv(new_context_embv),
+    .y_actual(y_actual),
+    .word_embv(word_embv),
+    .context_embv(context_embv)
+);
+
+always #5 clk = !clk;
+
+initial begin
+    $readmemh("{vector_file}", vectors);
+    mismatches = 0;
+    for (i = 0; i < N; i = i + 1) begin
+        @(negedge clk);
+        y_actual = vectors[i][{in_lsb} + {fix_width} + 2 * {emb_width} - 1 -: {fix_width}];
+        word_embv = vectors[i][{in_lsb} + 2 * {emb_width} - 1 -: {emb_width}];
+        context_embv = vectors[i][{in_lsb} + {emb_width} - 1 -: {emb_width}];
+        @(posedge clk);
+        if ({{y, error, new_word_embv, new_context_embv}} !== vectors[i][{in_lsb} - 1:0]) begin
+            mismatches = mismatches + 1;
+            if (mismatches <= 10)
+                $display("mismatch %0d: got %h, expected %h", i, {{y, error, new_word_embv, new_context_embv}}, vectors[i][{in_lsb} - 1:0]);
+        end
+    end
+    $display("pairs: %0d, mismatches: %0d", N, mismatches);
+    $finish;
+end
+
+endmodule
+"""
+
+TB_VHDL = """\
+-- Self-checking testbench generated by hdlcheck.py
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use std.textio.all;
+
+entity check_{name} is
+end entity check_{name};
+
+architecture sim of check_{name} is
+    constant W: integer := {vec_width};
+    constant IN_LSB: integer := {in_lsb};
+    constant FIX_WIDTH: integer := {fix_width};
+    constant EMB_WIDTH: integer := {emb_width};
+
+    signal clk: std_logic := '0';
+    signal done: boolean := false;
+    signal y: signed(FIX_WIDTH - 1 downto 0);
+    signal error: signed(FIX_WIDTH - 1 downto 0);
+    signal new_word_embv: unsigned(EMB_WIDTH - 1 downto 0);
+    signal new_context_embv: unsigned(EMB_WIDTH - 1 downto 0);
+    signal y_actual: signed(FIX_WIDTH - 1 downto 0) := (others => '0');
+    signal word_embv: unsigned(EMB_WIDTH - 1 downto 0) := (others => '0');
+    signal context_embv: unsigned(EMB_WIDTH - 1 downto 0) := (others => '0');
+begin
+
+    dut: entity work.{name}
+        port map (
+            y => y,
+            error => error,
+            new_word_embv => new_word_embv,
+            new_context_embv => new_context_embv,
+            y_actual => y_actual,
+            word_embv => word_embv,
+            context_embv => context_embv
+        );
+
+    clk <= not clk after 5 ns when not done;
+
+    stimulus: process
+        file vectors: text open read_mode is "{vector_file}";
+        variable l: line;
+        variable v: std_logic_vector(W - 1 downto 0);
+        variable got: std_logic_vector(IN_LSB - 1 downto 0);
+        variable pairs: integer := 0;
+        variable mismatches: integer := 0;
+    begin
+        while not endfile(vectors) loop
+            readline(vectors, l);
+            hread(l, v);
+            wait until falling_edge(clk);
+            y_actual <= signed(v(IN_LSB + FIX_WIDTH + 2 * EMB_WIDTH - 1 downto IN_LSB + 2 * EMB_WIDTH));
+            word_embv <= unsigned(v(IN_LSB + 2 * EMB_WIDTH - 1 downto IN_LSB + EMB_WIDTH));
+            context_embv <= unsigned(v(IN_LSB + EMB_WIDTH - 1 downto IN_LSB));
+            wait until rising_edge(clk);
+            got := std_logic_vector(y) & std_logic_vector(error) & std_logic_vector(new_word_embv) & std_logic_vector(new_context_embv);
+            if got /= v(IN_LSB - 1 downto 0) then
+                mismatches := mismatches + 1;
+                if mismatches <= 10 then
+                    report "mismatch " & integer'image(pairs) & ": got " & to_hstring(got) & ", expected " & to_hstring(v(IN_LSB - 1 downto 0));
+                end if;
+            end if;
+            pairs := pairs + 1;
+        end loop;
+        report "pairs: " & integer'image(pairs) & ", mismatches: " & integer'image(mismatches);
+        done <= true;
+        wait;
+    end process stimulus;
+
+end architecture sim;
+"""
+
+
+def stimulus_vectors(n, emb_spread=1.0, embedding_dim=3, rand_seed=42, fmt=Q7_8):
+    """Random stimulus and expected results of Python reference model as integer codes.
+
+    :returns: y_actual, word, context, y, error, new_word, new_context
+    """
+    engine = Engine(1, embedding_dim, fmt=fmt, rand_seed=rand_seed)
+    word = fix_code(engine.rng.uniform(-emb_spread, emb_spread, size=(n, embedding_dim)), engine.fix_res)
+    context = fix_code(engine.rng.uniform(-emb_spread, emb_spread, size=(n, embedding_dim)), engine.fix_res)
+    y_actual = engine.one * engine.rng.randint(2, size=n)
+    y, error, new_word, new_context = engine.word_context_updated(word, context, y_actual)
+    return y_actual, word, context, y, error, new_word, new_context
+
+
+def pack_fields(fields, fix_width):
+    """Pack rows of integer codes into one unsigned integer per row (first field most significant)."""
+    mask = (1 << fix_width) - 1
+    rows = []
+    for row in zip(*[ np.asarray(f).reshape((len(f), -1)).tolist() for f in fields ]):
+        val = 0
+        for codes in row:
+            # embedding vectors hold element j at bits j * fix_width
+            for c in reversed(codes):
+                val = (val << fix_width) | (c & mask)
+        rows.append(val)
+    return rows
+
+
+def write_vectors(path, vectors, fix_width):
+    """Write stimulus and expected results as one hex word per line.
+
+    :returns: vector width in bits (multiple of 4)
+    """
+    n_bits = sum([ fix_width * (np.asarray(f).size // len(f)) for f in vectors ])
+    vec_width = -(-n_bits // 4) * 4
+    with open(path, 'w') as f:
+        for val in pack_fields(vectors, fix_width):
+            f.write("%0*x\n" % (vec_width // 4, val))
+    return vec_width
+
+
+def convert_dut(target, directory, embedding_dim=3, fmt=Q7_8):
+    """Convert WordContextUpdated with plain input and output vectors."""
+    from myhdl import Signal, intbv, fixbv
+    from WordContextUpdated import WordContextUpdated
+
+    leaky_val = 0.01
+    rate_val = 0.1
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
+
+    # signals
+    y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    error = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
+    new_word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    new_context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    y_actual = Signal(fixbv(1.0, min=fix_min, max=fix_max, res=fix_res))
+    word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+
+    # covert to HDL code
+    target.directory = directory
+    target(WordContextUpdated, y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+
+
+def generate(simulator, directory, n, embedding_dim=3, rand_seed=42, fmt=Q7_8):
+    """Convert design and write stimulus vectors and self-checking testbench.
+
+    :returns: testbench file name
+    """
+    from myhdl import toVerilog, toVHDL
+
+    fix_width = fmt.fix_width
+    emb_width = embedding_dim * fix_width
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    vector_file = "vectors.hex"
+    vectors = stimulus_vectors(n, embedding_dim=embedding_dim, rand_seed=rand_seed, fmt=fmt)
+    vec_width = write_vectors(os.path.join(directory, vector_file), vectors, fix_width)
+    params = {
+        'name': "WordContextUpdated",
+        'n': n,
+        'vec_width': vec_width,
+        'in_lsb': 2 * fix_width + 2 * emb_width,
+        'fix_width': fix_width,
+        'emb_width': emb_width,
+        'vector_file': vector_file,
+    }
+
+    if simulator == 'icarus':
+        convert_dut(toVerilog, directory, embedding_dim, fmt)
+        tb_file = "check_WordContextUpdated.v"
+        template = TB_VERILOG
+    else:
+        convert_dut(toVHDL, directory, embedding_dim, fmt)
+        tb_file = "check_WordContextUpdated.vhd"
+        template = TB_VHDL
+    with open(os.path.join(directory, tb_file), 'w') as f:
+        f.write(template.format(**params))
+    return tb_file
+
+
+def simulate(simulator, directory, tb_file):
+    """Compile and run testbench in simulator.
+
+    :returns: dict with pairs and mismatches, and simulator output
+    """
+    if simulator == 'icarus':
+        commands = [
+            ["iverilog", "-g2005", "-o", "check.vvp", tb_file, "WordContextUpdated.v"],
+            ["vvp", "-n", "check.vvp"],
+        ]
+    else:
+        packages = [ os.path.basename(p) for p in glob.glob(os.path.join(directory, "pck_myhdl_*.vhd")) ]
+        commands = [
+            ["ghdl", "-a", "--std=08"] + packages + ["WordContextUpdated.vhd", tb_file],
+            ["ghdl", "-e", "--std=08", "check_WordContextUpdated"],
+            ["ghdl", "-r", "--std=08", "check_WordContextUpdated"],
+        ]
+
+    output = ""
+    for cmd in commands:
+        output += subprocess.check_output(cmd, cwd=directory, stderr=subprocess.STDOUT)
+
+    m = re.search(r"pairs: (\d+), mismatches: (\d+)", output)
+    if m is None:
+        raise RuntimeError("no summary in simulator output:\n{}".format(output))
+    pairs, mismatches = [ int(g) for g in m.groups() ]
+    return {'pairs': pairs, 'mismatches': mismatches, 'output': output}
+
+
+if __name__ == '__main__':
+    # parse arguments
+    argp = argparse.ArgumentParser(description=__doc__.strip().split("\n", 1)[0])
+    argp.add_argument('--simulator', choices=['icarus', 'ghdl'], default='icarus',
+        help="HDL simulator, Icarus Verilog or GHDL")
+    argp.add_argument('--n', type=int, default=10000,
+        help="number of stimulus vectors (training pairs)")
+    argp.add_argument('--directory', default="./ex-check",
+        help="directory for converted design, vectors and testbench")
+    argp.add_argument('--seed', type=int, default=42,
+        help="random seed of stimulus vectors")
+    argp.add_argument('--fix-format', default="Q7.8",
+        help="fixed-point format Qm.n of converted design")
+    args = argp.parse_args()
+
+    tb_file = generate(args.simulator, args.directory, args.n, rand_seed=args.seed, fmt=FixFormat.parse(args.fix_format))
+    result = simulate(args.simulator, args.directory, tb_file)
+    for line in result['output'].splitlines():
+        if "mismatch" in line:
+            print line
+    print "%s pairs: %d, mismatches: %d" % (args.simulator, result['pairs'], result['mismatches'])
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Multiprocess Hogwild-style training across corpus shards.
+
+Workers train on their own shards against embedding tables in shared memory
+and update them without locks.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import copy
+import multiprocessing
+import time
+import numpy as np
+
+from engine import Engine
+from fixformat import Q7_8
+
+
+def shard_corpus(x_vocab, n_shards):
+    """Split all documents into shards with about equal number of words.
+
+    :returns: list of shards, each a list of (doc index, start, stop) with words at positions [start, stop)
+    """
+    n_words = sum([ len(doc) for doc in x_vocab ])
+    shard_size = max(1, -(-n_words // n_shards))
+
+    shards = [ [] for _ in range(n_shards) ]
+    k = 0
+    left = shard_size
+    for d, doc in enumerate(x_vocab):
+        start = 0
+        while start < len(doc):
+            stop = min(start + left, len(doc))
+            shards[k].append((d, start, stop))
+            left -= stop - start
+            start = stop
+            if left == 0 and k < n_shards - 1:
+                k += 1
+                left = shard_size
+    return shards
+
+
+def shared_table(vocab_size, embedding_dim, fmt=Q7_8):
+    """Embedding table of int16 (or int32 if wider) codes in shared memory."""
+    return multiprocessing.RawArray('h' if fmt.fix_width <= 16 else 'i', vocab_size * embedding_dim)
+
+
+def table_view(raw, vocab_size, embedding_dim, fmt=Q7_8):
+    """NumPy view of a shared embedding table."""
+    return np.frombuffer(raw, dtype=np.int16 if fmt.fix_width <= 16 else np.int32).reshape((vocab_size, embedding_dim))
+
+
+_worker = {}
+
+
+def _worker_sampler(sampler, rand_seed):
+    """Negative sampler of one worker, samplers ignoring its rng (LfsrSampler) continue from their own position."""
+    if hasattr(sampler, 'seek'):
+        sampler = copy.copy(sampler)
+        sampler.seek(rand_seed)
+    return sampler
+
+
+def _init_worker(x_vocab, vocab_size, embedding_dim, wram_raw, cram_raw, sampler, negative, window, dynamic, fmt):
+    _worker['x_vocab'] = x_vocab
+    _worker['sampler'] = sampler
+    _worker['negative'] = negative
+    _worker['window'] = window
+    _worker['dynamic'] = dynamic
+    _worker['fmt'] = fmt
+    _worker['vocab_size'] = vocab_size
+    _worker['embedding_dim'] = embedding_dim
+    _worker['wram'] = table_view(wram_raw, vocab_size, embedding_dim, fmt)
+    _worker['cram'] = table_view(cram_raw, vocab_size, embedding_dim, fmt)
+
+
+def _train_shard(args):
+    """Train one shard in a worker, returns (worker id, pairs, seconds, final mse_ema)."""
+    worker_id, shard, backend, stimulus, n_passes, batch_size, rand_seed = args
+    x_vocab = _worker['x_vocab']
+    vocab_size = _worker['vocab_size']
+    embedding_dim = _worker['embedding_dim']
+    sampler = _worker_sampler(_worker['sampler'], rand_seed)
+    negative = _worker['negative']
+    window = _worker['window']
+    dynamic = _worker['dynamic']
+    fmt = _worker['fmt']
+
+    time_0 = time.time()
+    pairs = 0
+    mse_ema = None
+    if backend == 'numpy':
+        engine = Engine(vocab_size, embedding_dim, fmt=fmt, rand_seed=rand_seed, wram=_worker['wram'], cram=_worker['cram'], sampler=sampler, negative=negative, window=window, dynamic=dynamic)
+        for _ in range(n_passes):
+            for d, start, stop in shard:
+                for _ in engine.train_sequence(x_vocab[d], batch_size=batch_size, start=start, stop=stop):
+                    pass
+        pairs = engine.pairs
+        mse_ema = engine.error_ema * engine.fix_res
+    else:
+        import random
+        import train
+        from metrics import Metrics
+        from RamSim import ArrayMemory
+
+        # all shared entries are initialized
+        random.seed(rand_seed)
+        bitmap_size = (vocab_size + 7) // 8
+        wram_mem = ArrayMemory(vocab_size, width=fmt.fix_width, dim=embedding_dim, data=_worker['wram'], bitmap=np.repeat(np.uint8(0xff), bitmap_size))
+        cram_mem = ArrayMemory(vocab_size, width=fmt.fix_width, dim=embedding_dim, data=_worker['cram'], bitmap=np.repeat(np.uint8(0xff), bitmap_size))
+        metrics = Metrics()
+        train.run(x_vocab, [], vocab_size, wram_mem, cram_mem, n_passes, sampler, negative, window, dynamic, metrics=metrics, backend={'myhdl-int': 'int'}.get(backend, 'python'), stimulus=stimulus, fmt=fmt, shard=shard)
+        pairs = metrics.pairs
+        mse_ema = metrics.last('error_ema') if pairs else None
+    return worker_id, pairs, time.time() - time_0, mse_ema
+
+
+def run(x_vocab, y_skipgram, vocab_size, n_workers=None, backend='numpy', stimulus='python', n_passes=1, batch_size=10000, embedding_dim=3, rand_seed=None, sampler=None, negative=1, window=1, dynamic=False, fmt=Q7_8):
+    """Run Hogwild-style training in a pool of worker processes.
+
+    :param backend: 'numpy' for the NumPy engine, 'myhdl' or 'myhdl-int' for the simulation (see train.py)
+    :param stimulus: 'python' or 'batched' stimulus of the simulation (see train.py)
+    :param sampler: negative sampler (see sampling.py), uniform random if None
+    :param negative: number of negative samples per positive sample
+    :param window: maximal distance of context from word
+    :param dynamic: shrink window per word uniformly in [1, window]
+    :param fmt: fixed-point format of at most 32 bits (see fixformat.py)
+    :returns: word and context embedding tables as int16 (or int32 if wider) codes
+    """
+    if backend not in ['numpy', 'myhdl', 'myhdl-int']:
+        raise ValueError("backend {} is not supported by workers".format(backend))
+    if fmt.fix_width > 32:
+        raise ValueError("fixed-point format {} is wider than 32 bits".format(fmt.name))
+    n_workers = n_workers or multiprocessing.cpu_count()
+
+    # shared embedding tables with random initial values
+    wram_raw = shared_table(vocab_size, embedding_dim, fmt)
+    cram_raw = shared_table(vocab_size, embedding_dim, fmt)
+    init = Engine(vocab_size, embedding_dim, fmt=fmt, rand_seed=rand_seed)
+    table_view(wram_raw, vocab_size, embedding_dim, fmt)[:] = init.wram
+    table_view(cram_raw, vocab_size, embedding_dim, fmt)[:] = init.cram
+
+    shards = shard_corpus(x_vocab, n_workers)
+    seeds = np.random.RandomState(rand_seed).randint(2**31 - 1, size=n_workers)
+    tasks = [ (i, shards[i], backend, stimulus, n_passes, batch_size, int(seeds[i])) for i in range(n_workers) ]
+
+    time_0 = time.time()
+    pool = multiprocessing.Pool(n_workers, initializer=_init_worker, initargs=(x_vocab, vocab_size, embedding_dim, wram_raw, cram_raw, sampler, negative, window, dynamic, fmt))
+    try:
+        results = pool.map(_train_shard, tasks)
+    finally:
+        pool.close()
+        pool.join()
+    seconds = time.time() - time_0
+
+    total = 0
+    for worker_id, pairs, worker_seconds, mse_ema in sorted(results):
+        total += pairs
+        print "worker %2d: pairs: %d, pairs/s: %.0f, mse_ema: %s" % (worker_id, pairs, pairs / max(worker_seconds, 1e-9), mse_ema)
+    print "total: pairs: %d, pairs/s: %.0f, workers: %d" % (total, total / max(seconds, 1e-9), n_workers)
+
+    return table_view(wram_raw, vocab_size, embedding_dim, fmt).copy(), table_view(cram_raw, vocab_size, embedding_dim, fmt).copy()
+
+
+def test_worker_samplers(n_workers=4, n=1000, rand_seed=42):
+    """Testing bench for different negative samples of workers with LFSR sampler."""
+    from sampling import LfsrSampler, unigram_probs
+
+    rng = np.random.RandomState(rand_seed)
+    sampler = LfsrSampler(unigram_probs(rng.randint(1, 1000, size=5000)))
+    seeds = np.random.RandomState(rand_seed).randint(2**31 - 1, size=n_workers)
+    samples = [ _worker_sampler(sampler, int(seed)).sample(None, n) for seed in seeds ]
+    assert sampler.pos == 0
+    for i in range(n_workers):
+        for j in range(i):
+            assert np.mean(samples[i] == samples[j]) < 0.1
+    print "workers: %d, equal negatives between workers: %.3f" % (n_workers, max([ np.mean(samples[i] == samples[j]) for i in range(n_workers) for j in range(i) ]))
+
+
+if __name__ == '__main__':
+    # different negative samples per worker
+    test_worker_samplers()
+
+    # example training data
+    rng = np.random.RandomState(42)
+    vocab_size = 213271
+    x_vocab = [ (rng.zipf(1.3, size=50000) % vocab_size).astype(np.int32) for _ in range(4) ]
+    y_skipgram = []
+
+    # compare scaling with number of workers
+    for n_workers in [1, 2, 4]:
+        run(x_vocab, y_skipgram, vocab_size, n_workers=n_workers, rand_seed=42)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Low-overhead training metrics accumulated in preallocated arrays.
+
+Per-step values are only stored into arrays. Every `interval` steps they
+are summarized into one row (pairs, pairs/s, error EMA, mean MSE, RAM
+transactions and MSE histogram) and appended to a CSV file or to a binary
+file of little-endian float64 rows.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import os
+import time
+import numpy as np
+
+# upper edges of MSE histogram bins (last bin open-ended)
+MSE_BINS = [2**-8, 2**-6, 2**-4, 2**-2, 1.0, 4.0, 16.0]
+COLUMNS = ['pairs', 'seconds', 'pairs_per_s', 'error_ema', 'mse', 'ram_reads', 'ram_writes'] + [ "mse_hist_{}".format(i) for i in range(len(MSE_BINS) + 1) ]
+
+
+class Metrics(object):
+    """Training metrics flushed every `interval` steps.
+
+    :param interval: steps between flushes (and capacity of arrays)
+    :param path: log file, '.csv' for CSV and binary float64 rows otherwise, no log if None
+    :param verbose: print one summary line per flush
+    :param pairs: initial count of training pairs (e.g. of resumed training)
+    """
+
+    def __init__(self, interval=10000, path=None, verbose=False, pairs=0):
+        self.interval = interval
+        self.path = path
+        self.verbose = verbose
+
+        # preallocated arrays
+        self.mse = np.zeros(interval, dtype=np.float64)
+        self.error_ema = np.zeros(interval, dtype=np.float64)
+        self.bins = np.array(MSE_BINS)
+        self.row = np.zeros(len(COLUMNS), dtype=np.float64)
+        self.n = 0
+
+        self.pairs = pairs
+        self.pairs_0 = pairs
+        self.ram_reads = 0
+        self.ram_writes = 0
+        self.time_0 = time.time()
+
+        # header of new CSV log, rows of resumed training are appended
+        if path is not None and path.endswith('.csv') and not (os.path.exists(path) and os.path.getsize(path)):
+            with open(path, 'wb') as f:
+                f.write(",".join(COLUMNS) + "\n")
+
+    def resume(self, pairs):
+        """Continue counting from training pairs of resumed training."""
+        self.pairs = pairs
+        self.pairs_0 = pairs
+        self.time_0 = time.time()
+
+    def last(self, column):
+        """Value of column (see COLUMNS) in last flushed row."""
+        return self.row[COLUMNS.index(column)]
+
+    def record(self, mse, error_ema, ram_reads=0, ram_writes=0):
+        """Record one training step."""
+        self.mse[self.n] = mse
+        self.error_ema[self.n] = error_ema
+        self.ram_reads += ram_reads
+        self.ram_writes += ram_writes
+        self.n += 1
+        self.pairs += 1
+        if self.n == self.interval:
+            self.flush()
+
+    def record_batch(self, mse, error_ema, ram_reads=0, ram_writes=0):
+        """Record a batch of training steps with array of MSE values."""
+        mse = np.asarray(mse, dtype=np.float64)
+        self.ram_reads += ram_reads
+        self.ram_writes += ram_writes
+        i = 0
+        while i < len(mse):
+            k = min(len(mse) - i, self.interval - self.n)
+            self.mse[self.n:self.n + k] = mse[i:i + k]
+            self.error_ema[self.n:self.n + k] = error_ema
+            self.n += k
+            self.pairs += k
+            i += k
+            if self.n == self.interval:
+                self.flush()
+
+    def flush(self):
+        """Summarize recorded steps into one row and append it to log."""
+        if self.n == 0:
+            return
+        now = time.time()
+        mse = self.mse[:self.n]
+
+        row = self.row
+        row[0] = self.pairs
+        row[1] = now - self.time_0
+        row[2] = (self.pairs - self.pairs_0) / max(now - self.time_0, 1e-9)
+        row[3] = self.error_ema[self.n - 1]
+        row[4] = mse.mean()
+        row[5] = self.ram_reads
+        row[6] = self.ram_writes
+        row[7:] = np.bincount(np.searchsorted(self.bins, mse), minlength=len(self.bins) + 1)
+
+        if self.path is not None:
+            with open(self.path, 'ab') as f:
+                if self.path.endswith('.csv'):
+                    f.write(",".join([ "%.9g" % v for v in row ]) + "\n")
+                else:
+                    row.astype('<f8').tofile(f)
+        if self.verbose:
+            print "%8d mse_ema: %f, mse: %f, pairs/s: %.0f, ram reads: %d, writes: %d" % (row[0], row[3], row[4], row[2], row[5], row[6])
+
+        self.n = 0
+
+
+def read_log(path):
+    """Read metrics log as structured array with COLUMNS as fields."""
+    dtype = np.dtype([ (c, '<f8') for c in COLUMNS ])
+    if path.endswith('.csv'):
+        return np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2).view(dtype).ravel()
+    return np.fromfile(path, dtype=dtype)
+
+
+def test_metrics(n=25000, interval=1000, rand_seed=42):
+    """Testing bench for flushed rows of CSV and binary logs."""
+
+    import tempfile
+
+    rng = np.random.RandomState(rand_seed)
+    mse = rng.exponential(0.1, size=n)
+    directory = tempfile.mkdtemp()
+    for name in ["metrics.csv", "metrics.bin"]:
+        path = os.path.join(directory, name)
+        metrics = Metrics(interval, path)
+        for i in range(n // 2):
+            metrics.record(mse[i], 0.5, ram_reads=2, ram_writes=2)
+        metrics.record_batch(mse[n // 2:], 0.5, ram_reads=2 * (n - n // 2), ram_writes=2 * (n - n // 2))
+        metrics.flush()
+
+        # resumed training appends to log
+        resumed = Metrics(interval, path, pairs=n)
+        resumed.record(mse[0], 0.5)
+        resumed.flush()
+
+        log = read_log(path)
+        print "%s rows: %d, pairs: %d, ram reads: %d, hist: %s" % (name, len(log), log['pairs'][-1], log['ram_reads'][-1], [ int(log[c].sum()) for c in COLUMNS[7:] ])
+        assert len(log) == -(-n // interval) + 1 and log['pairs'][-2] == n and log['pairs'][-1] == n + 1
+        assert sum([ log[c].sum() for c in COLUMNS[7:] ]) == n + 1
+        assert np.allclose(log['mse'][0], mse[:interval].mean())
+        assert resumed.last('pairs') == n + 1 and resumed.last('error_ema') == 0.5
+        os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    # log flushed rows
+    test_metrics()
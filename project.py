@@ -11,13 +11,23 @@ __license__ = "GPLv3+"
 
 import argparse
 import logging
+import os
 import resource
 import time
 import zipfile
 import numpy as np
 
-import data.keras_preprocessing_text as text
-from train import run
+import corpus
+import embeddings
+import engine
+import hogwild
+from fixformat import FixFormat, FixStats
+from metrics import Metrics
+from simprofile import SimProfiler
+import sampling
+import train
+from tokenizer import fit_zip
+from vocab import UNK_ID, oov_counts
 
 
 ### Logging
@@ -66,26 +76,25 @@ def profile(func, log=None):
 
 ### Load dataset
 
-def build_x_vocab(doc_ids, words_all, word2id):
-    """Prepare numpy array for x_vocab (doc, time, vocab)."""
+def load(dataset_path, vocab_size=None, skipgram_window_size=4, chunk_size=2**20, cache=True, min_count=1, n_workers=None, unk=False):
+    """Load dataset and transform it to numerical form.
 
-    x_vocab = []
-    for doc_id in doc_ids:
-        doc_vocab = []
-        for word in words_all[doc_id]:
-            # map words to vocabulary indexes
-            try:
-                doc_vocab.append(word2id[word])
-            except KeyError:  # missing in vocabulary
-                doc_vocab.append(word2id[''])
+    Zip members (or byte ranges of large members) are streamed in chunks
+    once by a pool of n_workers processes (all cores if None), words are
+    counted and get ids in the same pass, and partial counts are merged.
+    Results are cached next to the dataset and memory-mapped on later runs.
 
-        # store as numpy array
-        x_vocab.append(np.asarray(doc_vocab, dtype=np.float32))
-    return x_vocab
+    Words occurring fewer than min_count times or with ids not below
+    vocab_size are dropped from the vocabulary and from documents, or
+    mapped to the reserved UNK_ID in documents if unk.
+    """
 
-
-def load(dataset_path, vocab_size=None, skipgram_window_size=4):
-    """Load dataset and transform it to numerical form."""
+    # y_skipgram is constant for skip-gram without negative sampling
+    if cache:
+        cached = corpus.load_cache(dataset_path, nb_words=vocab_size, min_count=min_count, unk=unk)
+        if cached is not None:
+            x_vocab, doc_ids, vocab = cached
+            return x_vocab, [], doc_ids, vocab
 
     # CoNLL15st dataset
     # load all words by document id
@@ -94,23 +103,14 @@ def load(dataset_path, vocab_size=None, skipgram_window_size=4):
     #word2id = build_word2id(words_all, max_vocab_size=vocab_size)
 
     # Plain text dataset in .zip format
-    tokenizer = text.Tokenizer(nb_words=vocab_size)
     fzip = zipfile.ZipFile(dataset_path, 'r')
-    words_all = {}
-    for doc_id in fzip.namelist():
-        doc_text = fzip.read(doc_id)
-        print doc_id, len(doc_text)
-        words_all[doc_id] = text.text_to_word_sequence(doc_text, lower=False)
-        tokenizer.fit_on_texts([doc_text])
+    for info in fzip.infolist():
+        print info.filename, info.file_size
     fzip.close()
-    word2id = tokenizer.word_index
-
-    # fix order of document ids
-    doc_ids = [ doc_id  for doc_id in words_all ]
 
-    # prepare numpy for x_vocab (doc, time, vocab)
-    # (vocabulary indexes of words per document)
-    x_vocab = build_x_vocab(doc_ids, words_all, word2id)
+    # build vocabulary and prepare numpy for x_vocab (doc, time, vocab)
+    # (vocabulary indexes of words per document) in one pass over chunks
+    doc_ids, x_vocab, vocab = fit_zip(dataset_path, n_workers, chunk_size=chunk_size, min_count=min_count, nb_words=vocab_size, unk=unk)
 
     # prepare numpy for y_skipgram (doc, time, window, SG label)
     # (word-context pair labels for skip-gram model without negative sampling per document)
@@ -118,7 +118,10 @@ def load(dataset_path, vocab_size=None, skipgram_window_size=4):
     #y_skipgram = [ np.ones((len(words_all[doc_id]), skipgram_window_size))  for doc_id in doc_ids ]
     y_skipgram = []  # constant for skip-gram without negative sampling
 
-    return x_vocab, y_skipgram, doc_ids, words_all, word2id
+    if cache:
+        corpus.save_cache(dataset_path, x_vocab, doc_ids, vocab, nb_words=vocab_size, min_count=min_count, unk=unk)
+
+    return x_vocab, y_skipgram, doc_ids, vocab
 
 
 ### Main
@@ -130,24 +133,128 @@ if __name__ == '__main__':
         help="directory for storing trained model and other resources")
     argp.add_argument('dataset_path',
         help="dataset text corpus in .zip format")
+    argp.add_argument('--engine', choices=['myhdl', 'myhdl-int', 'cosim', 'numpy'], default='myhdl',
+        help="training engine, MyHDL simulation (fixbv or integer-domain datapath), co-simulation in Icarus Verilog or NumPy fixed-point reference")
+    argp.add_argument('--stimulus', choices=['python', 'batched'], default='python',
+        help="MyHDL training stimulus, pairs fed by the Python driver or precomputed per block and replayed from a ROM block")
+    argp.add_argument('--workers', type=int, default=0,
+        help="train corpus shards in parallel Hogwild-style worker processes")
+    argp.add_argument('--min-count', type=int, default=1,
+        help="drop words occurring fewer times from vocabulary")
+    argp.add_argument('--nb-words', type=int, default=None,
+        help="cap vocabulary to word ids below this number (most frequent words)")
+    argp.add_argument('--unk', action='store_true',
+        help="map words pruned from vocabulary to reserved id 0 (UNK) instead of dropping them")
+    argp.add_argument('--tokenize-workers', type=int, default=None,
+        help="processes counting zip members or byte ranges when building vocabulary, all cores by default")
+    argp.add_argument('--no-cache', action='store_true',
+        help="do not use or write cached token ids next to the dataset")
+    argp.add_argument('--sampler', choices=['unigram', 'uniform', 'lfsr'], default='unigram',
+        help="negative sampling distribution, unigram^0.75 (word2vec), uniform, or unigram^0.75 table at LFSR states (as NegativeSampler in hardware)")
+    argp.add_argument('--negative', type=int, default=1,
+        help="number of negative samples per positive sample")
+    argp.add_argument('--window', type=int, default=1,
+        help="skip-gram window size (contexts at distance 1 to window on both sides)")
+    argp.add_argument('--dynamic-window', action='store_true',
+        help="shrink window per word uniformly in [1, window] (word2vec)")
+    argp.add_argument('--subsample', type=float, default=1e-3,
+        help="threshold for subsampling frequent words, 0 to disable")
+    argp.add_argument('--seed', type=int, default=1,
+        help="random seed for subsampling (fixed, so resumed runs see the same corpus)")
+    argp.add_argument('--epochs', type=int, default=None,
+        help="stop after epochs over all documents, never if not given")
+    argp.add_argument('--max-pairs', type=int, default=None,
+        help="stop after number of training pairs")
+    argp.add_argument('--checkpoint-interval', type=int, default=None,
+        help="write checkpoint to experiment_dir every number of training pairs and resume from it, 0 to disable (default 1000000, disabled with --workers)")
+    argp.add_argument('--metrics', default=None,
+        help="metrics log file in experiment_dir, '.csv' for CSV or binary float64 rows otherwise")
+    argp.add_argument('--metrics-interval', type=int, default=10000,
+        help="training pairs between flushes of metrics")
+    argp.add_argument('--verbose', action='store_true',
+        help="print summary of metrics on every flush")
+    argp.add_argument('--fix-format', default="Q7.8",
+        help="fixed-point format Qm.n of embeddings and datapath (1 + m + n bits), e.g. Q3.12, Q5.10 or Q3.8")
+    argp.add_argument('--fix-stats', action='store_true',
+        help="report overflows, saturated stores and updates underflowed to zero at the end")
+    argp.add_argument('--export', default=None,
+        help="export word embeddings in experiment_dir at the end, '.npy' for NumPy matrix with vocabulary, '.bin' for word2vec binary, otherwise word2vec text format")
+    argp.add_argument('--profile-sim', action='store_true',
+        help="report generator fires, wall time and signal transitions of MyHDL simulation")
     args = argp.parse_args()
+    if args.workers and (args.checkpoint_interval or args.max_pairs is not None):
+        argp.error("--checkpoint-interval and --max-pairs are not supported with --workers")
+    if args.workers and (args.engine == 'cosim' or args.fix_stats or args.metrics or args.profile_sim):
+        argp.error("--engine cosim, --fix-stats, --metrics and --profile-sim are not supported with --workers")
+    if args.checkpoint_interval is None:
+        args.checkpoint_interval = 0 if args.workers else 10**6
 
     # defaults
-    vocab_size = None
-    skipgram_window_size = 1
+    vocab_size = args.nb_words
+    skipgram_window_size = args.window
 
     # load datasets
     log.info("load datasets")
-    x_vocab, y_skipgram, doc_ids, words_all, word2id = load(args.dataset_path, vocab_size=vocab_size, skipgram_window_size=skipgram_window_size)
-    vocab_size = len(word2id)
+    x_vocab, y_skipgram, doc_ids, vocab = load(args.dataset_path, vocab_size=vocab_size, skipgram_window_size=skipgram_window_size, cache=not args.no_cache, min_count=args.min_count, n_workers=args.tokenize_workers, unk=args.unk)
+    vocab_size = len(vocab) + 1  # word ids start with 1
 
     print "x_vocab:", x_vocab[0].shape, sum([ x.nbytes  for x in x_vocab ])
     if y_skipgram:
         print "y_skipgram:", y_skipgram[0].shape, sum([ y.nbytes  for y in y_skipgram ])
     else:
-        print "y_skipgram:", (x_vocab[0].shape[0] - skipgram_window_size, skipgram_window_size), "constant"
+        print "y_skipgram:", (x_vocab[0].shape[0], 2 * skipgram_window_size), "constant"
     print "vocab_size:", vocab_size
 
+    # word counts, out-of-vocabulary words per document at UNK_ID
+    counts = vocab.counts_by_id(vocab_size)
+    if args.unk:
+        oov, oov_rates = oov_counts(x_vocab)
+        counts[UNK_ID] = oov.sum()
+        for doc_id, n, rate in zip(doc_ids, oov, oov_rates):
+            print "oov:", doc_id, n, "{:.2%}".format(rate)
+
+    # subsampling of frequent words
+    if args.subsample > 0:
+        keep = sampling.keep_probs(counts, args.subsample)
+        rng = np.random.RandomState(args.seed)
+        x_vocab = [ sampling.subsample(doc, keep, rng) for doc in x_vocab ]
+        print "subsampled x_vocab:", x_vocab[0].shape, "kept: {:.1%}".format(sum([ len(x) for x in x_vocab ]) / float(max(counts.sum(), 1)))
+
+    # negative sampling distribution
+    if args.sampler == 'unigram':
+        sampler = sampling.AliasSampler(sampling.unigram_probs(counts))
+    elif args.sampler == 'lfsr':
+        sampler = sampling.LfsrSampler(sampling.unigram_probs(counts))
+    else:
+        sampler = sampling.UniformSampler(vocab_size)
+
+    if not os.path.isdir(args.experiment_dir):
+        os.makedirs(args.experiment_dir)
+
+    # metrics of training
+    metrics_path = os.path.join(args.experiment_dir, args.metrics) if args.metrics else None
+    metrics = Metrics(args.metrics_interval, metrics_path, verbose=args.verbose)
+    fmt = FixFormat.parse(args.fix_format)
+    stats = FixStats(fmt) if args.fix_stats else None
+
+    # checkpoint of embedding memories and training position
+    checkpoint_path = None
+    if args.checkpoint_interval > 0:
+        checkpoint_path = os.path.join(args.experiment_dir, "checkpoint-{}.bin".format(args.engine))
+    params = {'dataset_sha1': corpus.source_hash(args.dataset_path), 'subsample': args.subsample, 'seed': args.seed} if checkpoint_path is not None else None
+
     # run train driver
-    log.info("run train driver")
-    run(x_vocab, y_skipgram, vocab_size)
+    log.info("run train driver ({})".format(args.engine))
+    if args.workers:
+        codes, _ = hogwild.run(x_vocab, y_skipgram, vocab_size, n_workers=args.workers, backend=args.engine, stimulus=args.stimulus, n_passes=args.epochs or 1, sampler=sampler, negative=args.negative, window=args.window, dynamic=args.dynamic_window, fmt=fmt)
+    elif args.engine == 'numpy':
+        codes = engine.run(x_vocab, y_skipgram, vocab_size, n_passes=args.epochs, sampler=sampler, negative=args.negative, window=args.window, dynamic=args.dynamic_window, max_pairs=args.max_pairs, checkpoint_path=checkpoint_path, checkpoint_interval=args.checkpoint_interval, metrics=metrics, fmt=fmt, stats=stats, params=params).wram
+    else:
+        wram_mem, _ = train.run(x_vocab, y_skipgram, vocab_size, n_passes=args.epochs, sampler=sampler, negative=args.negative, window=args.window, dynamic=args.dynamic_window, max_pairs=args.max_pairs, checkpoint_path=checkpoint_path, checkpoint_interval=args.checkpoint_interval, metrics=metrics, profiler=SimProfiler() if args.profile_sim else None, backend={'myhdl-int': 'int', 'cosim': 'cosim'}.get(args.engine, 'python'), stimulus=args.stimulus, fmt=fmt, stats=stats, params=params)
+        codes = wram_mem.data
+
+    # export word embeddings
+    if args.export:
+        export_path = os.path.join(args.experiment_dir, args.export)
+        embeddings.export(export_path, embeddings.from_codes(codes, vocab_size, fmt), vocab)
+        log.info("exported word embeddings to {}".format(export_path))
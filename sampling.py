@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Unigram^0.75 negative sampling with alias table, sample table and LFSR-indexed hardware table,
+and subsampling of frequent words.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import numpy as np
+from myhdl import Signal, intbv, delay, always, always_comb, instance, now
+from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
+
+# Galois LFSR tap masks with maximal period 2**width - 1
+LFSR_TAPS = {
+    2: 0x3, 3: 0x6, 4: 0xC, 5: 0x14, 6: 0x30, 7: 0x60, 8: 0xB8,
+    9: 0x110, 10: 0x240, 11: 0x500, 12: 0x829, 13: 0x100D, 14: 0x2015,
+    15: 0x6000, 16: 0xD008, 17: 0x12000, 18: 0x20400, 19: 0x40023,
+    20: 0x90000, 21: 0x140000, 22: 0x300000, 23: 0x420000, 24: 0xE10000,
+}
+
+
+def counts_from_word_counts(word_counts, word2id, vocab_size):
+    """Word counts of Tokenizer as array indexed by word id."""
+    counts = np.zeros(vocab_size, dtype=np.int64)
+    for w, c in word_counts.items():
+        i = word2id.get(w)
+        if i is not None and i < vocab_size:
+            counts[i] = c
+    return counts
+
+
+def counts_from_x_vocab(x_vocab, vocab_size):
+    """Word counts as array indexed by word id from documents of ids."""
+    counts = np.zeros(vocab_size, dtype=np.int64)
+    for doc in x_vocab:
+        counts += np.bincount(np.asarray(doc, dtype=np.int64), minlength=vocab_size)[:vocab_size]
+    return counts
+
+
+def unigram_probs(counts, power=0.75):
+    """Smoothed unigram distribution counts**power (word2vec)."""
+    probs = np.asarray(counts, dtype=np.float64) ** power
+    return probs / probs.sum()
+
+
+def keep_probs(counts, threshold=1e-3):
+    """Probability of keeping each word when subsampling frequent words (word2vec).
+
+    Words with frequency f above threshold t are kept with probability
+    (sqrt(f / t) + 1) * t / f, roughly Mikolov's 1 - discard probability
+    1 - sqrt(t / f).
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    scaled = threshold * counts.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keep = (np.sqrt(counts / scaled) + 1.0) * scaled / counts
+    keep[counts == 0] = 1.0
+    return np.minimum(keep, 1.0)
+
+
+def subsample(doc, keep, rng):
+    """Drop frequent words from document of ids with vectorized random mask."""
+    doc = np.asarray(doc)
+    return doc[rng.random_sample(len(doc)) < keep[doc]]
+
+
+class UniformSampler(object):
+    """Uniform sampler over all word ids (as random.randrange)."""
+
+    def __init__(self, vocab_size):
+        self.vocab_size = vocab_size
+
+    def sample(self, rng, size):
+        return rng.randint(self.vocab_size, size=size)
+
+
+class AliasSampler(object):
+    """Alias table sampler with O(1) draws (Vose's method)."""
+
+    def __init__(self, probs):
+        n = len(probs)
+        prob = (np.asarray(probs, dtype=np.float64) * n / np.sum(probs)).tolist()
+        self.accept = np.ones(n, dtype=np.float64)
+        self.alias = np.arange(n, dtype=np.int64)
+
+        small = [ i for i in range(n) if prob[i] < 1.0 ]
+        large = [ i for i in range(n) if prob[i] >= 1.0 ]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.accept[s] = prob[s]
+            self.alias[s] = l
+            prob[l] += prob[s] - 1.0
+            if prob[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+    def sample(self, rng, size):
+        i = rng.randint(len(self.accept), size=size)
+        u = rng.random_sample(size)
+        return np.where(u < self.accept[i], i, self.alias[i])
+
+
+class TableSampler(object):
+    """Large sample table sampler with O(1) draws (word2vec unigram table)."""
+
+    def __init__(self, probs, table_size=2**24):
+        cdf = np.cumsum(probs) / np.sum(probs)
+        self.table = np.searchsorted(cdf, (np.arange(table_size) + 0.5) / table_size).astype(np.int32)
+
+    def sample(self, rng, size):
+        return self.table[rng.randint(len(self.table), size=size)]
+
+
+def stream(sampler, rng, batch_size=4096):
+    """Stream of single negative ids drawn in batches."""
+    while True:
+        for i in sampler.sample(rng, batch_size).tolist():
+            yield i
+
+
+def lfsr_sequence(width, seed=1, n=1):
+    """Galois LFSR states after each of n steps, as in NegativeSampler."""
+    taps = LFSR_TAPS[width]
+    state = seed
+    states = []
+    for _ in range(n):
+        state = (state >> 1) ^ taps if state & 1 else state >> 1
+        states.append(state)
+    return states
+
+
+class LfsrSampler(object):
+    """Software model of NegativeSampler drawing table entries at successive LFSR states.
+
+    The random generator passed to `sample` is ignored, draws follow the
+    hardware sequence bit-exactly (period 2**width - 1).
+    """
+
+    def __init__(self, probs, width=16, seed=1):
+        self.table = TableSampler(probs, table_size=2**width).table
+        self.states = np.array(lfsr_sequence(width, seed, n=2**width - 1), dtype=np.int64)
+        self.pos = 0
+
+    def seek(self, pos):
+        """Continue sequence from LFSR state at pos (modulo period), e.g. different per worker."""
+        self.pos = pos % len(self.states)
+
+    def sample(self, rng, size):
+        n = int(np.prod(size))
+        i = (self.pos + np.arange(n)) % len(self.states)
+        self.pos = (self.pos + n) % len(self.states)
+        return self.table[self.states[i]].reshape(size)
+
+
+def NegativeSampler(neg_id, enable, clk, table, seed=1):
+    """Negative sampler reading a unigram ROM table at LFSR-generated indexes.
+
+    The LFSR never reaches state 0, so table entry 0 is never used.
+
+    :param neg_id: return negative context id from table
+    :param enable: advance to next sample on clock
+    :param clk: clock input
+    :param table: sample table of word ids, length a power of 2
+    :param seed: initial non-zero LFSR state
+    """
+    width = (len(table) - 1).bit_length()
+    taps = LFSR_TAPS[width]
+    rom = tuple([ int(t) for t in table ])
+
+    # internal values
+    lfsr = Signal(intbv(seed)[width:])
+
+    # modules
+    @always(clk.posedge)
+    def step():
+        if enable:
+            if lfsr[0]:
+                lfsr.next = (lfsr >> 1) ^ taps
+            else:
+                lfsr.next = lfsr >> 1
+
+    @always_comb
+    def lookup():
+        neg_id.next = rom[int(lfsr)]
+
+    return step, lookup
+
+
+def test_sampler(n=1000000, rand_seed=42):
+    """Testing bench for sampled distribution of alias and table samplers."""
+
+    rng = np.random.RandomState(rand_seed)
+    counts = np.array([0, 1000, 500, 100, 10, 1])
+    probs = unigram_probs(counts)
+    for sampler in [AliasSampler(probs), TableSampler(probs)]:
+        freq = np.bincount(sampler.sample(rng, n), minlength=len(probs)) / float(n)
+        print "%s probs: %s, freq: %s" % (sampler.__class__.__name__, np.round(probs, 4).tolist(), np.round(freq, 4).tolist())
+        assert np.abs(freq - probs).max() < 0.01
+
+
+def test_subsample(n=100000, threshold=1e-2, rand_seed=42):
+    """Testing bench for subsampling of frequent words."""
+
+    rng = np.random.RandomState(rand_seed)
+    counts = np.array([0, 1000, 500, 100, 10, 1])
+    keep = keep_probs(counts, threshold)
+    doc = TableSampler(unigram_probs(counts, power=1.0)).sample(rng, n)
+    kept = subsample(doc, keep, rng)
+    freq = np.bincount(kept, minlength=len(counts)) / np.bincount(doc, minlength=len(counts)).clip(1).astype(np.float64)
+    print "keep: %s, kept freq: %s, kept: %d/%d" % (np.round(keep, 4).tolist(), np.round(freq, 4).tolist(), len(kept), n)
+    assert np.abs(freq - keep)[1:4].max() < 0.01
+
+
+def test_lfsr(width=8, n=300):
+    """Testing bench for hardware negative sampler against LFSR model."""
+
+    counts = np.array([0, 1000, 500, 100, 10, 1])
+    table = TableSampler(unigram_probs(counts), table_size=2**width).table
+    states = lfsr_sequence(width, n=n)
+    assert len(set(lfsr_sequence(width, n=2**width - 1))) == 2**width - 1
+
+    # signals
+    neg_id = Signal(intbv(0, min=0, max=len(counts)))
+    enable = Signal(bool(False))
+    clk = Signal(bool(False))
+
+    # modules
+    sampler = NegativeSampler(neg_id, enable, clk, table)
+
+    # test stimulus
+    HALF_PERIOD = delay(5)
+
+    @always(HALF_PERIOD)
+    def clk_gen():
+        clk.next = not clk
+
+    @instance
+    def stimulus():
+        yield clk.negedge
+        enable.next = True
+
+        model = LfsrSampler(unigram_probs(counts), width=width).sample(None, n)
+        freq = np.zeros(len(counts))
+        for i in range(n):
+            yield clk.negedge
+            assert neg_id == table[states[i]] == model[i]
+            freq[int(neg_id)] += 1
+        print "%4s neg_id freq: %s" % (now(), (freq / n).tolist())
+
+        raise StopSimulation()
+
+    return clk_gen, stimulus, sampler
+
+
+def convert(target=toVerilog, directory="./ex-target"):
+    """Convert design to Verilog or VHDL."""
+
+    width = 8
+    counts = np.array([0, 1000, 500, 100, 10, 1])
+    table = TableSampler(unigram_probs(counts), table_size=2**width).table
+
+    # signals
+    neg_id = Signal(intbv(0, min=0, max=len(counts)))
+    enable = Signal(bool(False))
+    clk = Signal(bool(False))
+
+    # covert to HDL code
+    target.directory = directory
+    target(NegativeSampler, neg_id, enable, clk, table)
+
+
+if __name__ == '__main__':
+    # sample distributions
+    test_sampler()
+    test_subsample()
+
+    # simulate design
+    #test_lfsr = traceSignals(test_lfsr)
+    sim = Simulation(test_lfsr())
+    sim.run()
+
+    # convert to Verilog and VHDL
+    convert(target=toVerilog)
+    convert(target=toVHDL)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621,W0212
+"""
+Simulation-level profiler counting how often MyHDL generators fire, their wall time and signal transitions.
+
+Generators of a design hierarchy are instrumented before the simulation
+starts (`always`/`always_comb` functions are wrapped, `instance` generators
+are wrapped in timing generators), and signal updates are counted while the
+profiler is active. Timing adds a small constant overhead per fire, so
+compare blocks relative to each other.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import time
+from types import GeneratorType
+from myhdl import Signal, intbv, delay, always, instance
+from myhdl import Simulation, StopSimulation
+from myhdl._Signal import _Signal
+from myhdl._always import _Always
+from myhdl._instance import _Instantiator
+
+
+class SimProfiler(object):
+    """Profiler of generator fires, wall time and signal transitions in a MyHDL simulation."""
+
+    def __init__(self):
+        self.blocks = {}  # name -> [instances, fires, seconds]
+        self.signal_names = {}  # id -> name
+        self.transitions = {}  # id -> [signal, transitions]
+        self.seconds = 0.0
+        self._update = None
+        self._time_0 = None
+
+    def _stats(self, name):
+        stats = self.blocks.setdefault(name, [0, 0, 0.0])
+        stats[0] += 1
+        return stats
+
+    def _name_signals(self, module, names_values):
+        for name, value in names_values:
+            if isinstance(value, _Signal) and id(value) not in self.signal_names:
+                self.signal_names[id(value)] = "{}.{}".format(module, name)
+
+    def _timed_func(self, func, stats):
+        def timed():
+            t = time.time()
+            func()
+            stats[1] += 1
+            stats[2] += time.time() - t
+        return timed
+
+    def _timed_gen(self, gen, stats):
+        while True:
+            t = time.time()
+            try:
+                trigger = next(gen)
+            finally:
+                stats[1] += 1
+                stats[2] += time.time() - t
+            yield trigger
+
+    def instrument(self, hierarchy):
+        """Instrument all generators of a design hierarchy before simulation.
+
+        :returns: instrumented hierarchy to pass to Simulation
+        """
+        if isinstance(hierarchy, (list, tuple)):
+            return [ self.instrument(h) for h in hierarchy ]
+        if hasattr(hierarchy, 'subs'):
+            hierarchy.subs = self.instrument(hierarchy.subs)
+            return hierarchy
+
+        if isinstance(hierarchy, _Always):
+            func = hierarchy.func
+            module = func.__module__
+            self._name_signals(module, zip(func.__code__.co_freevars, [ c.cell_contents for c in func.__closure__ or [] ]))
+            hierarchy.func = self._timed_func(func, self._stats("{}.{}".format(module, func.__name__)))
+        elif isinstance(hierarchy, _Instantiator):
+            gen = hierarchy.gen
+            module = gen.gi_frame.f_globals.get('__name__')
+            self._name_signals(module, gen.gi_frame.f_locals.items())
+            hierarchy.gen = hierarchy.waiter.generator = self._timed_gen(gen, self._stats("{}.{}".format(module, gen.gi_code.co_name)))
+        elif isinstance(hierarchy, GeneratorType):
+            module = hierarchy.gi_frame.f_globals.get('__name__')
+            self._name_signals(module, hierarchy.gi_frame.f_locals.items())
+            return self._timed_gen(hierarchy, self._stats("{}.{}".format(module, hierarchy.gi_code.co_name)))
+        return hierarchy
+
+    def start(self):
+        """Start counting signal transitions and wall time."""
+        transitions = self.transitions
+        update = self._update = _Signal._update
+
+        def counted_update(sig):
+            if sig._val != sig._next:
+                counter = transitions.get(id(sig))
+                if counter is None:
+                    counter = transitions[id(sig)] = [sig, 0]
+                counter[1] += 1
+            return update(sig)
+
+        _Signal._update = counted_update
+        self._time_0 = time.time()
+
+    def stop(self):
+        """Stop counting signal transitions and wall time."""
+        self.seconds += time.time() - self._time_0
+        _Signal._update = self._update
+
+    def run(self, sim, duration=None):
+        """Run simulation while profiling."""
+        self.start()
+        try:
+            sim.run(duration, quiet=1)
+        finally:
+            self.stop()
+
+    def report(self, top=20):
+        """Ranked report of blocks by wall time and signals by transitions."""
+        lines = []
+        total = sum([ s[2] for s in self.blocks.values() ]) or 1e-9
+        lines.append("simulation: {:.3f}s, blocks: {:.3f}s".format(self.seconds, total))
+        lines.append("{:<40} {:>9} {:>12} {:>10} {:>7} {:>9}".format("block", "instances", "fires", "seconds", "time", "us/fire"))
+        for name, (instances, fires, seconds) in sorted(self.blocks.items(), key=lambda b: -b[1][2])[:top]:
+            lines.append("{:<40} {:>9} {:>12} {:>10.3f} {:>6.1%} {:>9.2f}".format(name, instances, fires, seconds, seconds / total, 1e6 * seconds / max(fires, 1)))
+
+        lines.append("{:<40} {:>12}".format("signal", "transitions"))
+        for sig_id, (sig, count) in sorted(self.transitions.items(), key=lambda t: -t[1][1])[:top]:
+            lines.append("{:<40} {:>12}".format(self.signal_names.get(sig_id, "<{} bits>".format(len(sig))), count))
+        return "\n".join(lines)
+
+
+def test_profile(n=100):
+    """Testing bench for fire and transition counts of a clocked counter."""
+
+    # signals
+    count = Signal(intbv(0)[8:])
+    clk = Signal(bool(False))
+
+    # modules
+    @always(clk.posedge)
+    def counter():
+        count.next = (count + 1) % 256
+
+    # test stimulus
+    @always(delay(5))
+    def clk_gen():
+        clk.next = not clk
+
+    @instance
+    def stimulus():
+        for _ in range(n):
+            yield clk.negedge
+        raise StopSimulation()
+
+    profiler = SimProfiler()
+    profiler.run(Simulation(profiler.instrument((clk_gen, counter, stimulus))))
+    print profiler.report()
+    assert profiler.blocks["{}.counter".format(__name__)][1] == n
+    assert max([ c for _, c in profiler.transitions.values() ]) == 2 * n
+
+
+if __name__ == '__main__':
+    # profile simple design
+    test_profile()
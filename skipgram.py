@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Vectorized skip-gram pair generation with configurable and dynamic window.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def window_offsets(window):
+    """Context offsets -window, ..., -1, 1, ..., window around a word."""
+    return np.r_[-window:0, 1:window + 1]
+
+
+def window_pairs(doc, window=1, start=0, stop=None, reduced=None):
+    """Word-context pairs for words at positions [start, stop) of a document.
+
+    Contexts are taken from a strided view of shape (words, 2 * window + 1)
+    over the padded document, in order of words and offsets.
+
+    :param doc: document as array of word ids
+    :param window: maximal distance of context from word
+    :param reduced: per word reduced window (dynamic window), full if None
+    :returns: word ids and context ids
+    """
+    doc = np.asarray(doc)
+    stop = len(doc) if stop is None else min(stop, len(doc))
+    n = max(stop - start, 0)
+    lo = max(start - window, 0)
+    hi = min(stop + window, len(doc))
+
+    # padded document with -1 outside of it
+    padded = np.empty(n + 2 * window, dtype=np.int64)
+    padded.fill(-1)
+    padded[lo - start + window:hi - start + window] = doc[lo:hi]
+    view = as_strided(padded, shape=(n, 2 * window + 1), strides=(padded.strides[0], padded.strides[0]))
+
+    offsets = window_offsets(window)
+    context = view[:, offsets + window]
+    mask = context >= 0
+    if reduced is not None:
+        mask &= np.abs(offsets)[None, :] <= np.asarray(reduced)[:, None]
+    word = np.repeat(padded[window:window + n, None], len(offsets), axis=1)
+    return word[mask], context[mask]
+
+
+def iter_batches(doc, window=1, batch_size=10000, dynamic=False, rng=None, start=0, stop=None):
+    """Stream word-context pairs of a document in batches of batch_size pairs.
+
+    :param dynamic: shrink window per word uniformly in [1, window] (word2vec)
+    :param rng: NumPy RandomState for dynamic window
+    :returns: generator of (word ids, context ids), last batch may be smaller
+    """
+    stop = len(doc) if stop is None else min(stop, len(doc))
+    block = max(1, batch_size // (2 * window))
+    pending_word = np.zeros((0,), dtype=np.int64)
+    pending_context = np.zeros((0,), dtype=np.int64)
+    for i in range(start, stop, block):
+        j = min(i + block, stop)
+        reduced = rng.randint(1, window + 1, size=j - i) if dynamic else None
+        word, context = window_pairs(doc, window, i, j, reduced)
+        pending_word = np.concatenate([pending_word, word])
+        pending_context = np.concatenate([pending_context, context])
+        while len(pending_word) >= batch_size:
+            yield pending_word[:batch_size], pending_context[:batch_size]
+            pending_word = pending_word[batch_size:]
+            pending_context = pending_context[batch_size:]
+    if len(pending_word):
+        yield pending_word, pending_context
+
+
+def negative_pairs(word, context, negative, sampler, rng, vocab_size, one=1, zero=0):
+    """Positive pairs (y_actual one) each followed by `negative` sampled pairs (y_actual zero).
+
+    Negative contexts are uniformly random if no sampler is given.
+
+    :returns: word ids, context ids and y_actual of all pairs
+    """
+    n = len(word)
+    k = negative
+    if sampler is None:
+        neg = rng.randint(vocab_size, size=(n, k))
+    else:
+        neg = sampler.sample(rng, (n, k))
+
+    word_ids = np.repeat(np.asarray(word, dtype=np.int64), 1 + k)
+    context_ids = np.empty((n, 1 + k), dtype=np.int64)
+    context_ids[:, 0] = context
+    context_ids[:, 1:] = neg
+    y_actual = np.empty((n, 1 + k), dtype=np.int64)
+    y_actual[:, 0] = one
+    y_actual[:, 1:] = zero
+    return word_ids, context_ids.ravel(), y_actual.ravel()
+
+
+def test_pairs(window=2, n=50, rand_seed=42):
+    """Testing bench for vectorized pairs against straightforward loops."""
+
+    rng = np.random.RandomState(rand_seed)
+    doc = rng.randint(1, 100, size=n)
+    for dynamic in [False, True]:
+        reduced = rng.randint(1, window + 1, size=n) if dynamic else np.repeat(window, n)
+        ref = [ (doc[i], doc[i + o]) for i in range(n) for o in window_offsets(window) if 0 <= i + o < n and abs(o) <= reduced[i] ]
+
+        word, context = window_pairs(doc, window, reduced=reduced if dynamic else None)
+        assert zip(word.tolist(), context.tolist()) == ref
+
+        # same reduced windows as drawn block by block in iter_batches
+        block = max(1, 7 // (2 * window))
+        rng_batches = np.random.RandomState(rand_seed)
+        reduced = np.concatenate([ rng_batches.randint(1, window + 1, size=min(i + block, n) - i) for i in range(0, n, block) ]) if dynamic else np.repeat(window, n)
+        ref = [ (i, doc[i], doc[i + o]) for i in range(n) for o in window_offsets(window) if 0 <= i + o < n and abs(o) <= reduced[i] ]
+
+        batches = list(iter_batches(doc, window, batch_size=7, dynamic=dynamic, rng=np.random.RandomState(rand_seed)))
+        assert all([ len(w) == 7 for w, _ in batches[:-1] ])
+        assert zip(np.concatenate([ w for w, _ in batches ]).tolist(), np.concatenate([ c for _, c in batches ]).tolist()) == [ (w, c) for _, w, c in ref ]
+
+        # words of a shard keep their contexts across its boundaries
+        start, stop = n // 3, 2 * n // 3
+        word, context = window_pairs(doc, window, start, stop, reduced[start:stop] if dynamic else None)
+        assert zip(word.tolist(), context.tolist()) == [ (w, c) for i, w, c in ref if start <= i < stop ]
+        print "window: %d, dynamic: %s, pairs: %d, batches: %d" % (window, dynamic, len(ref), len(batches))
+
+
+if __name__ == '__main__':
+    # compare with loops
+    for window in [1, 2, 5]:
+        test_pairs(window)
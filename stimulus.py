@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Batched training stimulus replayed from a ROM of precomputed word-context pairs.
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import numpy as np
+from myhdl import Signal, intbv, delay, always, always_comb, instance, now
+from myhdl import Simulation, StopSimulation, toVerilog, toVHDL
+
+
+class PairChunk(object):
+    """Chunk of precomputed training pairs as lists of raw integers (refilled in place).
+
+    Entry 0 is an idle entry (word id 0, context id 0, label 0) and pairs
+    are at addresses 1, ..., len(chunk), so that returning to the idle
+    address between chunks makes the combinational ROM replay a refilled
+    chunk from address 1.
+    """
+
+    def __init__(self):
+        self.words = [0]
+        self.contexts = [0]
+        self.labels = [0]
+
+    def __len__(self):
+        return len(self.words) - 1
+
+    def load(self, word_ids, context_ids, labels):
+        """Replace contents with NumPy arrays of word ids, context ids and labels (1 positive, 0 negative)."""
+        self.words[1:] = np.asarray(word_ids).tolist()
+        self.contexts[1:] = np.asarray(context_ids).tolist()
+        self.labels[1:] = np.asarray(labels).tolist()
+
+
+def PairRom(word_id, context_id, label, addr, words, contexts, labels):
+    """ROM-like block replaying training pairs at given address.
+
+    Convertible with tuples of integers, in simulation any indexable
+    sequences (e.g. lists of PairChunk refilled between chunks).
+
+    :param word_id: return word id at addr
+    :param context_id: return context id at addr
+    :param label: return label at addr (1 positive, 0 negative)
+    :param addr: address of training pair
+    :param words: word ids of training pairs
+    :param contexts: context ids of training pairs
+    :param labels: labels of training pairs
+    """
+
+    @always_comb
+    def lookup():
+        word_id.next = words[int(addr)]
+        context_id.next = contexts[int(addr)]
+        label.next = labels[int(addr)]
+
+    return lookup
+
+
+def test_rom(n=100, vocab_size=1000, rand_seed=42):
+    """Testing bench for replaying refilled chunks of training pairs."""
+
+    rng = np.random.RandomState(rand_seed)
+    chunk = PairChunk()
+    id_width = (vocab_size - 1).bit_length()
+
+    # signals
+    word_id = Signal(intbv(0)[id_width:])
+    context_id = Signal(intbv(0)[id_width:])
+    label = Signal(bool(False))
+    addr = Signal(intbv(0, min=0, max=1 + n))
+    clk = Signal(bool(False))
+
+    # modules
+    rom = PairRom(word_id, context_id, label, addr, chunk.words, chunk.contexts, chunk.labels)
+
+    # test stimulus
+    HALF_PERIOD = delay(5)
+
+    @always(HALF_PERIOD)
+    def clk_gen():
+        clk.next = not clk
+
+    @instance
+    def stimulus():
+        for _ in range(2):
+            words = rng.randint(vocab_size, size=n)
+            contexts = rng.randint(vocab_size, size=n)
+            labels = rng.randint(2, size=n)
+            chunk.load(words, contexts, labels)
+
+            for i in range(n):
+                yield clk.negedge
+                addr.next = 1 + i
+                yield clk.posedge
+                assert (word_id, context_id, label) == (words[i], contexts[i], labels[i])
+            addr.next = 0
+        print "%6s replayed pairs: %d" % (now(), 2 * n)
+
+        raise StopSimulation()
+
+    return clk_gen, stimulus, rom
+
+
+def convert(target=toVerilog, directory="./ex-target", n=16, vocab_size=1000, rand_seed=42):
+    """Convert design to Verilog or VHDL."""
+
+    rng = np.random.RandomState(rand_seed)
+    id_width = (vocab_size - 1).bit_length()
+    words = tuple(rng.randint(vocab_size, size=n).tolist())
+    contexts = tuple(rng.randint(vocab_size, size=n).tolist())
+    labels = tuple(rng.randint(2, size=n).tolist())
+
+    # signals
+    word_id = Signal(intbv(0)[id_width:])
+    context_id = Signal(intbv(0)[id_width:])
+    label = Signal(bool(False))
+    addr = Signal(intbv(0, min=0, max=n))
+
+    # covert to HDL code
+    target.directory = directory
+    target(PairRom, word_id, context_id, label, addr, words, contexts, labels)
+
+
+if __name__ == '__main__':
+    # simulate design
+    #test_rom = traceSignals(test_rom)
+    sim = Simulation(test_rom())
+    sim.run()
+
+    # convert to Verilog and VHDL
+    convert(target=toVerilog)
+    convert(target=toVHDL)
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Single-pass tokenizer counting words and emitting ids over byte chunks.
+
+Tokens are identical to `data.keras_preprocessing_text.text_to_word_sequence`
+(filter characters and the split character separate words), but each chunk
+is translated and split once in C, every word gets a provisional id (order
+of first occurrence) with one dictionary lookup, and counts come from a
+bincount of emitted ids. Provisional ids are remapped to frequency-sorted
+ids with a NumPy permutation afterwards, so the corpus is read only once.
+
+Usage (compare with the Keras tokenizer path on a dataset or synthetic text):
+
+    python tokenizer.py data/enwik8-clean.zip
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import array
+import multiprocessing
+import string
+import sys
+import time
+import zipfile
+from collections import defaultdict
+import numpy as np
+
+from data.keras_preprocessing_text import base_filter
+from vocab import UNK_ID, build_vocabulary
+
+
+class Tokenizer(object):
+    """Tokenizer assigning provisional ids in order of first occurrence.
+
+    :param filters: characters separating words (like split character)
+    :param lower: lowercase text before splitting
+    :param split: split character
+    """
+
+    def __init__(self, filters=base_filter(), lower=True, split=" "):
+        self.table = string.maketrans(filters, split * len(filters))
+        self.lower = lower
+        self.split = split
+        self.index = defaultdict()  # word -> provisional id
+        self.index.default_factory = self.index.__len__
+
+    def tokenize(self, chunk):
+        """List of words in chunk."""
+        if self.lower:
+            chunk = chunk.lower()
+        return filter(None, chunk.translate(self.table).split(self.split))
+
+    def encode(self, chunk):
+        """Provisional ids of words in chunk as uint32 array, new words are added."""
+        ids = array.array('I', map(self.index.__getitem__, self.tokenize(chunk)))
+        return np.frombuffer(ids, dtype=np.uint32)
+
+    def words(self):
+        """Words in order of provisional ids."""
+        words = [None] * len(self.index)
+        for w, i in self.index.iteritems():
+            words[i] = w
+        return words
+
+    def fit_docs(self, docs, min_count=1, nb_words=None, unk=False):
+        """Encode documents in one pass and assign frequency-sorted ids starting with 1.
+
+        Ties are ordered by first occurrence, words pruned from the vocabulary
+        are dropped from documents (or mapped to UNK_ID if unk).
+
+        :param docs: iterable of documents, each an iterable of chunks
+        :param min_count: drop words occurring fewer times
+        :param nb_words: keep ids below nb_words
+        :param unk: map pruned words to UNK_ID instead of dropping them
+        :returns: x_vocab (uint32 array of ids per document) and vocabulary
+        """
+        x_vocab = []
+        for chunks in docs:
+            parts = [ self.encode(chunk) for chunk in chunks ]
+            x_vocab.append(np.concatenate(parts) if parts else np.zeros((0,), dtype=np.uint32))
+
+        words = self.words()
+        counts = np.zeros(len(words), dtype=np.int64)
+        for doc in x_vocab:
+            counts += np.bincount(doc, minlength=len(words))
+        return assign_ids(x_vocab, words, counts, min_count, nb_words, unk)
+
+
+def assign_ids(x_vocab, words, counts, min_count=1, nb_words=None, unk=False):
+    """Build vocabulary from counts and replace provisional ids in documents (in place).
+
+    :returns: x_vocab (pruned words dropped or UNK_ID if unk) and vocabulary
+    """
+    vocab, ids = build_vocabulary(words, counts, min_count, nb_words)
+    for d, doc in enumerate(x_vocab):
+        doc[:] = ids[doc]
+        if len(vocab) < len(words) and not unk:
+            x_vocab[d] = doc[doc != UNK_ID]
+    return x_vocab, vocab
+
+
+class WordCounts(object):
+    """Mergeable word counts with words in order of first occurrence."""
+
+    def __init__(self):
+        self.index = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def merge(self, words, counts):
+        """Add counts of distinct words, returns array of their ids here."""
+        index = self.index
+        ids = np.fromiter((index.setdefault(w, len(index)) for w in words), dtype=np.uint32, count=len(words))
+        if len(index) > len(self.counts):
+            self.counts = np.r_[self.counts, np.zeros(len(index) - len(self.counts), dtype=np.int64)]
+        self.counts[ids] += counts
+        return ids
+
+    def words(self):
+        """Words in order of ids."""
+        words = [None] * len(self.index)
+        for w, i in self.index.iteritems():
+            words[i] = w
+        return words
+
+
+def _find_space(data, i):
+    """Index of first whitespace at or after i, -1 if none."""
+    hits = [ k for k in (data.find(" ", i), data.find("\n", i), data.find("\t", i)) if k >= 0 ]
+    return min(hits) if hits else -1
+
+
+def iter_range_chunks(fzip, doc_id, start=0, stop=None, chunk_size=2**20):
+    """Stream words of zip member starting in byte range [start, stop) in chunks cut after whitespace.
+
+    A range begins after the first whitespace at or after start - 1 and ends
+    after the first whitespace at or after stop - 1, so adjacent ranges split
+    the member between whole words and together yield all of it.
+    """
+    f = fzip.open(doc_id)
+    data = ""
+    pos = 0  # member offset of data[0]
+    begun = start == 0
+    while True:
+        block = f.read(chunk_size)
+        data += block
+        if not begun:
+            k = _find_space(data, max(start - 1 - pos, 0))
+            if k < 0:  # inside word crossing start (or before)
+                pos += len(data)
+                data = ""
+                if block:
+                    continue
+                break
+            pos += k + 1
+            data = data[k + 1:]
+            begun = True
+
+        if stop is not None:
+            if pos >= stop:  # whitespace at pos - 1 ends range
+                break
+            k = _find_space(data, stop - 1 - pos)
+            if k >= 0:
+                yield data[:k + 1]
+                break
+        if not block:
+            if data:
+                yield data
+            break
+
+        cut = max(data.rfind(" "), data.rfind("\n"), data.rfind("\t"))
+        if cut < 0:  # no whitespace yet
+            continue
+        yield data[:cut + 1]
+        pos += cut + 1
+        data = data[cut + 1:]
+    f.close()
+
+
+def _count_range(task):
+    """Tokenize byte range of zip member, returns its words, counts and provisional ids."""
+    dataset_path, doc_id, start, stop, chunk_size, lower = task
+    tokenizer = Tokenizer(lower=lower)
+    fzip = zipfile.ZipFile(dataset_path, 'r')
+    parts = [ tokenizer.encode(chunk) for chunk in iter_range_chunks(fzip, doc_id, start, stop, chunk_size) ]
+    fzip.close()
+    words = tokenizer.words()
+    ids = np.concatenate(parts) if parts else np.zeros((0,), dtype=np.uint32)
+    return words, np.bincount(ids, minlength=len(words)), ids
+
+
+def fit_zip(dataset_path, n_workers=None, chunk_size=2**20, range_size=None, min_count=1, nb_words=None, unk=False, lower=True):
+    """Map-reduce vocabulary build and id assignment over zip members in a pool of worker processes.
+
+    Each worker tokenizes one zip member or one byte range of a large member
+    and returns partial counts with provisional ids. Partial counts are merged
+    in corpus order and sorted once, so results equal `Tokenizer.fit_docs`.
+
+    Only stored (uncompressed) members are split into byte ranges. A zip
+    member can only be read from its beginning, so a range of a deflated
+    member would inflate everything before it again (quadratic in the number
+    of ranges), and deflated members are tokenized one task per member.
+
+    :param n_workers: worker processes, all cores if None, in process if 1
+    :param range_size: bytes per task of stored members, split into n_workers ranges in total if None
+    :returns: doc_ids, x_vocab (uint32 array of ids per document) and vocabulary
+    """
+    n_workers = n_workers or multiprocessing.cpu_count()
+    fzip = zipfile.ZipFile(dataset_path, 'r')
+    infos = fzip.infolist()
+    fzip.close()
+    doc_ids = [ info.filename for info in infos ]
+
+    total = sum([ info.file_size for info in infos ])
+    range_size = range_size or max(chunk_size, -(-total // n_workers))
+    tasks = []
+    for info in infos:
+        if info.compress_type == zipfile.ZIP_STORED:
+            starts = range(0, info.file_size, range_size) or [0]
+        else:
+            starts = [0]
+        stops = starts[1:] + [None]
+        tasks.extend([ (dataset_path, info.filename, start, stop, chunk_size, lower) for start, stop in zip(starts, stops) ])
+
+    if n_workers > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(min(n_workers, len(tasks)))
+        try:
+            results = pool.map(_count_range, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = map(_count_range, tasks)
+
+    # merge partial counts in order of tasks and join ranges of members
+    merged = WordCounts()
+    parts = dict([ (doc_id, []) for doc_id in doc_ids ])
+    for task, (words, counts, ids) in zip(tasks, results):
+        parts[task[1]].append(merged.merge(words, counts)[ids])
+    x_vocab = [ np.concatenate(parts[doc_id]) for doc_id in doc_ids ]
+
+    x_vocab, vocab = assign_ids(x_vocab, merged.words(), merged.counts, min_count, nb_words, unk)
+    return doc_ids, x_vocab, vocab
+
+
+def keras_docs(docs, lower=True):
+    """Reference path of Keras tokenizer (vocabulary pass, then id pass)."""
+    import data.keras_preprocessing_text as text
+
+    docs = [ list(chunks) for chunks in docs ]
+    tokenizer = text.Tokenizer(lower=lower)
+    tokenizer.fit_on_texts(chunk for chunks in docs for chunk in chunks)
+    word2id = tokenizer.word_index
+    x_vocab = []
+    for chunks in docs:
+        ids = [ word2id[w] for chunk in chunks for w in text.text_to_word_sequence(chunk, lower=lower) ]
+        x_vocab.append(np.asarray(ids, dtype=np.uint32))
+    return x_vocab, word2id, tokenizer.word_counts
+
+
+def synthetic_text(n_words=500000, vocab_size=20000, chunk_words=10000, rand_seed=42):
+    """Chunks of Zipf-distributed words with punctuation and mixed case."""
+    rng = np.random.RandomState(rand_seed)
+    words = [ "w%d" % i for i in range(vocab_size) ] + ["It's", "a,b", "x.y", "(z)", "W1"]
+    ids = rng.zipf(1.3, size=n_words) % len(words)
+    seps = np.array([" ", " ", " ", "\n", "\t"])[rng.randint(5, size=n_words)]
+    return [ "".join([ words[i] + s for i, s in zip(ids[j:j + chunk_words], seps[j:j + chunk_words]) ]) for j in range(0, n_words, chunk_words) ]
+
+
+def test_keras(docs=None):
+    """Testing bench for identical tokens and counts as Keras tokenizer path."""
+
+    if docs is None:
+        text = synthetic_text(n_words=50000)
+        docs = [text[:2], text[2:]]
+
+    ref_x_vocab, ref_word2id, ref_counts = keras_docs(docs)
+    x_vocab, vocab = Tokenizer().fit_docs(docs)
+
+    # same words in same order, ids sorted by frequency
+    assert sorted(vocab) == sorted(ref_word2id)
+    ref_id2word = dict([ (i, w) for w, i in ref_word2id.iteritems() ])
+    for doc, ref_doc in zip(x_vocab, ref_x_vocab):
+        assert [ vocab.word(i) for i in doc.tolist() ] == [ ref_id2word[i] for i in ref_doc.tolist() ]
+    assert all([ vocab.counts[i - 1] == ref_counts[w] for w, i in vocab.iteritems() ])
+    assert np.all(np.diff(vocab.counts) <= 0)
+    print "docs: %d, words: %d, vocabulary: %d" % (len(docs), sum([ len(d) for d in x_vocab ]), len(vocab))
+
+    # pruned words are dropped or mapped to UNK_ID
+    x_vocab, vocab = Tokenizer().fit_docs(docs, min_count=3, nb_words=1001)
+    assert len(vocab) <= 1000 and vocab.counts.min() >= 3
+    assert sum([ len(d) for d in x_vocab ]) == vocab.counts.sum()
+    x_vocab_unk, _ = Tokenizer().fit_docs(docs, min_count=3, nb_words=1001, unk=True)
+    assert [ len(d) for d in x_vocab_unk ] == [ len(d) for d in ref_x_vocab ]
+    assert all([ np.all(d[d != UNK_ID] == d_pruned) for d, d_pruned in zip(x_vocab_unk, x_vocab) ])
+
+
+def test_ranges(n_words=20000, n_workers=3):
+    """Testing bench for byte ranges and parallel build against single process."""
+    import os
+    import tempfile
+
+    text = "".join(synthetic_text(n_words))
+    fd, path = tempfile.mkstemp(suffix=".zip")
+    os.close(fd)
+    try:
+        fzip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        fzip.writestr("a", text[:1000])
+        fzip.writestr("b", text, zipfile.ZIP_STORED)
+        fzip.writestr("c", "")
+        fzip.close()
+
+        # ranges split members between whole words
+        fzip = zipfile.ZipFile(path, 'r')
+        for range_size in [1, 7, 1000, 10**7]:
+            starts = range(0, 1000, range_size)
+            parts = [ "".join(iter_range_chunks(fzip, "a", a, b, chunk_size=5)) for a, b in zip(starts, starts[1:] + [None]) ]
+            assert "".join(parts) == text[:1000]
+            parts = [ p for p in parts if p ]
+            assert all([ p[-1] in " \n\t" for p in parts[:-1] ])
+        x_vocab, vocab = Tokenizer().fit_docs([ iter_range_chunks(fzip, doc_id) for doc_id in fzip.namelist() ], min_count=2)
+        fzip.close()
+
+        for range_size in [None, 10000]:
+            doc_ids, x_vocab_par, vocab_par = fit_zip(path, n_workers, range_size=range_size, min_count=2)
+            assert doc_ids == ["a", "b", "c"] and list(vocab_par) == list(vocab)
+            assert all([ np.all(a == b) for a, b in zip(x_vocab_par, x_vocab) ])
+        print "docs: %d, words: %d, vocabulary: %d, workers: %d" % (len(doc_ids), sum([ len(d) for d in x_vocab ]), len(vocab), n_workers)
+    finally:
+        os.remove(path)
+
+
+def compare(docs, dataset_path=None):
+    """Time Keras tokenizer path against single-pass tokenizer (and parallel build over dataset)."""
+
+    time_0 = time.time()
+    ref_x_vocab, _, _ = keras_docs(docs)
+    keras_s = time.time() - time_0
+    time_0 = time.time()
+    x_vocab, vocab = Tokenizer().fit_docs(docs)
+    fast_s = time.time() - time_0
+
+    n = sum([ len(d) for d in x_vocab ])
+    assert n == sum([ len(d) for d in ref_x_vocab ])
+    print "words: %d, vocabulary: %d" % (n, len(vocab))
+    print "keras:       %8.3fs (%.0f words/s)" % (keras_s, n / keras_s)
+    print "single-pass: %8.3fs (%.0f words/s, %.1fx)" % (fast_s, n / fast_s, keras_s / fast_s)
+
+    if dataset_path is not None:
+        n_workers = multiprocessing.cpu_count()
+        time_0 = time.time()
+        _, x_vocab_par, vocab_par = fit_zip(dataset_path, n_workers)
+        par_s = time.time() - time_0
+        assert list(vocab_par) == list(vocab) and all([ np.all(a == b) for a, b in zip(x_vocab_par, x_vocab) ])
+        print "parallel:    %8.3fs (%.0f words/s, %.1fx, %d workers)" % (par_s, n / par_s, keras_s / par_s, n_workers)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # chunks of zip members of dataset (like project.load)
+        fzip = zipfile.ZipFile(sys.argv[1], 'r')
+        docs = [ list(iter_range_chunks(fzip, doc_id)) for doc_id in fzip.namelist() ]
+        fzip.close()
+        compare(docs, sys.argv[1])
+    else:
+        test_keras()
+        test_ranges()
+        compare([synthetic_text()])
@@ -8,25 +8,52 @@ __author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
 __license__ = "GPLv3+"
 
 import random
-from myhdl import Signal, ConcatSignal, intbv, fixbv, delay, join, always, instance, now
-from myhdl import Simulation
+import numpy as np
+from myhdl import Signal, intbv, fixbv, concat, delay, join, always, always_comb, instance, now
+from myhdl import Simulation, StopSimulation
 
 from WordContextUpdated import WordContextUpdated
-from RamSim import RamSim
-
-
-def train(x_vocab, y_skipgram, vocab_size):
-    """Training stimulus."""
+from RamSim import ArrayMemory, RamWideSim
+from engine import Engine
+from fixformat import Q7_8, fix_code
+from metrics import Metrics
+from stimulus import PairChunk, PairRom
+import checkpoint
+import sampling
+import skipgram
+
+
+def train(x_vocab, y_skipgram, vocab_size, wram_mem=None, cram_mem=None, n_passes=None, sampler=None, negative=1, window=1, dynamic=False, max_pairs=None, checkpoint_path=None, checkpoint_interval=10**5, block_size=1000, metrics=None, backend='python', stimulus='python', fmt=Q7_8, stats=None, shard=None, params=None):
+    """Training stimulus.
+
+    :param wram_mem: ArrayMemory for word embeddings, new if None
+    :param cram_mem: ArrayMemory for context embeddings, new if None
+    :param n_passes: stop after epochs over all documents of x_vocab, never if None
+    :param sampler: negative sampler (see sampling.py), uniform random if None
+    :param negative: number of negative samples per positive sample
+    :param window: maximal distance of context from word
+    :param dynamic: shrink window per word uniformly in [1, window]
+    :param max_pairs: stop after (at least) max_pairs training pairs, never if None
+    :param checkpoint_path: checkpoint file to resume from and write every checkpoint_interval pairs, none if None
+    :param block_size: words between checkpoint opportunities
+    :param metrics: Metrics for error, MSE histogram, pairs/s and RAM transactions, without output if None
+    :param backend: 'python' for MyHDL simulation of WordContextUpdated, 'int' for its integer-domain datapath (see WordContextUpdatedInt.py) or 'cosim' for co-simulation in Icarus Verilog (see cosim.py)
+    :param stimulus: 'python' for pairs fed by the driver, or 'batched' for pairs and negative samples of each block precomputed with NumPy and replayed from PairRom (see stimulus.py)
+    :param fmt: fixed-point format of embeddings and datapath (see fixformat.py)
+    :param stats: FixStats for overflow, saturation and underflow telemetry of each pair, none if None
+    :param shard: list of (doc index, start, stop) with words at positions [start, stop) trained in each epoch (see hogwild.py), all documents if None
+    :param params: extra training parameters stored in and checked against the checkpoint (dataset fingerprint, subsample, seed), none if None
+    """
 
     embedding_dim = 3
     leaky_val = 0.01
     rate_val = 0.1
     emb_spread = 0.1
     ema_weight = 0.01
-    fix_min = -2**7
-    fix_max = -fix_min
-    fix_res = 2**-8
-    fix_width = 1 + 7 + 8
+    fix_min = fmt.fix_min
+    fix_max = fmt.fix_max
+    fix_res = fmt.fix_res
+    fix_width = fmt.fix_width
 
     # signals
     y = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
@@ -40,35 +67,77 @@ def train(x_vocab, y_skipgram, vocab_size):
         new_context_emb[j].assign(new_context_embv((j + 1) * fix_width, j * fix_width))
 
     y_actual = Signal(fixbv(1.0, min=fix_min, max=fix_max, res=fix_res))
-    word_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for _ in range(embedding_dim) ]
-    word_embv = ConcatSignal(*reversed(word_emb))
-    context_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for _ in range(embedding_dim) ]
-    context_embv = ConcatSignal(*reversed(context_emb))
-
-    wram_dout = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
-    wram_din = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
-    wram_default = Signal(fixbv(emb_spread, min=fix_min, max=fix_max, res=fix_res))
-    wram_addr = Signal(intbv(0)[24:])
+    word_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    context_embv = Signal(intbv(0)[embedding_dim * fix_width:])
+    word_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for j in range(embedding_dim) ]
+    context_emb = [ Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)) for j in range(embedding_dim) ]
+    for j in range(embedding_dim):
+        word_emb[j].assign(word_embv((j + 1) * fix_width, j * fix_width))
+        context_emb[j].assign(context_embv((j + 1) * fix_width, j * fix_width))
+
+    addr_width = max(1, (vocab_size - 1).bit_length())
+    wram_dout = Signal(intbv(0)[embedding_dim * fix_width:])
+    wram_din = Signal(intbv(0)[embedding_dim * fix_width:])
+    wram_default = Signal(intbv(0)[embedding_dim * fix_width:])
+    wram_addr = Signal(intbv(0)[addr_width:])
     wram_rd = Signal(bool(False))
     wram_wr = Signal(bool(False))
 
-    cram_dout = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
-    cram_din = Signal(fixbv(0.0, min=fix_min, max=fix_max, res=fix_res))
-    cram_default = Signal(fixbv(emb_spread, min=fix_min, max=fix_max, res=fix_res))
-    cram_addr = Signal(intbv(0)[24:])
+    cram_dout = Signal(intbv(0)[embedding_dim * fix_width:])
+    cram_din = Signal(intbv(0)[embedding_dim * fix_width:])
+    cram_default = Signal(intbv(0)[embedding_dim * fix_width:])
+    cram_addr = Signal(intbv(0)[addr_width:])
     cram_rd = Signal(bool(False))
     cram_wr = Signal(bool(False))
 
-    error_ema = Signal(fixbv(1.0, min=fix_min, max=fix_max, res=fix_res))
-    error_ema_weight = Signal(fixbv(ema_weight, min=fix_min, max=fix_max, res=fix_res))
+    # embedding memories and training position, resumed from checkpoint
+    if wram_mem is None:
+        wram_mem = embedding_memory(vocab_size, fmt, embedding_dim)
+    if cram_mem is None:
+        cram_mem = embedding_memory(vocab_size, fmt, embedding_dim)
+    if metrics is None:
+        metrics = Metrics()
+    run_params = {'window': window, 'negative': negative, 'dynamic': dynamic}
+    run_params.update(params or {})
+    state = {'epoch': 0, 'doc': 0, 'position': 0, 'pairs': 0, 'error_ema': 1.0, 'format': fmt.name, 'vocab_size': vocab_size}
+    state.update(run_params)
+    loaded = checkpoint.load(checkpoint_path) if checkpoint_path is not None else None
+    spans = [ (d, 0, len(doc)) for d, doc in enumerate(x_vocab) ] if shard is None else shard
+    if loaded is not None:
+        state, arrays = loaded
+        if state.get('format', fmt.name) != fmt.name:
+            raise ValueError("checkpoint '{}' is in format {}, not {}".format(checkpoint_path, state['format'], fmt.name))
+        if state.get('vocab_size', vocab_size) != vocab_size:
+            raise ValueError("checkpoint '{}' has vocabulary size {}, not {} (vocabulary options or corpus changed)".format(checkpoint_path, state['vocab_size'], vocab_size))
+        checkpoint.check_params(checkpoint_path, state, run_params)
+        state.update(run_params)
+        wram_mem.data[:] = arrays['wram']
+        wram_mem.bitmap[:] = arrays['wram_bitmap']
+        cram_mem.data[:] = arrays['cram']
+        cram_mem.bitmap[:] = arrays['cram_bitmap']
+        print "resumed: epoch: %d, doc: %d, position: %d, pairs: %d" % (state['epoch'], state['doc'], state['position'], state['pairs'])
+        metrics.resume(state['pairs'])
+
     clk = Signal(bool(False))
 
+    # error EMA on codes and telemetry by the bit-exact reference (see engine.py)
+    reference = Engine(1, embedding_dim, leaky_val, rate_val, ema_weight=ema_weight, fmt=fmt, stats=stats)
+    reference.error_ema = int(fix_code(state['error_ema'], fix_res))
+    y_one = fixbv(1.0, min=fix_min, max=fix_max, res=fix_res)
+    y_zero = fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)
+
     # modules
-    wcupdated = WordContextUpdated(y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
+    if backend == 'cosim':
+        from cosim import WordContextUpdatedCosim as model
+    elif backend == 'int':
+        from WordContextUpdatedInt import WordContextUpdatedFix as model
+    else:
+        model = WordContextUpdated
+    wcupdated = model(y, error, new_word_embv, new_context_embv, y_actual, word_embv, context_embv, embedding_dim, leaky_val, rate_val, fix_min, fix_max, fix_res)
 
-    wram = RamSim(wram_dout, wram_din, wram_default, wram_addr, wram_rd, wram_wr, clk)
+    wram = RamWideSim(wram_dout, wram_din, wram_default, wram_addr, wram_rd, wram_wr, clk, embedding_dim, mem=wram_mem)
 
-    cram = RamSim(cram_dout, cram_din, cram_default, cram_addr, cram_rd, cram_wr, clk)
+    cram = RamWideSim(cram_dout, cram_din, cram_default, cram_addr, cram_rd, cram_wr, clk, embedding_dim, mem=cram_mem)
 
     # driver
     HALF_PERIOD = delay(5)
@@ -77,126 +146,226 @@ def train(x_vocab, y_skipgram, vocab_size):
     def clk_gen():
         clk.next = not clk
 
+    def save_checkpoint():
+        """Write embedding memories and training position to checkpoint file."""
+        if checkpoint_path is not None:
+            state['error_ema'] = float(reference.error_ema * fix_res)
+            checkpoint.save(checkpoint_path, state, wram_mem.data, cram_mem.data, wram_mem.bitmap, cram_mem.bitmap)
+
+    def blocks():
+        """Blocks (doc, start, stop) of words in training order, resumed from and advancing state.
+
+        Training stops after n_passes epochs, max_pairs training pairs or a
+        full epoch without training pairs, and a checkpoint is written every
+        checkpoint_interval pairs.
+        """
+        last_checkpoint = state['pairs']
+        while n_passes is None or state['epoch'] < n_passes:
+            epoch_pairs = state['pairs'] if state['doc'] == 0 and state['position'] == 0 else None
+            while state['doc'] < len(spans):
+                d, start, end = spans[state['doc']]
+                doc = x_vocab[d]
+                state['position'] = max(state['position'], start)
+                while state['position'] < end:
+                    if max_pairs is not None and state['pairs'] >= max_pairs:
+                        return
+
+                    stop = min(state['position'] + block_size, end)
+                    yield doc, state['position'], stop
+                    state['position'] = stop
+
+                    if checkpoint_path is not None and state['pairs'] - last_checkpoint >= checkpoint_interval:
+                        save_checkpoint()
+                        last_checkpoint = state['pairs']
+                state['doc'] += 1
+                state['position'] = 0
+            state['epoch'] += 1
+            state['doc'] = 0
+            if epoch_pairs == state['pairs']:
+                return
+
+    def record_block(errors):
+        """Error EMA and metrics of error codes of trained pairs of block."""
+        errors = np.array(errors, dtype=np.int64)
+        reference.update_ema(errors)
+        metrics.record_batch(errors * fix_res, reference.error_ema * fix_res, ram_reads=2 * len(errors), ram_writes=2 * len(errors))
+        state['pairs'] += len(errors)
+
+    def record_stats(label):
+        """Fixed-point telemetry of current pair from the bit-exact reference on the same operands."""
+        if stats is not None:
+            word = [ word_embv[(j + 1) * fix_width:j * fix_width].signed() for j in range(embedding_dim) ]
+            context = [ context_embv[(j + 1) * fix_width:j * fix_width].signed() for j in range(embedding_dim) ]
+            reference.word_context_updated([word], [context], [reference.one if label else reference.zero])
+
+    def random_embv():
+        """Random embedding vector in range [0, emb_spread]."""
+        return concat(*reversed([ fixbv(random.uniform(0.0, emb_spread), min=fix_min, max=fix_max, res=fix_res)[:] for _ in range(embedding_dim) ]))
+
     @instance
-    def driver():
-        doc_pass = 0
-        while True:
-            doc_pass += 1
-            for i in range(len(x_vocab[0]) - 1):
+    def python_driver():
+        rng = np.random.RandomState(random.randrange(2**31))
+        if sampler is not None:
+            neg_ids = sampling.stream(sampler, rng)
+        for doc, start, stop in blocks():
+            errors = []
+            for word, context in skipgram.iter_batches(doc, window, dynamic=dynamic, rng=rng, start=start, stop=stop):
+                for word_id, context_id in zip(word.tolist(), context.tolist()):
+                    # positive pair followed by negative samples
+                    for k in range(1 + negative):
+                        if k > 0:
+                            if sampler is None:
+                                context_id = int(random.randrange(vocab_size))
+                            else:
+                                context_id = next(neg_ids)
+                        yield clk.negedge
+
+                        # read training data using Python
+                        y_actual.next = y_zero if k else y_one
+
+                        # randomize default values
+                        wram_default.next = random_embv()
+                        cram_default.next = random_embv()
+
+                        # initiate reading whole embeddings from wram and cram
+                        wram_addr.next = intbv(word_id)
+                        wram_rd.next = True
+                        cram_addr.next = intbv(context_id)
+                        cram_rd.next = True
+
+                        # wait for both
+                        yield join(wram_rd.negedge, cram_rd.negedge)
+                        #print "%6s wram read, word_id: %s, dout: %s" % (now(), word_id, wram_dout)
+                        #print "%6s cram read, context_id: %s, dout: %s" % (now(), context_id, cram_dout)
+
+                        # read word-context embeddings
+                        word_embv.next = wram_dout
+                        context_embv.next = cram_dout
+
+                        # wait for word-context updated to finish
+                        yield clk.negedge
+                        errors.append(error[:].signed())
+                        record_stats(k == 0)
+
+                        # initiate writing whole embeddings to wram and cram
+                        wram_addr.next = intbv(word_id)
+                        wram_din.next = new_word_embv
+                        wram_wr.next = True
+                        cram_addr.next = intbv(context_id)
+                        cram_din.next = new_context_embv
+                        cram_wr.next = True
+
+                        # wait for both
+                        yield join(wram_wr.negedge, cram_wr.negedge)
+                        #print "%6s wram write, word_id: %s, din: %s" % (now(), word_id, wram_din)
+                        #print "%6s cram write, context_id: %s, din: %s" % (now(), context_id, cram_din)
+            record_block(errors)
+
+        metrics.flush()
+        save_checkpoint()
+        raise StopSimulation()
+
+    if stimulus == 'python':
+        return clk_gen, python_driver, wcupdated, wram, cram
+
+    # pairs of a block replayed from ROM with addresses and y_actual routed by logic
+    chunk = PairChunk()
+    rom_word_id = Signal(intbv(0)[addr_width:])
+    rom_context_id = Signal(intbv(0)[addr_width:])
+    rom_label = Signal(bool(False))
+    rom_addr = Signal(intbv(0, min=0, max=1 + block_size * 2 * window * (1 + negative)))
+
+    rom = PairRom(rom_word_id, rom_context_id, rom_label, rom_addr, chunk.words, chunk.contexts, chunk.labels)
+
+    @always_comb
+    def route():
+        wram_addr.next = rom_word_id
+        cram_addr.next = rom_context_id
+        y_actual.next = y_one if rom_label else y_zero
+
+    # default values replaced by randomly initialized memories
+    rng = np.random.RandomState(random.randrange(2**31))
+    for mem in [wram_mem, cram_mem]:
+        mem.fill(np.round(rng.uniform(0.0, emb_spread, size=mem.data.shape) / fix_res).astype(mem.data.dtype))
+
+    @instance
+    def batched_driver():
+        for doc, start, stop in blocks():
+            # precompute positive and negative pairs of block
+            reduced = rng.randint(1, window + 1, size=stop - start) if dynamic else None
+            word, context = skipgram.window_pairs(doc, window, start, stop, reduced)
+            chunk.load(*skipgram.negative_pairs(word, context, negative, sampler, rng, vocab_size))
+            rom_addr.next = 1 if len(chunk) else 0
+
+            errors = []
+            for i in range(len(chunk)):
                 yield clk.negedge
 
-                ### POSITIVE SAMPLING
+                # initiate reading whole embeddings from wram and cram
+                wram_rd.next = True
+                cram_rd.next = True
 
-                # read positive training data using Python
-                word_id = int(x_vocab[0][i])
-                context_id = int(x_vocab[0][i + 1])
-                y_actual.next = fixbv(1.0, min=fix_min, max=fix_max, res=fix_res)
+                # wait for both
+                yield join(wram_rd.negedge, cram_rd.negedge)
 
                 # read word-context embeddings
-                for j in range(embedding_dim):
-                    # randomize default values
-                    wram_default.next = fixbv(random.uniform(0.0, emb_spread), min=fix_min, max=fix_max, res=fix_res)
-                    cram_default.next = fixbv(random.uniform(0.0, emb_spread), min=fix_min, max=fix_max, res=fix_res)
-
-                    # initiate reading from wram and cram
-                    wram_addr.next = intbv(embedding_dim * word_id + j)
-                    wram_rd.next = True
-                    cram_addr.next = intbv(embedding_dim * context_id + j)
-                    cram_rd.next = True
-
-                    # wait for both
-                    yield join(wram_rd.negedge, cram_rd.negedge)
-                    #print "%6s wram read, word_id: %s, addr: %s, dout: %s" % (now(), word_id, wram_addr, wram_dout)
-                    #print "%6s cram read, context_id: %s, addr: %s, dout: %s" % (now(), context_id, cram_addr, cram_dout)
-
-                    # read parts of embeddings
-                    word_emb[j].next = wram_dout
-                    context_emb[j].next = cram_dout
+                word_embv.next = wram_dout
+                context_embv.next = cram_dout
 
                 # wait for word-context updated to finish
                 yield clk.negedge
-                print "%6s %d mse_ema: %f, mse: %f, word: %s, context: %s" % (now(), doc_pass, error_ema, error, [ float(el.val) for el in word_emb ], [ float(el.val) for el in context_emb ])
-
-                # compute exponential moving average of error
-                error_delta = fixbv(error_ema_weight * (error - error_ema), min=fix_min, max=fix_max, res=fix_res)
-                error_ema.next = error_ema + error_delta
-
-                # write new word-context embeddings
-                for j in range(embedding_dim):
-                    # initiate writing to wram and cram
-                    wram_addr.next = intbv(embedding_dim * word_id + j)
-                    wram_din.next = new_word_emb[j]
-                    wram_wr.next = True
-                    cram_addr.next = intbv(embedding_dim * context_id + j)
-                    cram_din.next = new_context_emb[j]
-                    cram_wr.next = True
-
-                    # wait for both
-                    yield join(wram_wr.negedge, cram_wr.negedge)
-                    #print "%6s wram write, word_id: %s, addr: %s, din: %s" % (now(), word_id, wram_addr, wram_din)
-                    #print "%6s cram write, context_id: %s, addr: %s, din: %s" % (now(), context_id, cram_addr, cram_din)
-
-                ### NEGATIVE SAMPLING
-
-                # read negative training data using Python
-                word_id = word_id
-                context_id = int(random.randrange(vocab_size))
-                y_actual.next = fixbv(0.0, min=fix_min, max=fix_max, res=fix_res)
+                errors.append(error[:].signed())
+                record_stats(rom_label)
 
-                # read word-context embeddings
-                for j in range(embedding_dim):
-                    # randomize default values
-                    wram_default.next = fixbv(random.uniform(0.0, emb_spread), min=fix_min, max=fix_max, res=fix_res)
-                    cram_default.next = fixbv(random.uniform(0.0, emb_spread), min=fix_min, max=fix_max, res=fix_res)
-
-                    # initiate reading from wram and cram
-                    wram_addr.next = intbv(embedding_dim * word_id + j)
-                    wram_rd.next = True
-                    cram_addr.next = intbv(embedding_dim * context_id + j)
-                    cram_rd.next = True
-
-                    # wait for both
-                    yield join(wram_rd.negedge, cram_rd.negedge)
-                    #print "%6s wram read, word_id: %s, addr: %s, dout: %s" % (now(), word_id, wram_addr, wram_dout)
-                    #print "%6s cram read, context_id: %s, addr: %s, dout: %s" % (now(), context_id, cram_addr, cram_dout)
-
-                    # read parts of embeddings
-                    word_emb[j].next = wram_dout
-                    context_emb[j].next = cram_dout
+                # initiate writing whole embeddings to wram and cram
+                wram_din.next = new_word_embv
+                wram_wr.next = True
+                cram_din.next = new_context_embv
+                cram_wr.next = True
 
-                # wait for word-context updated to finish
-                yield clk.negedge
-                print "%6s %d mse_ema: %f, mse: %f, word: %s, context: %s" % (now(), doc_pass, error_ema, error, [ float(el.val) for el in word_emb ], [ float(el.val) for el in context_emb ])
+                # wait for both, then replay next pair (idle after last)
+                yield join(wram_wr.negedge, cram_wr.negedge)
+                rom_addr.next = i + 2 if i + 1 < len(chunk) else 0
+            record_block(errors)
+
+        metrics.flush()
+        save_checkpoint()
+        raise StopSimulation()
+
+    return clk_gen, batched_driver, wcupdated, wram, cram, rom, route
 
-                # compute exponential moving average of error
-                error_delta = fixbv(error_ema_weight * (error - error_ema), min=fix_min, max=fix_max, res=fix_res)
-                error_ema.next = error_ema + error_delta
 
-                # write new word-context embeddings
-                for j in range(embedding_dim):
-                    # initiate writing to wram and cram
-                    wram_addr.next = intbv(embedding_dim * word_id + j)
-                    wram_din.next = new_word_emb[j]
-                    wram_wr.next = True
-                    cram_addr.next = intbv(embedding_dim * context_id + j)
-                    cram_din.next = new_context_emb[j]
-                    cram_wr.next = True
+def embedding_memory(vocab_size, fmt=Q7_8, embedding_dim=3):
+    """Embedding memory of raw fixed-point words addressed by word id (see RamSim.py)."""
+    return ArrayMemory(2**max(1, (vocab_size - 1).bit_length()), width=fmt.fix_width, dim=embedding_dim)
 
-                    # wait for both
-                    yield join(wram_wr.negedge, cram_wr.negedge)
-                    #print "%6s wram write, word_id: %s, addr: %s, din: %s" % (now(), word_id, wram_addr, wram_din)
-                    #print "%6s cram write, context_id: %s, addr: %s, din: %s" % (now(), context_id, cram_addr, cram_din)
 
-    return clk_gen, driver, wcupdated, wram, cram
+def run(x_vocab, y_skipgram, vocab_size, wram_mem=None, cram_mem=None, n_passes=None, sampler=None, negative=1, window=1, dynamic=False, max_pairs=None, checkpoint_path=None, checkpoint_interval=10**5, metrics=None, profiler=None, backend='python', stimulus='python', fmt=Q7_8, stats=None, shard=None, params=None):
+    """Run train driver.
 
+    :param profiler: SimProfiler (see simprofile.py) to count generator fires, wall time and signal transitions, none if None
+    :param stats: FixStats (see fixformat.py) reported at the end, none if None
+    :returns: word and context embedding memories
+    """
 
-def run(x_vocab, y_skipgram, vocab_size):
-    """Run train driver."""
+    if wram_mem is None:
+        wram_mem = embedding_memory(vocab_size, fmt)
+    if cram_mem is None:
+        cram_mem = embedding_memory(vocab_size, fmt)
 
     # simulate design
     #train = traceSignals(train)
-    sim = Simulation(train(x_vocab, y_skipgram, vocab_size))
-    sim.run()
+    design = train(x_vocab, y_skipgram, vocab_size, wram_mem, cram_mem, n_passes, sampler, negative, window, dynamic, max_pairs, checkpoint_path, checkpoint_interval, metrics=metrics, backend=backend, stimulus=stimulus, fmt=fmt, stats=stats, shard=shard, params=params)
+    if profiler is None:
+        sim = Simulation(design)
+        sim.run()
+    else:
+        sim = Simulation(profiler.instrument(design))
+        profiler.run(sim)
+        print profiler.report()
+    if stats is not None:
+        print stats.report()
+    return wram_mem, cram_mem
 
 
 if __name__ == '__main__':
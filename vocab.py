@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103,W0621
+"""
+Compact vocabulary with frequency-sorted ids and a binary file format.
+
+Words are stored in one contiguous byte buffer with an offset array, counts
+in a NumPy array, and the only hash map is the word to id index. Ids start
+with `first_id` (1), id 0 is reserved for out-of-vocabulary words (UNK).
+
+Binary format (little-endian):
+
+- magic `VOCB`, uint32 version, uint32 number of words, uint32 first id
+- int64 offsets (words + 1) into the buffer
+- int64 counts (words)
+- buffer of concatenated words
+"""
+__author__ = "GW [http://gw.tnode.com/] <gw.2015@tnode.com>"
+__license__ = "GPLv3+"
+
+import struct
+from itertools import izip
+import numpy as np
+
+VOCAB_MAGIC = "VOCB"
+VOCAB_VERSION = 1
+HEADER = struct.Struct('<4sIII')
+UNK_ID = 0  # reserved id of out-of-vocabulary words
+
+
+class Vocabulary(object):
+    """Read-only word to id mapping (drop-in for `word2id` dicts) with counts by id.
+
+    :param buf: concatenated words in order of ids
+    :param offsets: int64 array of word boundaries in buf (words + 1)
+    :param counts: int64 array of word counts in order of ids
+    :param first_id: id of first word
+    """
+
+    def __init__(self, buf="", offsets=None, counts=None, first_id=1):
+        self.buf = buf
+        self.offsets = np.zeros(1, dtype=np.int64) if offsets is None else np.asarray(offsets, dtype=np.int64)
+        self.counts = np.zeros(len(self.offsets) - 1, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.first_id = first_id
+        self.index = dict(izip(self.words(), xrange(first_id, first_id + len(self.counts))))
+
+    @classmethod
+    def from_words(cls, words, counts=None, first_id=1):
+        """Vocabulary of words in given order of ids."""
+        lengths = np.fromiter((len(w) for w in words), dtype=np.int64, count=len(words))
+        return cls("".join(words), np.r_[0, np.cumsum(lengths)], counts, first_id)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def __getitem__(self, word):
+        return self.index[word]
+
+    def __iter__(self):
+        return iter(self.words())
+
+    def get(self, word, default=None):
+        return self.index.get(word, default)
+
+    def iteritems(self):
+        return self.index.iteritems()
+
+    def word(self, i):
+        """Word with id i."""
+        j = i - self.first_id
+        if not 0 <= j < len(self.counts):
+            raise IndexError("word id {} out of vocabulary".format(i))
+        return self.buf[self.offsets[j]:self.offsets[j + 1]]
+
+    def words(self):
+        """List of words in order of ids."""
+        buf = self.buf
+        offsets = self.offsets.tolist()
+        return [ buf[a:b] for a, b in izip(offsets[:-1], offsets[1:]) ]
+
+    def counts_by_id(self, size=None):
+        """Counts as array indexed by word id (zero for reserved ids)."""
+        size = self.first_id + len(self.counts) if size is None else size
+        counts = np.zeros(size, dtype=np.int64)
+        n = max(min(len(self.counts), size - self.first_id), 0)
+        counts[self.first_id:self.first_id + n] = self.counts[:n]
+        return counts
+
+    def save(self, path):
+        """Write vocabulary in binary format."""
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(VOCAB_MAGIC, VOCAB_VERSION, len(self.counts), self.first_id))
+            f.write(self.offsets.astype('<i8').tostring())
+            f.write(self.counts.astype('<i8').tostring())
+            f.write(self.buf)
+
+    @classmethod
+    def load(cls, path):
+        """Read vocabulary in binary format."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, n, first_id = HEADER.unpack_from(data)
+        if magic != VOCAB_MAGIC or version != VOCAB_VERSION:
+            raise ValueError("invalid vocabulary file '{}'".format(path))
+        pos = HEADER.size
+        offsets = np.frombuffer(data, dtype='<i8', count=n + 1, offset=pos).astype(np.int64)
+        pos += 8 * (n + 1)
+        counts = np.frombuffer(data, dtype='<i8', count=n, offset=pos).astype(np.int64)
+        pos += 8 * n
+        return cls(data[pos:pos + offsets[-1]], offsets, counts, first_id)
+
+
+def build_vocabulary(words, counts, min_count=1, nb_words=None, first_id=1):
+    """Vocabulary sorted by decreasing count (ties in given order) with pruning.
+
+    :param words: list of words
+    :param counts: counts of words
+    :param min_count: drop words occurring fewer times
+    :param nb_words: keep ids below nb_words (as Keras Tokenizer, i.e. nb_words - first_id most frequent words)
+    :returns: vocabulary and array of new ids of given words (UNK_ID if dropped)
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    order = np.argsort(-counts, kind='mergesort')
+    order = order[counts[order] >= min_count]
+    if nb_words is not None:
+        order = order[:max(nb_words - first_id, 0)]
+
+    ids = np.empty(len(counts), dtype=np.uint32)
+    ids.fill(UNK_ID)
+    ids[order] = np.arange(first_id, first_id + len(order))
+    vocab = Vocabulary.from_words([ words[i] for i in order.tolist() ], counts[order], first_id)
+    return vocab, ids
+
+
+def oov_counts(x_vocab, unk=UNK_ID):
+    """Out-of-vocabulary words and OOV rate per document.
+
+    :returns: arrays of unk counts and rates per document
+    """
+    counts = np.array([ np.count_nonzero(np.asarray(doc) == unk) for doc in x_vocab ], dtype=np.int64)
+    lengths = np.array([ len(doc) for doc in x_vocab ], dtype=np.float64)
+    return counts, counts / np.maximum(lengths, 1)
+
+
+def test_vocabulary():
+    """Testing bench for pruning, OOV counts and binary save/load."""
+    import os
+    import tempfile
+
+    words = ["b", "a", "ccc", "", "dd", "e"]
+    counts = [3, 5, 3, 0, 1, 9]
+    vocab, ids = build_vocabulary(words, counts)
+    assert list(vocab) == ["e", "a", "b", "ccc", "dd"] and vocab.counts.tolist() == [9, 5, 3, 3, 1]
+    assert ids.tolist() == [3, 2, 4, 0, 5, 1]
+    assert vocab["ccc"] == 4 and vocab.word(4) == "ccc" and "" not in vocab and vocab.get("x") is None
+    assert vocab.counts_by_id().tolist() == [0, 9, 5, 3, 3, 1]
+
+    pruned, ids = build_vocabulary(words, counts, min_count=2, nb_words=4)
+    assert list(pruned) == ["e", "a", "b"] and ids.tolist() == [3, 2, 0, 0, 0, 1]
+    doc = np.array([ pruned.get(w, UNK_ID) for w in ["a", "ccc", "dd", "e"] ], dtype=np.uint32)
+    unk, rates = oov_counts([doc, doc[:0]])
+    assert unk.tolist() == [2, 0] and rates.tolist() == [0.5, 0.0]
+
+    fd, path = tempfile.mkstemp(suffix=".bin")
+    os.close(fd)
+    try:
+        vocab.save(path)
+        loaded = Vocabulary.load(path)
+        assert list(loaded) == list(vocab) and loaded.counts.tolist() == vocab.counts.tolist() and loaded["dd"] == 5
+    finally:
+        os.remove(path)
+    print "vocabulary: %d words, pruned: %d words, buffer: %d bytes" % (len(vocab), len(pruned), len(vocab.buf))
+
+
+if __name__ == '__main__':
+    test_vocabulary()